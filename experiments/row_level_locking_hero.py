@@ -2,7 +2,7 @@ import threading
 import time
 
 from models import UUID7, Hero
-from sqlalchemy import Engine
+from sqlalchemy import Engine, update
 from sqlmodel import Session, SQLModel, create_engine, select
 
 
@@ -48,6 +48,26 @@ def update_with_lock(
             print(f"❌ Updated without lock: new_age={new_age} failed - {e} \n")
 
 
+def update_with_version(engine: Engine, hero_id: UUID7, new_age: int, delay: float):
+    with Session(engine) as session:
+        try:
+            hero = session.get(Hero, hero_id)
+            time.sleep(delay)  # Simulate processing time
+            # Compare-and-swap: only matches the row if nobody updated it since it was read
+            statement = (
+                update(Hero)
+                .where(Hero.id == hero_id, Hero.version == hero.version)
+                .values(age=new_age, version=Hero.version + 1)
+            )
+            if session.exec(statement).rowcount == 0:
+                raise RuntimeError(f"version {hero.version} is stale")
+            session.commit()
+            print(f"✅ Updated with version: new_age={new_age}")
+        except Exception as e:
+            session.rollback()
+            print(f"❌ Updated with version: new_age={new_age} failed - {e} \n")
+
+
 def concurrent_update_test():
     """
     Simulates two concurrent transactions trying to update the same hero.
@@ -156,6 +176,27 @@ def concurrent_update_test():
         hero = session.get(Hero, hero_id)
         print(f"Final age with lock: {hero.age}")
 
+    # Demonstrate optimistic concurrency control with a version column
+    # Nothing is locked: the first update wins and the others fail fast instead of waiting.
+    print("\n" + "=" * 60)
+    print("With version (compare-and-swap):")
+    print("=" * 60)
+
+    threads = [
+        threading.Thread(target=update_with_version, args=(engine, hero_id, 26, 0.5)),
+        threading.Thread(target=update_with_version, args=(engine, hero_id, 27, 0.5)),
+        threading.Thread(target=update_with_version, args=(engine, hero_id, 30, 0.5)),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Verify final age (no lost update)
+    with Session(engine) as session:
+        hero = session.get(Hero, hero_id)
+        print(f"Final age with version: {hero.age}, version: {hero.version}")
+
 
 if __name__ == "__main__":
     concurrent_update_test()
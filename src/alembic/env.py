@@ -23,6 +23,24 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """
+    Leave out of autogenerate the full-text search of the heroes, which is specific to each
+    database and created by its own revision: the FTS5 tables on SQLite, and the tsvector
+    column and its GIN index on PostgreSQL.
+    """
+    if reflected and compare_to is None:
+        if type_ == "table" and name.startswith("hero_search"):
+            return False
+        if type_ in ("column", "index") and name in (
+            "search_vector",
+            "ix_hero_search_vector",
+        ):
+            return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -46,6 +64,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -78,7 +97,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,33 @@
+"""add hero version
+
+Revision ID: 8d2f4b6e1a93
+Revises: 5c1e8f3a9b27
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d2f4b6e1a93"
+down_revision: Union[str, Sequence[str], None] = "5c1e8f3a9b27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The existing heroes start at version 1
+    op.add_column(
+        "hero",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("hero") as batch_op:
+        batch_op.drop_column("version")
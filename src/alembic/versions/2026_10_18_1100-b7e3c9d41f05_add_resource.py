@@ -0,0 +1,61 @@
+"""add resource
+
+Revision ID: b7e3c9d41f05
+Revises: 8d2f4b6e1a93
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e3c9d41f05"
+down_revision: Union[str, Sequence[str], None] = "8d2f4b6e1a93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "resource",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "available",
+                "claimed",
+                "confirmed",
+                name="resourcestatus",
+                native_enum=False,
+                length=16,
+            ),
+            nullable=False,
+        ),
+        sa.Column("claim_token", sa.Uuid(), nullable=True),
+        sa.Column("lease_expires_at", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_resource_claim_token"), "resource", ["claim_token"], unique=False
+    )
+    op.create_index(
+        op.f("ix_resource_lease_expires_at"),
+        "resource",
+        ["lease_expires_at"],
+        unique=False,
+    )
+    op.create_index("ix_resource_status_id", "resource", ["status", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_resource_status_id", table_name="resource")
+    op.drop_index(op.f("ix_resource_lease_expires_at"), table_name="resource")
+    op.drop_index(op.f("ix_resource_claim_token"), table_name="resource")
+    op.drop_table("resource")
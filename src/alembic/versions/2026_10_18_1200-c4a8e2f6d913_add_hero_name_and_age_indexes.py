@@ -0,0 +1,30 @@
+"""add hero name and age indexes
+
+Revision ID: c4a8e2f6d913
+Revises: b7e3c9d41f05
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a8e2f6d913"
+down_revision: Union[str, Sequence[str], None] = "b7e3c9d41f05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The ID follows the filtered column, so that a filtered page is read in ID order
+    op.create_index("ix_hero_name_id", "hero", ["name", "id"], unique=False)
+    op.create_index("ix_hero_age_id", "hero", ["age", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_hero_age_id", table_name="hero")
+    op.drop_index("ix_hero_name_id", table_name="hero")
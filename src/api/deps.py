@@ -1,10 +1,12 @@
-from typing import Annotated, Generator
+from typing import Annotated, AsyncGenerator, Generator
 
 import state
 from config import settings
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import APIKeyHeader
+from middlewares.read_your_writes import is_pinned_to_primary
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 
 """
@@ -23,6 +25,65 @@ def get_db_session() -> Generator[Session, None, None]:
 SessionDep = Annotated[Session, Depends(get_db_session)]
 
 
+def get_read_db_session(request: Request) -> Generator[Session, None, None]:
+    """
+    Create a new read-only database session on a read replica, in round-robin, and close it
+    after the operation has ended.
+
+    The primary is used when no replica is configured or healthy, and for the clients that
+    wrote recently, so that they read their own writes. `session.info` tells whether the
+    client is pinned to the primary and whether the session is bound to a replica.
+    """
+    engine = state.engine
+    pinned = state.replicas is not None and is_pinned_to_primary(request.cookies)
+    replica = None
+    if state.replicas is not None and not pinned:
+        replica = state.replicas.get_replica()
+        if replica is not None:
+            engine = replica.engine
+    with Session(engine) as session:
+        session.info["pinned_to_primary"] = pinned
+        session.info["on_replica"] = replica is not None
+        yield session
+
+
+ReadSessionDep = Annotated[Session, Depends(get_read_db_session)]
+
+
+async def get_async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Create a new async database session and close the session after the operation has ended.
+    """
+    # Objects are not expired on commit, since lazy loading is not allowed outside the event loop.
+    async with AsyncSession(state.async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db_session)]
+
+
+async def get_async_read_db_session(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async counterpart of `get_read_db_session`.
+    """
+    engine = state.async_engine
+    pinned = state.replicas is not None and is_pinned_to_primary(request.cookies)
+    replica = None
+    if state.replicas is not None and not pinned:
+        replica = state.replicas.get_replica()
+        if replica is not None:
+            engine = replica.async_engine
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.info["pinned_to_primary"] = pinned
+        session.info["on_replica"] = replica is not None
+        yield session
+
+
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_db_session)]
+
+
 def api_key_auth(api_key: str = Depends(APIKeyHeader(name="Authorization"))) -> None:
     # Validate the provided API key
     if api_key != settings.API_KEY.get_secret_value():
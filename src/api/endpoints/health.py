@@ -1,7 +1,9 @@
-from database import check_health_safe
+import state
+from config import settings
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from starlette import status
-from state import engine
+from utils.health import DEGRADED, FAIL
 
 router = APIRouter()
 
@@ -27,7 +29,14 @@ def health():
     response_description="Return HTTP 200",
 )
 async def readiness_check():
-    return health_check(include_dependencies=True)
+    response = health_check(include_dependencies=True)
+    unready = response["status"] == FAIL or (
+        response["status"] == DEGRADED and settings.HEALTH_DEGRADED_UNREADY
+    )
+    if unready:
+        # Let the load balancer drain the pod before the requests start failing
+        return JSONResponse(response, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return response
 
 
 @router.get(
@@ -49,17 +58,18 @@ def health_check(include_dependencies: bool = False):
         include_dependencies (bool): Whether to include dependency checks.
 
     Returns:
-        dict: Health status.
+        dict: Health status, and with the dependencies, the state of the database, the rolling
+            latency of its probes and whether the pool is exhausted.
     """
-    # Here you would typically check the health of your dependencies
-    # e.g., database connection, external services, etc.
-    # For simplicity, we return a static response.
+    # The dependencies are checked in the background by the health monitor started in the
+    # lifespan, so the probes only read its last results.
 
     status_response = {"status": "OK"}
 
     if include_dependencies:
-        # Perform checks for dependencies here
-        db_status = check_health_safe(engine)
-        status_response["database"] = "OK" if db_status else "FAIL"
+        if state.health_monitor is None:
+            # Not started yet, or shutting down
+            return {"status": FAIL, "database": "UNKNOWN"}
+        status_response = state.health_monitor.status()
 
     return status_response
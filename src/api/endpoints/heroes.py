@@ -1,11 +1,42 @@
 from typing import Annotated
 
-from api.deps import SessionDep, get_db_session
-from excepts import DatabaseEntryNotFound, get_error_content
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import state
+from api.deps import (
+    ReadSessionDep,
+    SessionDep,
+    get_db_session,
+    get_read_db_session,
+)
+from api.services.heroes import (
+    build_hero_update,
+    build_heroes_query,
+    build_heroes_search,
+    heroes_etag,
+    invalidate_cached_hero,
+    serialize_hero,
+    serialize_heroes,
+)
+from api.services.idempotency import run_idempotent
+from excepts import (
+    Conflict,
+    DatabaseEntryNotFound,
+    PreconditionFailed,
+    get_error_content,
+)
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+)
 from models import UUID7, Hero, HeroCreate, HeroPublic, HeroUpdate
-from sqlmodel import select
-from utils.log import get_logger
+from utils.etag import compute_etag, etag_matches, etag_response
+from utils.idempotency import fingerprint_request
+from utils.log import get_logger, trace_limiter
+from utils.pagination import NEXT_CURSOR_HEADER, encode_cursor
 
 logger = get_logger()
 router = APIRouter()
@@ -19,9 +50,31 @@ router = APIRouter()
     response_model=HeroPublic,
     dependencies=[Depends(get_db_session)],
 )
-def create_hero(hero: HeroCreate, session: SessionDep):
+def create_hero(
+    hero: HeroCreate,
+    session: SessionDep,
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
+):
+    """
+    Creates a hero. Retries sent with the same `Idempotency-Key` header get the response of
+    the first request, without creating another hero.
+    """
     try:
         db_hero = Hero.model_validate(hero)
+        if idempotency_key is not None and state.idempotency_store is not None:
+
+            def write() -> bytes:
+                session.add(db_hero)
+                return serialize_hero(db_hero)
+
+            return run_idempotent(
+                session,
+                idempotency_key,
+                fingerprint_request(
+                    "POST", "/heroes/", hero.model_dump_json().encode()
+                ),
+                write,
+            )
         session.add(db_hero)
         session.commit()
         session.refresh(db_hero)
@@ -30,10 +83,11 @@ def create_hero(hero: HeroCreate, session: SessionDep):
         error = get_error_content(e)
         error_message = error.message
 
+        with_trace = trace_limiter.allow(e)
         logger.error(
             error_message,
-            exc_info=True,
-            stack_info=True,
+            exc_info=with_trace,
+            stack_info=with_trace,
         )
 
         session.rollback()
@@ -50,15 +104,107 @@ def create_hero(hero: HeroCreate, session: SessionDep):
     status_code=status.HTTP_200_OK,
     response_description="Returns a list of heroes",
     response_model=list[HeroPublic],
-    dependencies=[Depends(get_db_session)],
+    dependencies=[Depends(get_read_db_session)],
 )
 def read_heroes(
-    session: SessionDep,
+    session: ReadSessionDep,
     offset: int = 0,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[Hero]:
-    heroes = session.exec(select(Hero).offset(offset).limit(limit)).all()
-    return list(heroes)
+    cursor: Annotated[
+        str | None, Query(description="The X-Next-Cursor header of the previous page.")
+    ] = None,
+    name: Annotated[str | None, Query(description="The exact name.")] = None,
+    name_prefix: Annotated[
+        str | None, Query(min_length=1, description="The beginning of the name.")
+    ] = None,
+    min_age: Annotated[int | None, Query(description="The minimum age.")] = None,
+    max_age: Annotated[int | None, Query(description="The maximum age.")] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """
+    Returns a page of heroes in ID order, optionally filtered by name and age. The filters
+    are served by indexes, and can be combined with each other and with the cursor.
+    """
+    try:
+        query = build_heroes_query(
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            name=name,
+            name_prefix=name_prefix,
+            min_age=min_age,
+            max_age=max_age,
+        )
+        heroes = session.exec(query).all()
+        headers = {"ETag": heroes_etag(heroes)}
+        # A full page may be followed by another one
+        if heroes and len(heroes) == limit:
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(heroes[-1].id)
+        if if_none_match is not None and etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(
+            serialize_heroes(heroes), media_type="application/json", headers=headers
+        )
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        session.rollback()
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
+
+
+@router.get(
+    path="/search",
+    summary="Search heroes by name",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the matching heroes, the best matches first",
+    response_model=list[HeroPublic],
+    dependencies=[Depends(get_read_db_session)],
+)
+def search_heroes(
+    session: ReadSessionDep,
+    q: Annotated[
+        str, Query(min_length=1, max_length=200, description="The words to search.")
+    ],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+) -> Response:
+    """
+    Returns the heroes with a word of their name starting with each word of `q`, e.g. `dead`
+    finds "Deadpond" and "Dead Pool", ranked by relevance. The search runs on a full-text
+    index of the names, so it doesn't scan the table.
+    """
+    try:
+        query = build_heroes_search(q, limit, session.get_bind().dialect.name)
+        heroes = session.exec(query).all() if query is not None else []
+        return Response(serialize_heroes(heroes), media_type="application/json")
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        session.rollback()
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
 
 
 @router.get(
@@ -67,22 +213,40 @@ def read_heroes(
     status_code=status.HTTP_200_OK,
     response_description="Returns the hero with the specified ID",
     response_model=HeroPublic,
-    dependencies=[Depends(get_db_session)],
+    dependencies=[Depends(get_read_db_session)],
 )
-def read_hero(hero_id: UUID7, session: SessionDep):
+def read_hero(
+    hero_id: UUID7,
+    session: ReadSessionDep,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
     try:
-        hero = session.get(Hero, hero_id)
-        if not hero:
-            raise DatabaseEntryNotFound(f"Hero with ID {hero_id} not found")
-        return hero
+        # Clients pinned to the primary skip the cache, which may miss a write made through
+        # another worker. Only the rows read from the primary are cached: a lagging replica
+        # could return a row older than the last invalidation.
+        cache = state.hero_cache
+        pinned = session.info.get("pinned_to_primary", False)
+        body = cache.get(hero_id) if cache is not None and not pinned else None
+        if body is None:
+            generation = cache.generation if cache is not None else None
+            hero = session.get(Hero, hero_id)
+            if not hero:
+                raise DatabaseEntryNotFound(f"Hero with ID {hero_id} not found")
+
+            # Serialized once, the same bytes are sent now and on every cache hit
+            body = serialize_hero(hero)
+            if cache is not None and not session.info.get("on_replica", False):
+                cache.set(hero_id, body, generation=generation)
+        return etag_response(body, if_none_match)
     except Exception as e:
         error = get_error_content(e)
         error_message = error.message
 
+        with_trace = trace_limiter.allow(e)
         logger.error(
             error_message,
-            exc_info=True,
-            stack_info=True,
+            exc_info=with_trace,
+            stack_info=with_trace,
         )
 
         session.rollback()
@@ -101,25 +265,62 @@ def read_hero(hero_id: UUID7, session: SessionDep):
     response_model=HeroPublic,
     dependencies=[Depends(get_db_session)],
 )
-def update_hero(hero_id: UUID7, hero: HeroUpdate, session: SessionDep):
+def update_hero(
+    hero_id: UUID7,
+    hero: HeroUpdate,
+    session: SessionDep,
+    if_match: Annotated[str | None, Header()] = None,
+):
+    """
+    Updates the fields of a hero that are set in the body, with optimistic concurrency
+    control: the update fails with 409 if the body has a `version` and the hero is no longer
+    at this version, or with 412 if the `If-Match` header doesn't match the current ETag.
+    """
     try:
-        hero_db = session.get(Hero, hero_id)
-        if not hero_db:
-            raise DatabaseEntryNotFound(f"Hero with ID {hero_id} not found")
-        hero_data = hero.model_dump(exclude_unset=True)
-        hero_db.sqlmodel_update(hero_data)
-        session.add(hero_db)
+        hero_data = hero.model_dump(exclude_unset=True, exclude={"version"})
+        version = hero.version
+        if if_match is not None:
+            hero_db = session.get(Hero, hero_id)
+            if not hero_db:
+                raise DatabaseEntryNotFound(f"Hero with ID {hero_id} not found")
+            if not etag_matches(
+                if_match, compute_etag(serialize_hero(hero_db)), weak=False
+            ):
+                raise PreconditionFailed(f"Hero with ID {hero_id} has been modified")
+            # Only apply the update to the version whose ETag matched
+            if version is None:
+                version = hero_db.version
+
+        result = session.exec(build_hero_update(hero_id, hero_data, version))
+        hero_db = result.scalars().one_or_none()
+        if hero_db is None:
+            current = (
+                session.get(Hero, hero_id, populate_existing=True)
+                if version is not None
+                else None
+            )
+            if current is None:
+                raise DatabaseEntryNotFound(f"Hero with ID {hero_id} not found")
+            if if_match is not None:
+                raise PreconditionFailed(f"Hero with ID {hero_id} has been modified")
+            raise Conflict(
+                f"Hero with ID {hero_id} is at version {current.version}, not {version}"
+            )
+        body = serialize_hero(hero_db)
         session.commit()
-        session.refresh(hero_db)
-        return hero_db
+        invalidate_cached_hero(hero_id)
+        return Response(
+            body, media_type="application/json", headers={"ETag": compute_etag(body)}
+        )
     except Exception as e:
         error = get_error_content(e)
         error_message = error.message
 
+        with_trace = trace_limiter.allow(e)
         logger.error(
             error_message,
-            exc_info=True,
-            stack_info=True,
+            exc_info=with_trace,
+            stack_info=with_trace,
         )
 
         session.rollback()
@@ -144,15 +345,17 @@ def delete_hero(hero_id: UUID7, session: SessionDep):
             raise DatabaseEntryNotFound("Hero not found")
         session.delete(hero)
         session.commit()
+        invalidate_cached_hero(hero_id)
         return {"ok": True}
     except Exception as e:
         error = get_error_content(e)
         error_message = error.message
 
+        with_trace = trace_limiter.allow(e)
         logger.error(
             error_message,
-            exc_info=True,
-            stack_info=True,
+            exc_info=with_trace,
+            stack_info=with_trace,
         )
 
         session.rollback()
@@ -0,0 +1,211 @@
+from typing import Annotated
+
+import state
+from api.deps import SessionDep, get_db_session
+from api.services.heroes import (
+    export_heroes,
+    import_heroes,
+    insert_heroes,
+    invalidate_cached_hero,
+    serialize_heroes,
+    update_heroes,
+)
+from api.services.idempotency import run_idempotent
+from config import settings
+from excepts import get_error_content
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from models import HeroBulkUpdate, HeroCreate, HeroPublic
+from schemas import HeroBulkUpdateReport, HeroImportReport
+from starlette.concurrency import run_in_threadpool
+from utils.idempotency import fingerprint_request
+from utils.log import get_logger, trace_limiter
+from utils.streaming import CSV_MEDIA_TYPES, NDJSON_MEDIA_TYPES, iter_records
+
+"""
+Bulk hero endpoints, moving many heroes per request and per transaction.
+They are served by the sync engine in both database modes, and the router is included before
+the hero CRUD router so that its static paths take precedence over `/{hero_id}`.
+"""
+
+logger = get_logger()
+router = APIRouter()
+
+
+@router.post(
+    path="/bulk",
+    summary="Create many heroes at once",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the created heroes, in the order they were sent",
+    response_model=list[HeroPublic],
+    dependencies=[Depends(get_db_session)],
+)
+def create_heroes(
+    heroes: Annotated[
+        list[HeroCreate], Body(min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    ],
+    session: SessionDep,
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
+):
+    """
+    Creates all the heroes in a single transaction, or none of them.
+    The whole list is validated in one pass and invalid items are reported by their index,
+    e.g. `3.secret_name: Field required`.
+    Retries sent with the same `Idempotency-Key` header get the response of the first request.
+    """
+    try:
+        if idempotency_key is not None and state.idempotency_store is not None:
+
+            def write() -> bytes:
+                return serialize_heroes(
+                    insert_heroes(session, heroes, batch_size=settings.BULK_BATCH_SIZE)
+                )
+
+            body = b"\n".join(hero.model_dump_json().encode() for hero in heroes)
+            return run_idempotent(
+                session,
+                idempotency_key,
+                fingerprint_request("POST", "/heroes/bulk", body),
+                write,
+            )
+        created = insert_heroes(session, heroes, batch_size=settings.BULK_BATCH_SIZE)
+        session.commit()
+        return created
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        session.rollback()
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
+
+
+@router.patch(
+    path="/bulk",
+    summary="Update many heroes at once",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the updated heroes and the IDs of the heroes not found",
+    response_model=HeroBulkUpdateReport,
+    dependencies=[Depends(get_db_session)],
+)
+def update_many_heroes(
+    heroes: Annotated[
+        list[HeroBulkUpdate], Body(min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    ],
+    session: SessionDep,
+):
+    """
+    Updates the fields set in each item, and increments the version of the updated heroes,
+    in a single transaction. The heroes are updated with a few set-based statements instead of
+    one request per hero, and the IDs that match no hero are reported instead of failing.
+    """
+    try:
+        updated, not_found = update_heroes(
+            session, heroes, batch_size=settings.BULK_BATCH_SIZE
+        )
+        session.commit()
+        for hero in updated:
+            invalidate_cached_hero(hero["id"])
+        return HeroBulkUpdateReport(updated=updated, not_found=not_found)
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        session.rollback()
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
+
+
+@router.get(
+    path="/export",
+    summary="Export all the heroes as NDJSON",
+    status_code=status.HTTP_200_OK,
+    response_description="Streams one hero per line",
+    response_class=StreamingResponse,
+    dependencies=[Depends(get_db_session)],
+)
+def export_all_heroes(session: SessionDep):
+    """
+    Streams the whole hero table as newline-delimited JSON, reading it through a server-side
+    cursor, so the first heroes are sent right away and memory doesn't grow with the table.
+    """
+    return StreamingResponse(
+        export_heroes(session, chunk_size=settings.EXPORT_CHUNK_SIZE),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post(
+    path="/import",
+    summary="Import heroes from an NDJSON or CSV upload",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the number of imported and rejected heroes",
+    response_model=HeroImportReport,
+    dependencies=[Depends(get_db_session)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "string"}}
+                for media_type in NDJSON_MEDIA_TYPES + CSV_MEDIA_TYPES
+            },
+        }
+    },
+)
+async def import_all_heroes(request: Request, session: SessionDep):
+    """
+    Reads the body as a stream of NDJSON lines or CSV rows (with a header row), depending on
+    the Content-Type. Records are validated against `HeroCreate` and written IMPORT_CHUNK_SIZE
+    at a time, each chunk in its own transaction: with COPY on PostgreSQL and batched inserts
+    on SQLite. Invalid records are skipped and reported. A line (or CSV row) longer than
+    IMPORT_MAX_LINE_LENGTH fails the import with 413, and a body that isn't valid UTF-8 with
+    422, keeping the chunks already written.
+    """
+    media_type = request.headers.get("content-type", "").partition(";")[0].strip()
+    try:
+        records = iter_records(
+            request.stream(), media_type.lower(), settings.IMPORT_MAX_LINE_LENGTH
+        )
+        return await import_heroes(
+            session,
+            records,
+            chunk_size=settings.IMPORT_CHUNK_SIZE,
+            batch_size=settings.BULK_BATCH_SIZE,
+        )
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        await run_in_threadpool(session.rollback)
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
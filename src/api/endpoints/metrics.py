@@ -0,0 +1,21 @@
+from config import settings
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette import status
+from utils import metrics
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    summary="Expose the metrics of all the workers in the Prometheus text format",
+    status_code=status.HTTP_200_OK,
+    response_description="Return the request and database pool metrics",
+    response_class=Response,
+)
+def read_metrics():
+    return Response(
+        content=metrics.render_metrics(metrics.recorder, settings.METRICS_DIR),
+        media_type=CONTENT_TYPE_LATEST,
+    )
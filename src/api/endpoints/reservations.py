@@ -0,0 +1,175 @@
+from typing import Annotated
+
+from api.deps import SessionDep, get_db_session
+from api.services.reservations import (
+    claim_resources,
+    confirm_claim,
+    create_resources,
+    release_claim,
+)
+from config import settings
+from excepts import get_error_content
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from models import UUID7, ResourceCreate, ResourcePublic
+from schemas import ResourceClaim
+from utils.log import get_logger, trace_limiter
+
+"""
+Reservation endpoints: clients claim available resources for a lease, then confirm or release
+their claim. They are served by the sync engine in both database modes.
+"""
+
+logger = get_logger()
+router = APIRouter()
+
+
+@router.post(
+    path="/resources",
+    summary="Create reservable resources",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the created resources, in the order they were sent",
+    response_model=list[ResourcePublic],
+    dependencies=[Depends(get_db_session)],
+)
+def add_resources(
+    resources: Annotated[
+        list[ResourceCreate], Body(min_length=1, max_length=settings.BULK_MAX_ITEMS)
+    ],
+    session: SessionDep,
+):
+    """
+    Creates available resources in a single transaction.
+    """
+    try:
+        return create_resources(session, resources, batch_size=settings.BULK_BATCH_SIZE)
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        session.rollback()
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
+
+
+@router.post(
+    path="/claim",
+    summary="Claim available resources",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the claim token and the claimed resources",
+    response_model=ResourceClaim,
+    dependencies=[Depends(get_db_session)],
+)
+def claim(
+    session: SessionDep,
+    n: Annotated[int, Query(ge=1, le=settings.RESERVATION_MAX_CLAIM)] = 1,
+    lease: Annotated[
+        float,
+        Query(
+            gt=0,
+            le=settings.RESERVATION_MAX_LEASE,
+            description="Seconds during which the resources are held for the claim.",
+        ),
+    ] = settings.RESERVATION_LEASE,
+):
+    """
+    Atomically claims up to `n` available resources, in creation order, for `lease` seconds.
+    Concurrent claims never get the same resource, and don't wait for each other on
+    PostgreSQL. Fewer resources, possibly none, are returned when not enough are available.
+    Confirm or release the claim with its token before the end of the lease: after it, the
+    resources are returned to the available ones.
+    """
+    try:
+        return claim_resources(session, n=n, lease=lease)
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        session.rollback()
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
+
+
+@router.post(
+    path="/{claim_token}/confirm",
+    summary="Confirm a claim",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the confirmed resources",
+    response_model=list[ResourcePublic],
+    dependencies=[Depends(get_db_session)],
+)
+def confirm(claim_token: UUID7, session: SessionDep):
+    """
+    Confirms the resources of a claim whose lease hasn't expired, which keeps them for good.
+    """
+    try:
+        return confirm_claim(session, claim_token)
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        session.rollback()
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
+
+
+@router.delete(
+    path="/{claim_token}",
+    summary="Release a claim",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the number of released resources",
+    dependencies=[Depends(get_db_session)],
+)
+def release(claim_token: UUID7, session: SessionDep):
+    """
+    Returns the resources of an unconfirmed claim to the available ones, before the end of
+    its lease.
+    """
+    try:
+        return {"released": release_claim(session, claim_token)}
+    except Exception as e:
+        error = get_error_content(e)
+        error_message = error.message
+
+        with_trace = trace_limiter.allow(e)
+        logger.error(
+            error_message,
+            exc_info=with_trace,
+            stack_info=with_trace,
+        )
+
+        session.rollback()
+
+        raise HTTPException(
+            status_code=error.http_status_code,
+            detail=error_message,
+        )
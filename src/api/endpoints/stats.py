@@ -0,0 +1,104 @@
+import state
+from api.deps import api_key_auth
+from config import settings
+from fastapi import APIRouter, Depends
+from starlette import status
+from utils import log, metrics
+
+"""
+Internal statistics of the running worker, for operators.
+Values are per process: with several uvicorn workers each one reports its own, except for
+the pool statistics, which list every worker sharing METRICS_DIR.
+"""
+
+router = APIRouter()
+
+
+@router.get(
+    path="/cache",
+    summary="Retrieve the statistics of the hero cache",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the size and the hit/miss/eviction counters of the cache",
+    dependencies=[Depends(api_key_auth)],
+)
+def hero_cache_stats():
+    if state.hero_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **state.hero_cache.stats()}
+
+
+@router.get(
+    path="/idempotency",
+    summary="Retrieve the statistics of the Idempotency-Key store",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the number of replayed and coalesced requests, the number of "
+    "purged keys and the statistics of the in-memory cache",
+    dependencies=[Depends(api_key_auth)],
+)
+def idempotency_stats():
+    if state.idempotency_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **state.idempotency_store.stats()}
+
+
+@router.get(
+    path="/reservations",
+    summary="Retrieve the statistics of the reaper of the expired claims",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the number of resources returned from expired claims",
+    dependencies=[Depends(api_key_auth)],
+)
+def reservation_stats():
+    if state.claim_reaper is None:
+        return {"enabled": False}
+    return {"enabled": True, **state.claim_reaper.stats()}
+
+
+@router.get(
+    path="/logging",
+    summary="Retrieve the statistics of the logging pipeline",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the size of the log queue, the number of dropped records and "
+    "the number of error traces left out by the rate limit",
+    dependencies=[Depends(api_key_auth)],
+)
+def logging_stats():
+    if log.queue_handler is None:
+        queue_stats = {"enabled": False}
+    else:
+        queue_stats = {"enabled": True, **log.queue_handler.stats()}
+    return {"queue": queue_stats, "traces": log.trace_limiter.stats()}
+
+
+@router.get(
+    path="/pool",
+    summary="Retrieve the statistics of the database connection pools of each worker",
+    status_code=status.HTTP_200_OK,
+    response_description="Returns the checked-out, idle and overflow connections and the "
+    "checkout wait time of the pools, per worker",
+    dependencies=[Depends(api_key_auth)],
+)
+def pool_stats():
+    workers = []
+    for snapshot in metrics.load_snapshots(metrics.recorder, settings.METRICS_DIR):
+        if not snapshot["alive"]:
+            continue
+        pools = {}
+        for name, values in snapshot["pools"].items():
+            checkouts = values["checkouts"]
+            wait = values.get("checkout_wait_seconds", 0.0)
+            pools[name] = {
+                **values,
+                "checkout_wait_avg_seconds": wait / checkouts if checkouts else 0.0,
+            }
+        workers.append({"pid": snapshot["pid"], "pools": pools})
+    return {
+        "config": {
+            "pool_size": settings.DATABASE_POOL_SIZE,
+            "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+            "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+            "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+            "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+        },
+        "workers": workers,
+    }
@@ -5,7 +5,7 @@ from excepts import InvalidValue, get_error_content
 from fastapi import APIRouter, Depends, HTTPException
 from schemas import User
 from starlette import status
-from utils.log import get_logger
+from utils.log import get_logger, trace_limiter
 
 logger = get_logger()
 router = APIRouter()
@@ -79,10 +79,11 @@ async def create_user_with_check(user: User):
         error = get_error_content(e)
         error_message = error.message
 
+        with_trace = trace_limiter.allow(e)
         logger.error(
             error_message,
-            exc_info=True,
-            stack_info=True,
+            exc_info=with_trace,
+            stack_info=with_trace,
         )
 
         raise HTTPException(
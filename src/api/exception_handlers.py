@@ -2,9 +2,10 @@ import json
 
 from fastapi import Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from starlette import status
-from utils.log import get_logger
+from utils.log import get_logger, trace_limiter
 
 logger = get_logger()
 
@@ -25,12 +26,21 @@ async def validation_exception_handler(request: Request, exc):
 
     response = {"detail": []}
     for error in exc_json["detail"]:
-        response["detail"].append(f"{error['loc'][-1]}: {error['msg']}")
-
+        # Keep the indexes of list items, e.g. "3.secret_name" for the fourth hero of a bulk
+        # request, but skip the source (body, query, path...) of request errors.
+        loc = (
+            error["loc"][1:]
+            if isinstance(exc, RequestValidationError)
+            else error["loc"]
+        )
+        location = ".".join(str(part) for part in loc) or error["loc"][-1]
+        response["detail"].append(f"{location}: {error['msg']}")
+
+    with_trace = trace_limiter.allow(exc)
     logger.error(
         f"The client sent invalid data!: {json.dumps(response)}",
-        exc_info=True,
-        stack_info=True,
+        exc_info=with_trace,
+        stack_info=with_trace,
     )
 
     return JSONResponse(response, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
@@ -1,7 +1,26 @@
-from api.endpoints import health, heroes, users
+from api.endpoints import (
+    health,
+    heroes,
+    heroes_async,
+    heroes_bulk,
+    metrics,
+    reservations,
+    stats,
+    users,
+)
+from config import settings
 from fastapi import APIRouter
 
 router = APIRouter()
 router.include_router(health.router, prefix="", tags=["health"])
+if settings.METRICS_ENABLED:
+    router.include_router(metrics.router, prefix="", tags=["metrics"])
 router.include_router(users.router, prefix="/users", tags=["users"])
-router.include_router(heroes.router, prefix="/heroes", tags=["heroes"])
+router.include_router(stats.router, prefix="/stats", tags=["stats"])
+router.include_router(
+    reservations.router, prefix="/reservations", tags=["reservations"]
+)
+router.include_router(heroes_bulk.router, prefix="/heroes", tags=["heroes"])
+# The async hero endpoints are served from the event loop instead of the threadpool.
+heroes_router = heroes_async.router if settings.DATABASE_ASYNC else heroes.router
+router.include_router(heroes_router, prefix="/heroes", tags=["heroes"])
@@ -0,0 +1,511 @@
+import io
+import re
+import sys
+import time
+from typing import AsyncIterator, Iterator, Sequence
+
+import state
+import uuid_utils.compat as uuid
+from excepts import InvalidValue
+from models import UUID7, Hero, HeroBulkUpdate, HeroCreate, HeroPublic
+from pydantic import TypeAdapter, ValidationError
+from schemas import HeroImportReport
+from sqlalchemy import (
+    Update,
+    bindparam,
+    cast,
+    column,
+    func,
+    insert,
+    literal_column,
+    table,
+    update,
+    values,
+)
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import SelectOfScalar
+from starlette.concurrency import run_in_threadpool
+from utils.etag import compute_etag
+from utils.pagination import decode_cursor
+from utils.streaming import Record
+
+# Maximum number of rejected records detailed in an import report
+MAX_REPORTED_ERRORS = 100
+# Maximum number of words of a search query
+MAX_SEARCH_TERMS = 8
+# The FTS5 index of the hero names on SQLite, created by the `add hero search` revision
+HERO_SEARCH = table("hero_search", column("rowid"), column("rank"))
+
+# Serializers of the hero responses, validating the ORM objects and dumping JSON in Rust
+HERO_ADAPTER = TypeAdapter(HeroPublic)
+HEROES_ADAPTER = TypeAdapter(list[HeroPublic])
+
+"""
+Hero queries and writes shared by the hero endpoints.
+"""
+
+
+def prefix_upper_bound(prefix: str) -> str | None:
+    """
+    Return the smallest string greater than all the strings starting with `prefix`, or None
+    if there is none, e.g. "Dead" -> "Deae".
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    code_point = ord(prefix[-1]) + 1
+    if 0xD800 <= code_point <= 0xDFFF:
+        # Surrogates can't be encoded in UTF-8: skip to the next code point that can
+        code_point = 0xE000
+    return prefix[:-1] + chr(code_point)
+
+
+def build_heroes_query(
+    offset: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    name: str | None = None,
+    name_prefix: str | None = None,
+    min_age: int | None = None,
+    max_age: int | None = None,
+) -> SelectOfScalar[Hero]:
+    """
+    Build the query returning a page of heroes ordered by ID.
+
+    Hero IDs are UUID7, so ordering by the primary key is also a stable, time-based ordering.
+    With a cursor the query seeks on the primary key index, so the cost of a page doesn't depend
+    on how deep it is, whereas `offset` makes the database scan and discard the skipped rows.
+
+    The filters are ranges on the `(name, id)` and `(age, id)` indexes, so that the database
+    only reads the matching heroes: a name prefix is a range up to `prefix_upper_bound` rather
+    than a LIKE, which neither SQLite nor PostgreSQL (with a non-C collation) run on an index.
+    With a name, the index also returns the heroes in ID order, from the cursor.
+
+    Args:
+        offset (int): Number of heroes to skip, kept for backward compatibility.
+        limit (int): Maximum number of heroes to return.
+        cursor (str | None): The cursor returned with the previous page.
+        name (str | None): Only return the heroes with this name.
+        name_prefix (str | None): Only return the heroes whose name starts with this prefix.
+        min_age (int | None): Only return the heroes at least this old.
+        max_age (int | None): Only return the heroes at most this old.
+
+    Returns:
+        SelectOfScalar[Hero]: The query.
+
+    Raises:
+        InvalidValue: If the cursor is malformed or combined with an offset.
+    """
+    statement = select(Hero).order_by(Hero.id)
+    if cursor is not None:
+        if offset:
+            raise InvalidValue("The offset can't be combined with a cursor")
+        statement = statement.where(Hero.id > decode_cursor(cursor))
+    if name is not None:
+        statement = statement.where(Hero.name == name)
+    if name_prefix:
+        statement = statement.where(Hero.name >= name_prefix)
+        upper_bound = prefix_upper_bound(name_prefix)
+        if upper_bound is not None:
+            statement = statement.where(Hero.name < upper_bound)
+        # Exact on top of the range, whatever the collation of the column
+        statement = statement.where(Hero.name.startswith(name_prefix, autoescape=True))
+    if min_age is not None:
+        statement = statement.where(Hero.age >= min_age)
+    if max_age is not None:
+        statement = statement.where(Hero.age <= max_age)
+    return statement.offset(offset).limit(limit)
+
+
+def build_heroes_search(
+    q: str, limit: int, dialect_name: str
+) -> SelectOfScalar[Hero] | None:
+    """
+    Build the full-text search of the heroes whose name has a word starting with each word of
+    the query, the best matches first.
+
+    The query runs on the text index created by the `add hero search` revision: the FTS5
+    table `hero_search`, ranked by BM25, on SQLite, and the GIN index of the `search_vector`
+    column, ranked by `ts_rank`, on PostgreSQL. The words are extracted from the query, so
+    its operators and quotes are never interpreted.
+
+    Args:
+        q (str): The words to search.
+        limit (int): Maximum number of heroes to return.
+        dialect_name (str): The database, either "postgresql" or "sqlite".
+
+    Returns:
+        SelectOfScalar[Hero] | None: The query, or None if `q` has no word.
+    """
+    terms = re.findall(r"\w+", q.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    if dialect_name == "postgresql":
+        search_vector = literal_column("hero.search_vector")
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        return (
+            select(Hero)
+            .where(search_vector.op("@@")(tsquery))
+            .order_by(func.ts_rank(search_vector, tsquery).desc(), Hero.id)
+            .limit(limit)
+        )
+    return (
+        select(Hero)
+        .join(HERO_SEARCH, HERO_SEARCH.c.rowid == literal_column("hero.rowid"))
+        .where(
+            literal_column("hero_search").op("MATCH")(
+                " ".join(f'"{term}"*' for term in terms)
+            )
+        )
+        .order_by(HERO_SEARCH.c.rank, Hero.id)
+        .limit(limit)
+    )
+
+
+def serialize_hero(hero: Hero) -> bytes:
+    """Serialize a hero to the JSON body of a `HeroPublic` response."""
+    return HERO_ADAPTER.dump_json(
+        HERO_ADAPTER.validate_python(hero, from_attributes=True)
+    )
+
+
+def serialize_heroes(heroes: Sequence[Hero]) -> bytes:
+    """
+    Serialize heroes to the JSON body of a `list[HeroPublic]` response.
+
+    This is the body FastAPI would build from the `response_model`, but pydantic-core goes
+    straight to JSON bytes, without the intermediate Python objects and `json.dumps`.
+    """
+    return HEROES_ADAPTER.dump_json(
+        HEROES_ADAPTER.validate_python(heroes, from_attributes=True)
+    )
+
+
+def build_hero_update(
+    hero_id: UUID7, values: dict, version: int | None = None
+) -> Update:
+    """
+    Build the compare-and-swap UPDATE of a hero, which increments its version and returns it.
+
+    Given the version the update is based on, the UPDATE only matches the row if no other
+    update was committed since, so a concurrent update is detected without locking the row
+    between its read and its write.
+
+    Args:
+        hero_id (UUID7): The ID of the hero.
+        values (dict): The columns to update.
+        version (int | None): The expected current version, or None to update any version.
+
+    Returns:
+        Update: The statement, returning the updated hero, or nothing if the hero doesn't
+            exist or isn't at the expected version.
+    """
+    statement = (
+        update(Hero)
+        .where(Hero.id == hero_id)
+        .values(**values, version=Hero.version + 1)
+        .returning(Hero)
+    )
+    if version is not None:
+        statement = statement.where(Hero.version == version)
+    return statement
+
+
+def heroes_etag(heroes: list[Hero]) -> str:
+    """
+    Compute the ETag of a page of heroes from the public fields of its rows,
+    so that a 304 response doesn't need to serialize the page.
+    """
+    return compute_etag(
+        repr([(hero.id, hero.name, hero.age, hero.version) for hero in heroes]).encode()
+    )
+
+
+def invalidate_cached_hero(hero_id: UUID7) -> None:
+    """
+    Drop a hero from the in-process cache after it was updated or deleted.
+    Must be called after the commit, so that a concurrent read can't cache the previous version.
+    """
+    if state.hero_cache is not None:
+        state.hero_cache.invalidate(hero_id)
+
+
+def insert_heroes(
+    session: Session, heroes: list[HeroCreate], batch_size: int
+) -> list[dict]:
+    """
+    Insert many heroes with one multi-row INSERT per batch, without committing.
+
+    The IDs are generated here, so the inserted rows can be returned without reading them back
+    and without building an ORM object per hero.
+
+    Args:
+        session (Session): The database session.
+        heroes (list[HeroCreate]): The validated heroes to insert.
+        batch_size (int): Maximum number of rows per INSERT statement.
+
+    Returns:
+        list[dict]: The inserted rows, in the same order as `heroes`.
+    """
+    rows = [{**hero.model_dump(), "id": uuid.uuid7(), "version": 1} for hero in heroes]
+    for start in range(0, len(rows), batch_size):
+        session.execute(insert(Hero), rows[start : start + batch_size])
+    return rows
+
+
+def build_heroes_update(fields: tuple[str, ...], rows: list[dict]) -> Update:
+    """
+    Build the UPDATE applying the values of many heroes at once, from a VALUES list joined on
+    the hero IDs, which increments their versions and returns their public columns.
+
+    Args:
+        fields (tuple[str, ...]): The columns to update, the same for every row.
+        rows (list[dict]): The ID and the new values of each hero.
+
+    Returns:
+        Update: The statement.
+    """
+    table = Hero.__table__
+    new_values = values(
+        *(column(name, table.c[name].type) for name in ("id", *fields)),
+        name="new_values",
+    ).data([tuple(row[name] for name in ("id", *fields)) for row in rows])
+    return (
+        update(table)
+        .where(table.c.id == new_values.c.id)
+        .values(
+            # The type of a VALUES column is inferred from its rows, e.g. text for NULLs
+            **{name: cast(new_values.c[name], table.c[name].type) for name in fields},
+            version=table.c.version + 1,
+        )
+        .returning(table.c.id, table.c.name, table.c.age, table.c.version)
+    )
+
+
+def update_heroes(
+    session: Session, heroes: list[HeroBulkUpdate], batch_size: int
+) -> tuple[list[dict], list[UUID7]]:
+    """
+    Update many heroes with set-based statements, without committing or reading them first.
+
+    The heroes setting the same fields are updated together, `batch_size` at a time: with an
+    UPDATE ... FROM (VALUES ...) RETURNING on PostgreSQL, and with an executemany UPDATE on the
+    other databases, which can't return the rows of an executemany. Their updated rows are
+    read afterward with one SELECT per batch, in the same transaction.
+
+    Args:
+        session (Session): The database session.
+        heroes (list[HeroBulkUpdate]): The IDs and the fields to update. The fields of the items
+            sharing an ID are merged, the last one winning.
+        batch_size (int): Maximum number of heroes per statement.
+
+    Returns:
+        tuple[list[dict], list[UUID7]]: The public columns of the updated heroes, and the IDs
+            of the heroes not found, both in the order they were first sent.
+    """
+    changes: dict[UUID7, dict] = {}
+    for hero in heroes:
+        changes.setdefault(hero.id, {}).update(
+            hero.model_dump(exclude_unset=True, exclude={"id"})
+        )
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    for hero_id, hero_values in changes.items():
+        groups.setdefault(tuple(sorted(hero_values)), []).append(
+            {"id": hero_id, **hero_values}
+        )
+
+    table = Hero.__table__
+    is_postgres = session.get_bind().dialect.name == "postgresql"
+    updated = {}
+    for fields, rows in groups.items():
+        if not is_postgres:
+            # The bound parameters can't be named after the updated columns
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("_id", type_=table.c.id.type))
+                .values(
+                    **{
+                        name: bindparam(f"_{name}", type_=table.c[name].type)
+                        for name in fields
+                    },
+                    version=table.c.version + 1,
+                )
+            )
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            if is_postgres:
+                result = session.execute(build_heroes_update(fields, batch))
+                updated.update((row["id"], dict(row)) for row in result.mappings())
+            else:
+                session.execute(
+                    statement,
+                    [
+                        {f"_{name}": value for name, value in row.items()}
+                        for row in batch
+                    ],
+                )
+
+    if not is_postgres:
+        hero_ids = list(changes)
+        for start in range(0, len(hero_ids), batch_size):
+            result = session.execute(
+                select(Hero.id, Hero.name, Hero.age, Hero.version).where(
+                    Hero.id.in_(hero_ids[start : start + batch_size])
+                )
+            )
+            updated.update((row["id"], dict(row)) for row in result.mappings())
+
+    return (
+        [updated[hero_id] for hero_id in changes if hero_id in updated],
+        [hero_id for hero_id in changes if hero_id not in updated],
+    )
+
+
+def export_heroes(session: Session, chunk_size: int) -> Iterator[bytes]:
+    """
+    Stream all the heroes as NDJSON, one `HeroPublic` per line.
+
+    Rows are fetched `chunk_size` at a time through a server-side cursor (`yield_per` implies
+    `stream_results`), and only the public columns are selected so no ORM object is built.
+    Memory stays bounded by the chunk size regardless of the size of the table.
+
+    Args:
+        session (Session): The database session, which must stay open while streaming.
+        chunk_size (int): Number of rows fetched and serialized at a time.
+
+    Yields:
+        bytes: The NDJSON lines of a chunk of heroes.
+    """
+    statement = (
+        select(Hero.id, Hero.name, Hero.age, Hero.version)
+        .order_by(Hero.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for rows in session.exec(statement).partitions():
+        yield b"".join(
+            HeroPublic.model_validate(row, from_attributes=True)
+            .model_dump_json()
+            .encode()
+            + b"\n"
+            for row in rows
+        )
+
+
+def _copy_text(value) -> str:
+    """Escape a value for the text format of the PostgreSQL COPY command."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_heroes(session: Session, heroes: list[HeroCreate]) -> None:
+    """
+    Insert many heroes with the PostgreSQL COPY command, without committing.
+
+    Args:
+        session (Session): A database session bound to PostgreSQL (psycopg2).
+        heroes (list[HeroCreate]): The validated heroes to insert.
+    """
+    buffer = io.StringIO()
+    for hero in heroes:
+        fields = (uuid.uuid7(), hero.name, hero.age, hero.secret_name)
+        buffer.write("\t".join(_copy_text(field) for field in fields) + "\n")
+    buffer.seek(0)
+
+    with session.connection().connection.cursor() as cursor:
+        cursor.copy_expert("COPY hero (id, name, age, secret_name) FROM STDIN", buffer)
+
+
+def write_heroes(session: Session, heroes: list[HeroCreate], batch_size: int) -> int:
+    """
+    Write a chunk of heroes in its own transaction.
+    PostgreSQL uses COPY, the other databases use batched multi-row inserts.
+
+    Args:
+        session (Session): The database session.
+        heroes (list[HeroCreate]): The validated heroes to insert.
+        batch_size (int): Maximum number of rows per INSERT statement.
+
+    Returns:
+        int: The number of heroes written.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        copy_heroes(session, heroes)
+    else:
+        insert_heroes(session, heroes, batch_size=batch_size)
+    session.commit()
+    return len(heroes)
+
+
+def _format_rejection(line: int, error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        reason = "; ".join(
+            f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}"
+            for e in error.errors()
+        )
+    else:
+        reason = str(error)
+    return f"{line}: {reason}"
+
+
+async def import_heroes(
+    session: Session,
+    records: AsyncIterator[Record],
+    chunk_size: int,
+    batch_size: int,
+) -> HeroImportReport:
+    """
+    Validate streamed records against `HeroCreate` and write them chunk by chunk.
+
+    Only one chunk is held in memory at a time and each chunk is committed on its own,
+    so the heroes of the chunks written before a database error are kept.
+    The blocking writes run in the threadpool, while the body is read on the event loop.
+
+    Args:
+        session (Session): The database session.
+        records (AsyncIterator[Record]): The parsed records of the body.
+        chunk_size (int): Number of heroes written per transaction.
+        batch_size (int): Maximum number of rows per INSERT statement.
+
+    Returns:
+        HeroImportReport: Imported and rejected counts, with the import throughput.
+    """
+    start = time.perf_counter()
+    imported = rejected = 0
+    errors = []
+    chunk = []
+
+    async for line, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            chunk.append(HeroCreate.model_validate(record))
+        except ValueError as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(_format_rejection(line, e))
+            continue
+
+        if len(chunk) >= chunk_size:
+            imported += await run_in_threadpool(
+                write_heroes, session, chunk, batch_size
+            )
+            chunk = []
+
+    if chunk:
+        imported += await run_in_threadpool(write_heroes, session, chunk, batch_size)
+
+    elapsed = time.perf_counter() - start
+    return HeroImportReport(
+        imported=imported,
+        rejected=rejected,
+        errors=errors,
+        elapsed=round(elapsed, 3),
+        rows_per_sec=round(imported / elapsed, 1) if elapsed else 0.0,
+    )
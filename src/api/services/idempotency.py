@@ -0,0 +1,94 @@
+from typing import Callable
+
+import state
+from fastapi import Response
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette import status
+from utils.idempotency import IDEMPOTENCY_REPLAYED_HEADER, StoredResponse
+
+"""
+Idempotent writes: the first request sent with an Idempotency-Key runs the write and stores
+its response in the same transaction, and the retries get the stored response.
+"""
+
+
+def replay_response(stored: StoredResponse) -> Response:
+    return Response(
+        stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={IDEMPOTENCY_REPLAYED_HEADER: "true"},
+    )
+
+
+def run_idempotent(
+    session: Session, key: str, fingerprint: str, write: Callable[[], bytes]
+) -> Response:
+    """
+    Run a write once per Idempotency-Key, and replay its response to the retries.
+
+    Requests with the same key wait for each other within the worker. Across workers, the
+    primary key of the stored responses lets a single transaction commit: the others are
+    rolled back and replay the response of the winner.
+
+    Args:
+        session (Session): The database session.
+        key (str): The Idempotency-Key header.
+        fingerprint (str): The fingerprint of the request.
+        write (Callable[[], bytes]): Adds the write to the session, without committing,
+            and returns the JSON body of the response.
+
+    Returns:
+        Response: The response of the write, or the stored one.
+
+    Raises:
+        IdempotencyKeyMismatch: If the key was first used for a different request.
+    """
+    store = state.idempotency_store
+    with store.lock(key):
+        stored = store.load(session, key)
+        if stored is None:
+            store.delete_expired(session, key)
+            response = StoredResponse(fingerprint, status.HTTP_200_OK, write())
+            session.add(store.to_row(key, response))
+            try:
+                session.commit()
+            except IntegrityError:
+                # Committed meanwhile by a request served by another worker
+                session.rollback()
+                stored = store.load(session, key)
+                if stored is None:
+                    raise
+            else:
+                store.remember(key, response)
+                return Response(response.body, media_type="application/json")
+        store.check_replay(stored, fingerprint)
+        return replay_response(stored)
+
+
+async def async_run_idempotent(
+    session: AsyncSession, key: str, fingerprint: str, write: Callable[[], bytes]
+) -> Response:
+    """Same as `run_idempotent`, with an AsyncSession."""
+    store = state.idempotency_store
+    async with store.async_lock(key):
+        stored = await store.async_load(session, key)
+        if stored is None:
+            await store.async_delete_expired(session, key)
+            response = StoredResponse(fingerprint, status.HTTP_200_OK, write())
+            session.add(store.to_row(key, response))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Committed meanwhile by a request served by another worker
+                await session.rollback()
+                stored = await store.async_load(session, key)
+                if stored is None:
+                    raise
+            else:
+                store.remember(key, response)
+                return Response(response.body, media_type="application/json")
+        store.check_replay(stored, fingerprint)
+        return replay_response(stored)
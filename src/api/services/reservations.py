@@ -0,0 +1,239 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+import uuid_utils.compat as uuid
+from excepts import DatabaseEntryNotFound
+from models import UUID7, Resource, ResourceCreate, ResourcePublic, ResourceStatus
+from schemas import ResourceClaim
+from sqlalchemy import Engine, Update, insert, update
+from sqlmodel import Session, select
+from utils.log import get_logger
+
+"""
+Claims of resources: a claim atomically takes up to N available resources for a lease, then
+it is confirmed or released. The claims abandoned by their client are returned to the
+available resources by a reaper once their lease expires.
+
+On PostgreSQL the claims skip the rows locked by the concurrent claims (FOR UPDATE SKIP LOCKED),
+so that many workers claim distinct resources without waiting for each other. SQLite has no
+row locks and a single writer, so the writes of a worker go through a lock instead of
+contending for the database lock, which fails with "database is locked" after the busy timeout.
+"""
+
+logger = get_logger()
+
+_sqlite_writer = threading.Lock()
+
+
+@contextmanager
+def single_writer(session: Session) -> Iterator[None]:
+    """Serialize the writes of the worker to the resources on SQLite, a no-op otherwise."""
+    is_sqlite = session.get_bind().dialect.name == "sqlite"
+    with _sqlite_writer if is_sqlite else nullcontext():
+        yield
+
+
+def build_claim(n: int, claim_token: UUID7, lease_expires_at: float) -> Update:
+    """
+    Build the UPDATE claiming up to `n` available resources, in ID order, and returning them.
+
+    The candidates are locked with SKIP LOCKED, so a concurrent claim takes the next available
+    resources instead of waiting for the transaction that locked these to end. The clause is
+    ignored on SQLite.
+    """
+    candidates = (
+        select(Resource.id)
+        .where(Resource.status == ResourceStatus.AVAILABLE)
+        .order_by(Resource.id)
+        .limit(n)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(Resource)
+        .where(Resource.id.in_(candidates))
+        .values(
+            status=ResourceStatus.CLAIMED,
+            claim_token=claim_token,
+            lease_expires_at=lease_expires_at,
+        )
+        .returning(Resource)
+    )
+
+
+def create_resources(
+    session: Session, resources: list[ResourceCreate], batch_size: int
+) -> list[dict]:
+    """
+    Insert available resources with one multi-row INSERT per batch, and commit.
+
+    Returns:
+        list[dict]: The inserted rows, in the same order as `resources`.
+    """
+    rows = [
+        {
+            **resource.model_dump(),
+            "id": uuid.uuid7(),
+            "status": ResourceStatus.AVAILABLE,
+            "claim_token": None,
+            "lease_expires_at": None,
+        }
+        for resource in resources
+    ]
+    with single_writer(session):
+        for start in range(0, len(rows), batch_size):
+            session.execute(insert(Resource), rows[start : start + batch_size])
+        session.commit()
+    return rows
+
+
+def claim_resources(session: Session, n: int, lease: float) -> ResourceClaim:
+    """
+    Claim up to `n` available resources for `lease` seconds, and commit.
+
+    Args:
+        session (Session): The database session.
+        n (int): Maximum number of resources to claim.
+        lease (float): Seconds during which the resources are held for the claim.
+
+    Returns:
+        ResourceClaim: The token of the claim and its resources, possibly none.
+    """
+    claim_token = uuid.uuid7()
+    lease_expires_at = time.time() + lease
+    with single_writer(session):
+        result = session.exec(build_claim(n, claim_token, lease_expires_at))
+        resources = sorted(result.scalars().all(), key=lambda resource: resource.id)
+        # Read before the commit expires the objects
+        claim = ResourceClaim(
+            claim_token=claim_token,
+            lease_expires_at=lease_expires_at,
+            resources=[
+                ResourcePublic.model_validate(resource) for resource in resources
+            ],
+        )
+        session.commit()
+    return claim
+
+
+def confirm_claim(session: Session, claim_token: UUID7) -> list[ResourcePublic]:
+    """
+    Confirm the resources of a claim whose lease hasn't expired, and commit.
+
+    Raises:
+        DatabaseEntryNotFound: If the claim doesn't exist, expired or was already ended.
+    """
+    statement = (
+        update(Resource)
+        .where(
+            Resource.claim_token == claim_token,
+            Resource.status == ResourceStatus.CLAIMED,
+            Resource.lease_expires_at >= time.time(),
+        )
+        .values(status=ResourceStatus.CONFIRMED, lease_expires_at=None)
+        .returning(Resource)
+    )
+    with single_writer(session):
+        resources = session.exec(statement).scalars().all()
+        if not resources:
+            raise DatabaseEntryNotFound(f"No active claim {claim_token}")
+        confirmed = sorted(
+            (ResourcePublic.model_validate(resource) for resource in resources),
+            key=lambda resource: resource.id,
+        )
+        session.commit()
+    return confirmed
+
+
+def release_claim(session: Session, claim_token: UUID7) -> int:
+    """
+    Return the resources of an unconfirmed claim to the available resources, and commit.
+
+    Returns:
+        int: The number of released resources.
+
+    Raises:
+        DatabaseEntryNotFound: If the claim doesn't exist or was already ended.
+    """
+    statement = (
+        update(Resource)
+        .where(
+            Resource.claim_token == claim_token,
+            Resource.status == ResourceStatus.CLAIMED,
+        )
+        .values(
+            status=ResourceStatus.AVAILABLE, claim_token=None, lease_expires_at=None
+        )
+    )
+    with single_writer(session):
+        released = session.exec(statement).rowcount
+        if not released:
+            raise DatabaseEntryNotFound(f"No active claim {claim_token}")
+        session.commit()
+    return released
+
+
+def reap_expired_claims(session: Session) -> int:
+    """
+    Return the resources of the claims whose lease expired to the available resources,
+    and commit.
+
+    Returns:
+        int: The number of reaped resources.
+    """
+    statement = (
+        update(Resource)
+        .where(
+            Resource.status == ResourceStatus.CLAIMED,
+            Resource.lease_expires_at < time.time(),
+        )
+        .values(
+            status=ResourceStatus.AVAILABLE, claim_token=None, lease_expires_at=None
+        )
+    )
+    with single_writer(session):
+        reaped = session.exec(statement).rowcount
+        session.commit()
+    return reaped
+
+
+class ClaimReaper:
+    """Reaps the expired claims in a background thread."""
+
+    def __init__(self):
+        self.reaped = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def reap(self, engine: Engine) -> int:
+        """Reap the expired claims and return the number of reaped resources."""
+        with Session(engine) as session:
+            reaped = reap_expired_claims(session)
+        self.reaped += reaped
+        if reaped:
+            logger.info(f"Reaped {reaped} resources of expired claims")
+        return reaped
+
+    def start(self, engine: Engine, interval: float) -> None:
+        """Reap the expired claims every `interval` seconds."""
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.reap(engine)
+                except Exception as e:
+                    logger.warning(f"Failed to reap the expired claims: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="claim-reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {"reaped": self.reaped}
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the service.
+Each module can be run on its own from the `src` folder, e.g. `python -m benchmarks.async_vs_sync`.
+"""
@@ -0,0 +1,58 @@
+"""
+Compare the hero insert throughput of single POST /heroes calls and POST /heroes/bulk.
+
+Usage (from the `src` folder):
+    python -m benchmarks.bulk_create --duration 10 --batch 1000
+"""
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from benchmarks.utils import run_load, seed_heroes, serve_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", help="Defaults to a temporary SQLite file.")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=1000, help="Heroes per bulk call")
+    args = parser.parse_args()
+
+    heroes = [
+        {"name": f"Hero {i}", "secret_name": f"Secret {i}", "age": i % 100}
+        for i in range(args.batch)
+    ]
+
+    async def create_one(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/heroes/", json=heroes[i % args.batch])
+
+    async def create_bulk(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/heroes/bulk", json=heroes)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database_url = args.database_url or f"sqlite:///{Path(temp_dir) / 'bench.db'}"
+        seed_heroes(database_url, 0)
+
+        env = {"DATABASE_URL": database_url, "LOG_LEVEL": "WARNING"}
+        with serve_app(env) as base_url:
+            single = run_load(base_url, create_one, args.concurrency, args.duration)
+            bulk = run_load(base_url, create_bulk, args.concurrency, args.duration)
+
+    results = {
+        "single": {**single.summary(), "heroes_per_sec": round(single.rps, 1)},
+        "bulk": {**bulk.summary(), "heroes_per_sec": round(bulk.rps * args.batch, 1)},
+    }
+    print(json.dumps(results, indent=2))
+    speedup = results["bulk"]["heroes_per_sec"] / max(
+        results["single"]["heroes_per_sec"], 1
+    )
+    print(f"Bulk inserts are {speedup:.1f}x faster than single POSTs")
+
+
+if __name__ == "__main__":
+    main()
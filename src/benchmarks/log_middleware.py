@@ -0,0 +1,85 @@
+"""
+Measure the per-request overhead of the access log middleware on a trivial endpoint,
+comparing the former BaseHTTPMiddleware implementation with the pure ASGI one.
+Requests are sent straight to the ASGI app and the logs are formatted but written to /dev/null.
+
+Usage (from the `src` folder):
+    python -m benchmarks.log_middleware --iterations 20000
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from fastapi import FastAPI, Request, Response
+from middlewares.logging import LogMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from utils.log import get_logger
+
+from benchmarks.utils import measure_asgi
+
+logger = get_logger()
+
+
+class BaseHTTPLogMiddleware(BaseHTTPMiddleware):
+    """The former implementation of LogMiddleware, kept as the baseline."""
+
+    async def dispatch(self, request: Request, call_next):
+        logger.info(
+            "Request",
+            extra={"request": {"method": request.method, "url": str(request.url)}},
+        )
+        start_time = time.time()
+        response: Response = await call_next(request)
+        process_time = time.time() - start_time
+        logger.info(
+            "Response",
+            extra={
+                "request": {"method": request.method, "url": str(request.url)},
+                "response": {"status_code": response.status_code},
+                "process_time": process_time,
+            },
+        )
+        return response
+
+
+def create_app(middleware_class=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def read_root():
+        return {"message": "benchmark"}
+
+    if middleware_class:
+        app.add_middleware(middleware_class)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    logging.root.setLevel(logging.INFO)
+    devnull = open(os.devnull, "w")
+    for handler in logging.root.handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+
+    baseline = measure_asgi(create_app(), "/", args.iterations)
+    results = {
+        "no middleware": baseline,
+        "BaseHTTPMiddleware": measure_asgi(
+            create_app(BaseHTTPLogMiddleware), "/", args.iterations
+        ),
+        "pure ASGI": measure_asgi(create_app(LogMiddleware), "/", args.iterations),
+    }
+
+    print(f"{'middleware':<20} {'us/request':>12} {'overhead us':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<20} {seconds * 1e6:>12.1f} {(seconds - baseline) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
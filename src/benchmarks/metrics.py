@@ -0,0 +1,55 @@
+"""
+Measure the cost of recording request metrics: a single `observe_request` call on the hot
+path, and the per-request overhead of MetricsMiddleware on a trivial endpoint.
+
+Usage (from the `src` folder):
+    python -m benchmarks.metrics --iterations 1000000
+"""
+
+import argparse
+import timeit
+
+from fastapi import FastAPI
+from middlewares.metrics import MetricsMiddleware
+from utils.metrics import MetricsRecorder
+
+from benchmarks.utils import measure_asgi
+
+
+def create_app(recorder: MetricsRecorder | None = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    if recorder:
+        app.add_middleware(MetricsMiddleware, recorder=recorder)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    recorder = MetricsRecorder()
+    seconds = timeit.timeit(
+        lambda: recorder.observe_request("GET", "/items/{item_id}", "200", 0.012),
+        number=args.iterations,
+    )
+    print(f"observe_request: {seconds / args.iterations * 1e9:.0f} ns/call")
+
+    baseline = measure_asgi(create_app(), "/items/1", args.requests)
+    with_metrics = measure_asgi(
+        create_app(MetricsRecorder()), "/items/1", args.requests
+    )
+    print(
+        f"MetricsMiddleware: {(with_metrics - baseline) * 1e6:.1f} us/request overhead "
+        f"({baseline * 1e6:.1f} us without, {with_metrics * 1e6:.1f} us with)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measure the overhead of each layer of the middleware stack of the application, by sending
+requests straight to every layer, from the outermost to the innermost, and subtracting the time
+of the next one. The public path goes through every layer, while the internal paths (see
+INTERNAL_PATH_PREFIXES) skip the access log and CORS: they are also measured through the
+full stack, to show what they save. The logs are formatted but written to /dev/null.
+
+Usage (from the `src` folder):
+    python -m benchmarks.middleware_stack --iterations 5000 --repeat 5
+"""
+
+import argparse
+import logging
+import os
+
+from middlewares.internal_paths import InternalPathsMiddleware
+from starlette.routing import Router
+from starlette.types import ASGIApp
+
+from benchmarks.utils import BENCHMARK_API_KEY, measure_asgi
+
+
+def get_layers(app: ASGIApp, path: str) -> list[ASGIApp]:
+    """
+    Return the layers of the middleware stack crossed by a request, from the outermost to
+    the one wrapping the router, whose time includes the routing and the endpoint.
+
+    Args:
+        app (ASGIApp): The outermost layer.
+        path (str): The path of the request.
+    """
+    layers = []
+    while True:
+        layers.append(app)
+        # The endpoints need the exit stack set by the innermost middleware of FastAPI
+        if isinstance(app.app, Router):
+            return layers
+        if isinstance(app, InternalPathsMiddleware) and app.is_internal(path):
+            app = app.internal_app
+        else:
+            app = app.app
+
+
+def measure_layers(layers: list[ASGIApp], path: str, iterations: int, repeat: int):
+    """Return the best time per request of each layer over `repeat` interleaved runs."""
+    times = [float("inf")] * len(layers)
+    for _ in range(repeat):
+        for i, layer in enumerate(layers):
+            times[i] = min(times[i], measure_asgi(layer, path, iterations))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--path", default="/", help="A public path")
+    parser.add_argument("--internal-path", default="/health/liveness")
+    args = parser.parse_args()
+
+    # The settings are read when the app is imported
+    os.environ["API_KEY"] = BENCHMARK_API_KEY
+    from main import app
+
+    logging.root.setLevel(logging.INFO)
+    devnull = open(os.devnull, "w")
+    for handler in logging.root.handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+
+    stack = app.build_middleware_stack()
+    # A second stack, where the internal paths go through every middleware
+    full_stack = app.build_middleware_stack()
+    for layer in get_layers(full_stack, args.path):
+        if isinstance(layer, InternalPathsMiddleware):
+            layer.paths, layer.prefixes = frozenset(), ()
+
+    runs = [
+        (args.path, args.path, stack),
+        (args.internal_path, args.internal_path, stack),
+        (f"{args.internal_path} (full stack)", args.internal_path, full_stack),
+    ]
+    for label, path, outermost in runs:
+        layers = get_layers(outermost, path)
+        times = measure_layers(layers, path, args.iterations, args.repeat)
+        print(f"\n{label}: {times[0] * 1e6:.1f} us/request")
+        print(f"{'layer':<32} {'us/request':>12} {'overhead us':>12}")
+        for layer, seconds, next_seconds in zip(layers, times, times[1:] + [0.0]):
+            print(
+                f"{type(layer).__name__:<32} {seconds * 1e6:>12.1f} "
+                f"{(seconds - next_seconds) * 1e6:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
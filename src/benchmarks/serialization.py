@@ -0,0 +1,63 @@
+"""
+Compare the serialization of a page of heroes by the `response_model` of FastAPI (validate,
+dump to JSON-compatible Python objects, then `json.dumps`) with `serialize_heroes`, which
+dumps straight to JSON bytes in pydantic-core. The heroes are built in memory, so the
+database is not measured.
+
+Usage (from the `src` folder):
+    python -m benchmarks.serialization --sizes 100 10000
+"""
+
+import argparse
+import json
+import timeit
+
+from api.services.heroes import HEROES_ADAPTER, serialize_heroes
+from models import Hero
+
+
+def serialize_heroes_response_model(heroes: list[Hero]) -> bytes:
+    """What FastAPI does with the `list[HeroPublic]` response model and a JSONResponse."""
+    heroes_public = HEROES_ADAPTER.validate_python(heroes, from_attributes=True)
+    content = HEROES_ADAPTER.dump_python(heroes_public, mode="json")
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'heroes':>8} {'response_model ms':>18} {'dump_json ms':>13} {'speedup':>8}"
+    )
+    for size in args.sizes:
+        heroes = [
+            Hero(name=f"Hero {i}", secret_name=f"Secret {i}", age=i % 100)
+            for i in range(size)
+        ]
+        assert json.loads(serialize_heroes(heroes)) == json.loads(
+            serialize_heroes_response_model(heroes)
+        )
+
+        number = max(1, 100_000 // size)
+        results = []
+        for serialize in (serialize_heroes_response_model, serialize_heroes):
+            seconds = min(
+                timeit.repeat(
+                    lambda: serialize(heroes), number=number, repeat=args.repeat
+                )
+            )
+            results.append(seconds / number)
+
+        before, after = results
+        print(
+            f"{size:>8} {before * 1000:>18.3f} {after * 1000:>13.3f} {before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Generator
+
+import httpx
+from fastapi import FastAPI
+from models import Hero
+from sqlmodel import Session, SQLModel, create_engine
+from starlette.types import ASGIApp, Message
+
+"""
+Helpers shared by the benchmarks: a local uvicorn server, data seeding, an HTTP load generator
+and a driver calling ASGI apps directly, without network.
+"""
+
+SRC_PATH = Path(__file__).parents[1]
+# API key of the benchmark servers, for the protected endpoints
+BENCHMARK_API_KEY = "benchmark"
+
+RequestFactory = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class LoadResult:
+    """Outcome of a load run at a given concurrency level."""
+
+    concurrency: int
+    duration: float
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Return the q-th percentile (0-100) of the latencies in milliseconds."""
+        return percentile(self.latencies, q) * 1000
+
+    def summary(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.rps, 1),
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+        }
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Compute the q-th percentile (0-100) using the nearest-rank method.
+
+    Args:
+        values (list[float]): The sample.
+        q (float): The percentile to compute.
+
+    Returns:
+        float: The percentile value, or 0.0 for an empty sample.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve_app(
+    env: dict[str, str] | None = None, timeout: float = 30.0
+) -> Generator[str, None, None]:
+    """
+    Run the application with a single uvicorn worker in a subprocess.
+
+    Args:
+        env (dict[str, str]): Environment variables overriding the settings of the server.
+        timeout (float): Seconds to wait for the server to become healthy.
+
+    Yields:
+        str: The base URL of the server.
+    """
+    port = get_free_port()
+    server_env = {**os.environ, "API_KEY": BENCHMARK_API_KEY, **(env or {})}
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        cwd=SRC_PATH,
+        env=server_env,
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if httpx.get(f"{base_url}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("The benchmark server failed to start")
+            time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def seed_heroes(database_url: str, count: int) -> list[str]:
+    """
+    Create the tables and insert `count` heroes.
+
+    Args:
+        database_url (str): The sync database URL.
+        count (int): Number of heroes to insert.
+
+    Returns:
+        list[str]: The IDs of the inserted heroes.
+    """
+    engine = create_engine(database_url)
+    SQLModel.metadata.create_all(engine)
+    heroes = [
+        Hero(name=f"Hero {i}", secret_name=f"Secret {i}", age=i % 100)
+        for i in range(count)
+    ]
+    hero_ids = [str(hero.id) for hero in heroes]
+    with Session(engine) as session:
+        session.add_all(heroes)
+        session.commit()
+    engine.dispose()
+    return hero_ids
+
+
+async def _run_load(
+    base_url: str,
+    make_request: RequestFactory,
+    concurrency: int,
+    duration: float,
+    app: FastAPI | None = None,
+) -> LoadResult:
+    result = LoadResult(concurrency=concurrency, duration=duration)
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    counter = iter(range(sys.maxsize))
+
+    async with AsyncExitStack() as stack:
+        transport = None
+        if app is not None:
+            # Run the startup and shutdown of the app in the event loop of the load
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(
+                base_url=base_url, limits=limits, timeout=60, transport=transport
+            )
+        )
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                request_start = time.perf_counter()
+                try:
+                    response = await make_request(client, next(counter))
+                    if response.status_code >= 400:
+                        result.errors += 1
+                except httpx.HTTPError:
+                    result.errors += 1
+                result.latencies.append(time.perf_counter() - request_start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        result.duration = time.perf_counter() - start
+
+    return result
+
+
+def run_load(
+    base_url: str,
+    make_request: RequestFactory,
+    concurrency: int,
+    duration: float,
+    app: FastAPI | None = None,
+) -> LoadResult:
+    """
+    Run `concurrency` clients in a closed loop against the server for `duration` seconds.
+
+    Args:
+        base_url (str): The base URL of the server.
+        make_request (RequestFactory): Sends one request given the client and a sequence number.
+        concurrency (int): Number of concurrent clients.
+        duration (float): Duration of the run in seconds.
+        app (FastAPI | None): Serve the requests in-process with this app instead of sending
+            them to `base_url`. Its lifespan runs for the duration of the load.
+
+    Returns:
+        LoadResult: The measured latencies and errors.
+    """
+    return asyncio.run(_run_load(base_url, make_request, concurrency, duration, app))
+
+
+async def call_asgi(app: ASGIApp, path: str, method: str = "GET") -> int:
+    """
+    Send one request straight to an ASGI app and drain the response.
+
+    Args:
+        app (ASGIApp): The application, or any layer of its middleware stack.
+        path (str): The path of the request.
+        method (str): The HTTP method.
+
+    Returns:
+        int: The status code of the response.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"benchmark"), (b"origin", b"http://localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+        "state": {},
+    }
+    status_code = 0
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+
+async def _measure_asgi(app: ASGIApp, path: str, iterations: int) -> float:
+    # Warm up caches, e.g. the route lookup and the response model serializer
+    for _ in range(min(iterations, 100)):
+        await call_asgi(app, path)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await call_asgi(app, path)
+    return (time.perf_counter() - start) / iterations
+
+
+def measure_asgi(app: ASGIApp, path: str, iterations: int = 10_000) -> float:
+    """
+    Measure the mean time of a request sent straight to an ASGI app.
+
+    Args:
+        app (ASGIApp): The application, or any layer of its middleware stack.
+        path (str): The path of the request.
+        iterations (int): Number of sequential requests.
+
+    Returns:
+        float: Seconds per request.
+    """
+    return asyncio.run(_measure_asgi(app, path, iterations))
@@ -0,0 +1,86 @@
+"""
+Compare the former UUID7 type, validated and serialized by Python functions, with the
+current one based on the native `uuid` core schema: validating a path parameter, both
+alone and through a FastAPI route, and dumping 10k IDs to JSON.
+
+Usage (from the `src` folder):
+    python -m benchmarks.uuid7 --iterations 100000 --ids 10000
+"""
+
+import argparse
+import timeit
+from typing import Annotated
+
+import uuid_utils.compat as uuid
+from fastapi import FastAPI
+from models import UUID7, validate_uuid
+from pydantic import GetPydanticSchema, TypeAdapter
+from pydantic_core import core_schema
+from uuid_utils.compat import UUID
+
+from benchmarks.utils import measure_asgi
+
+# The former implementation of UUID7, kept as the baseline
+FormerUUID7 = Annotated[
+    UUID,
+    GetPydanticSchema(
+        get_pydantic_core_schema=lambda _, handler: (
+            core_schema.with_info_plain_validator_function(
+                lambda val, info: validate_uuid(
+                    UUID(val) if info.mode == "json" else val, version=7
+                ),
+                serialization=core_schema.plain_serializer_function_ser_schema(
+                    lambda val, info: str(val) if info.mode == "json" else val,
+                    info_arg=True,
+                ),
+            )
+        ),
+    ),
+]
+
+
+def create_app(id_type) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/heroes/{hero_id}")
+    async def read_hero(hero_id: id_type):
+        return None
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--ids", type=int, default=10_000)
+    args = parser.parse_args()
+
+    ids = [uuid.uuid7() for _ in range(args.ids)]
+    path_param = str(ids[0])
+
+    print(
+        f"{'UUID7':<8} {'validate us':>12} {'route us':>10} {f'dump {args.ids} ms':>14}"
+    )
+    for name, id_type in (("former", FormerUUID7), ("current", UUID7)):
+        adapter = TypeAdapter(id_type)
+        list_adapter = TypeAdapter(list[id_type])
+        validate = min(
+            timeit.repeat(
+                lambda: adapter.validate_python(path_param),
+                number=args.iterations,
+                repeat=3,
+            )
+        )
+        route = measure_asgi(
+            create_app(id_type), f"/heroes/{path_param}", args.requests
+        )
+        dump = min(timeit.repeat(lambda: list_adapter.dump_json(ids), number=10))
+        print(
+            f"{name:<8} {validate / args.iterations * 1e6:>12.2f} {route * 1e6:>10.1f} "
+            f"{dump / 10 * 1000:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
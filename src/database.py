@@ -1,24 +1,126 @@
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+
 from config import settings
-from sqlalchemy import Engine, text
+from sqlalchemy import URL, Engine, exc, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import SQLModel, create_engine
 from utils.log import get_logger
+from utils.query_stats import instrument_engine
 
 logger = get_logger()
 
+# Async drivers used for each database backend when DATABASE_ASYNC is enabled.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class CheckoutTimer:
+    """
+    Pool mixin measuring how long the checkouts wait for a connection, including the time
+    to open a new one, and how many give up after `pool_timeout` seconds.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = 0.0
+        self.checkout_wait_max = 0.0
+        self.checkout_timeouts = 0
+        self._timer_lock = threading.Lock()
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            wait = time.perf_counter() - start_time
+            with self._timer_lock:
+                self.checkout_wait += wait
+                self.checkout_wait_max = max(self.checkout_wait_max, wait)
+                self.checkout_timeouts += timed_out
+
+    def checkout_stats(self) -> dict:
+        """Return the total and maximum checkout wait, in seconds, and the timeouts."""
+        with self._timer_lock:
+            return {
+                "checkout_wait_seconds": self.checkout_wait,
+                "checkout_wait_max_seconds": self.checkout_wait_max,
+                "checkout_timeouts": self.checkout_timeouts,
+            }
+
+
+class TimedQueuePool(CheckoutTimer, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(CheckoutTimer, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_database_type(url: str | None = None) -> str:
+    """
+    Return the database backend of a URL.
+
+    Args:
+        url (str | None): The database URL. Defaults to DATABASE_URL.
+
+    Returns:
+        str: Either "postgresql" or "sqlite".
+    """
+    url = url or settings.DATABASE_URL
+    return "postgresql" if url.startswith("postgresql") else "sqlite"
+
+
+def get_pool_options(url: URL, pool_class: type[CheckoutTimer]) -> dict:
+    """
+    Return the connection pool arguments of `create_engine` configured in the settings.
+
+    Args:
+        url (URL): The database URL.
+        pool_class (type[CheckoutTimer]): The queue pool class of the engine.
+
+    Returns:
+        dict: The pool arguments. In-memory SQLite databases keep the default pool of their
+            dialect, since every connection would open a different database.
+    """
+    options = {
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+    }
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+    return {
+        **options,
+        "poolclass": pool_class,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        "pool_use_lifo": settings.DATABASE_POOL_USE_LIFO,
+    }
 
-def create_db_engine(verbose: bool = False, **kwargs):
+
+def create_db_engine(verbose: bool = False, database_url: str | None = None, **kwargs):
     """
     Create the SQLAlchemy engine for database interactions.
 
     Args:
         verbose (bool): If True, enables SQL query logging.
+        database_url (str | None): The database URL, e.g. of a replica. Defaults to DATABASE_URL.
         **kwargs: Additional keyword arguments for the engine.
     Returns:
         engine: The SQLAlchemy engine instance.
     """
-    database_type = (
-        "postgresql" if settings.DATABASE_URL.startswith("postgresql") else "sqlite"
-    )
+    database_url = database_url or settings.DATABASE_URL
+    database_type = get_database_type(database_url)
     logger.info(f"Initialized a {database_type} database engine.")
 
     connect_args = {}
@@ -27,16 +129,53 @@ def create_db_engine(verbose: bool = False, **kwargs):
     if database_type == "sqlite":
         connect_args["check_same_thread"] = False
 
+    url = make_url(database_url)
     engine = create_engine(
-        settings.DATABASE_URL,
+        url,
         connect_args=connect_args,
         **{
             "echo": verbose,
-            "pool_use_lifo": True,  # Avoid many idle connections
-            "pool_pre_ping": True,  # Gracefully handle connections closed by the server
+            **get_pool_options(url, TimedQueuePool),
             **kwargs,
         },
     )
+    if settings.DATABASE_INSTRUMENTATION:
+        instrument_engine(engine)
+    return engine
+
+
+def create_async_db_engine(
+    verbose: bool = False, database_url: str | None = None, **kwargs
+) -> AsyncEngine:
+    """
+    Create the SQLAlchemy async engine used by the `async def` endpoints.
+
+    The DATABASE_URL driver is swapped for its asyncio counterpart, so the same setting
+    drives both engines (e.g. postgresql:// -> postgresql+asyncpg://).
+
+    Args:
+        verbose (bool): If True, enables SQL query logging.
+        database_url (str | None): The database URL, e.g. of a replica. Defaults to DATABASE_URL.
+        **kwargs: Additional keyword arguments for the engine.
+    Returns:
+        engine: The SQLAlchemy async engine instance.
+    """
+    database_url = database_url or settings.DATABASE_URL
+    database_type = get_database_type(database_url)
+    logger.info(f"Initialized a {database_type} async database engine.")
+
+    url = make_url(database_url).set(drivername=ASYNC_DRIVERS[database_type])
+
+    engine = create_async_engine(
+        url,
+        **{
+            "echo": verbose,
+            **get_pool_options(url, TimedAsyncAdaptedQueuePool),
+            **kwargs,
+        },
+    )
+    if settings.DATABASE_INSTRUMENTATION:
+        instrument_engine(engine.sync_engine)
     return engine
 
 
@@ -73,6 +212,93 @@ def check_health_safe(engine: Engine) -> bool:
         return False
 
 
+@dataclass
+class Replica:
+    """A read replica, with the engines of the sync and async endpoints."""
+
+    url: str
+    engine: Engine
+    async_engine: AsyncEngine | None = None
+    healthy: bool = True
+
+
+class ReplicaRouter:
+    """
+    Spreads the reads over the healthy read replicas, in round-robin.
+
+    A background thread checks the health of the replicas every `health_interval` seconds.
+    When none of them is healthy, `get_replica` returns None and the reads go to the primary.
+    """
+
+    def __init__(self, urls: list[str], use_async: bool, health_interval: float):
+        """
+        Args:
+            urls (list[str]): The URLs of the replicas.
+            use_async (bool): Whether to create the async engines as well.
+            health_interval (float): Seconds between two health checks.
+        """
+        self.replicas = [
+            Replica(
+                url=url,
+                engine=create_db_engine(database_url=url),
+                async_engine=create_async_db_engine(database_url=url)
+                if use_async
+                else None,
+            )
+            for url in urls
+        ]
+        self.health_interval = health_interval
+        self._healthy = list(self.replicas)
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._checker: threading.Thread | None = None
+
+    def get_replica(self) -> Replica | None:
+        """Return the next healthy replica, or None if there is none."""
+        # The list is replaced, never modified, by the health checks
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def check_health(self) -> None:
+        """Check every replica and only route the reads to the healthy ones."""
+        for replica in self.replicas:
+            healthy = check_health_safe(replica.engine)
+            url = make_url(replica.url).render_as_string()
+            if healthy and not replica.healthy:
+                logger.info(f"Read replica {url} is healthy again")
+            elif not healthy and replica.healthy:
+                logger.warning(f"Read replica {url} failed its health check")
+            replica.healthy = healthy
+        self._healthy = [replica for replica in self.replicas if replica.healthy]
+
+    def start(self) -> None:
+        """Check the health of the replicas now, then in a background thread."""
+        self.check_health()
+
+        def run():
+            while not self._stop.wait(self.health_interval):
+                self.check_health()
+
+        self._stop.clear()
+        self._checker = threading.Thread(
+            target=run, name="replica-health-checker", daemon=True
+        )
+        self._checker.start()
+
+    async def dispose(self) -> None:
+        """Stop the health checks and close the connections of the replicas."""
+        if self._checker is not None:
+            self._stop.set()
+            self._checker.join()
+            self._checker = None
+        for replica in self.replicas:
+            replica.engine.dispose()
+            if replica.async_engine is not None:
+                await replica.async_engine.dispose()
+
+
 def create_db_and_tables(engine: Engine):
     """
     Create database tables based on the defined SQLModel models.
@@ -42,6 +42,51 @@ class InvalidValue(BackendException):
     http_status_code: int = status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+class UnsupportedMediaType(BackendException):
+    """
+    Raised when the request body is in a format that isn't supported.
+    """
+
+    default_message = "The media type of the request body is not supported"
+    http_status_code: int = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+
+class ContentTooLarge(BackendException):
+    """
+    Raised when a part of the request body exceeds the size that can be held in memory.
+    """
+
+    default_message = "The request body has a part that is too large"
+    http_status_code: int = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+class PreconditionFailed(BackendException):
+    """
+    Raised when a conditional request doesn't match the current state of a resource.
+    """
+
+    default_message = "The resource has been modified since it was last retrieved"
+    http_status_code: int = status.HTTP_412_PRECONDITION_FAILED
+
+
+class Conflict(BackendException):
+    """
+    Raised when a write is based on a version of a resource that has since been modified.
+    """
+
+    default_message = "The resource has been modified by another request"
+    http_status_code: int = status.HTTP_409_CONFLICT
+
+
+class IdempotencyKeyMismatch(BackendException):
+    """
+    Raised when an Idempotency-Key is reused for a request that differs from the first one.
+    """
+
+    default_message = "The Idempotency-Key was already used for a different request"
+    http_status_code: int = status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 class DatabaseException(BackendException): ...
 
 
@@ -62,6 +107,19 @@ ERRORS = {
     InvalidValue: ErrorContent(
         InvalidValue.default_message, InvalidValue.http_status_code
     ),
+    UnsupportedMediaType: ErrorContent(
+        UnsupportedMediaType.default_message, UnsupportedMediaType.http_status_code
+    ),
+    ContentTooLarge: ErrorContent(
+        ContentTooLarge.default_message, ContentTooLarge.http_status_code
+    ),
+    PreconditionFailed: ErrorContent(
+        PreconditionFailed.default_message, PreconditionFailed.http_status_code
+    ),
+    Conflict: ErrorContent(Conflict.default_message, Conflict.http_status_code),
+    IdempotencyKeyMismatch: ErrorContent(
+        IdempotencyKeyMismatch.default_message, IdempotencyKeyMismatch.http_status_code
+    ),
     DatabaseEntryNotFound: ErrorContent(
         DatabaseEntryNotFound.default_message,
         DatabaseEntryNotFound.http_status_code,
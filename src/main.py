@@ -5,14 +5,25 @@ import state
 import uvicorn
 from api.exception_handlers import validation_exception_handler
 from api.router import router
+from api.services.reservations import ClaimReaper
 from config import init_whatever, settings
-from database import create_db_engine
+from database import ReplicaRouter, create_async_db_engine, create_db_engine
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from middlewares.internal_paths import InternalPathsMiddleware
 from middlewares.logging import LogMiddleware
+from middlewares.metrics import MetricsMiddleware
+from middlewares.query_stats import QueryStatsMiddleware
+from middlewares.read_your_writes import ReadYourWritesMiddleware
 from pydantic import ValidationError
+from starlette.middleware import Middleware
+from utils import metrics
+from utils.cache import TTLCache
+from utils.health import HealthMonitor
+from utils.idempotency import IdempotencyStore
 from utils.log import get_logger
+from utils.pagination import NEXT_CURSOR_HEADER
 
 logger = get_logger()
 
@@ -26,23 +37,96 @@ async def lifespan(app: FastAPI):
     # https://github.com/fastapi/fastapi/discussions/13029
 
     state.engine = create_db_engine()
+    if settings.DATABASE_ASYNC:
+        state.async_engine = create_async_db_engine()
+    if settings.HERO_CACHE_MAX_ENTRIES > 0:
+        state.hero_cache = TTLCache(
+            max_entries=settings.HERO_CACHE_MAX_ENTRIES, ttl=settings.HERO_CACHE_TTL
+        )
+    state.idempotency_store = IdempotencyStore(
+        ttl=settings.IDEMPOTENCY_TTL,
+        max_entries=settings.IDEMPOTENCY_CACHE_MAX_ENTRIES,
+    )
+    state.idempotency_store.start(state.engine, settings.IDEMPOTENCY_PURGE_INTERVAL)
+    state.claim_reaper = ClaimReaper()
+    state.claim_reaper.start(state.engine, settings.RESERVATION_REAP_INTERVAL)
+    if settings.DATABASE_REPLICA_URLS:
+        state.replicas = ReplicaRouter(
+            settings.DATABASE_REPLICA_URLS,
+            use_async=settings.DATABASE_ASYNC,
+            health_interval=settings.DATABASE_REPLICA_HEALTH_INTERVAL,
+        )
+        state.replicas.start()
+    state.health_monitor = HealthMonitor(
+        # A single dedicated connection, so that the probes never wait for the pools
+        probe_engine=create_db_engine(pool_size=1, max_overflow=0),
+        engines=[
+            state.engine,
+            *([state.async_engine.sync_engine] if state.async_engine else []),
+        ],
+        interval=settings.HEALTH_CHECK_INTERVAL,
+        window=settings.HEALTH_LATENCY_WINDOW,
+        latency_threshold=settings.HEALTH_DB_LATENCY_THRESHOLD,
+    )
+    state.health_monitor.start()
+    # The pool statistics are reported by /metrics and /stats/pool
+    metrics.recorder.watch_pool(state.engine, "sync")
+    if state.async_engine:
+        metrics.recorder.watch_pool(state.async_engine.sync_engine, "async")
+    for i, replica in enumerate(state.replicas.replicas if state.replicas else []):
+        metrics.recorder.watch_pool(replica.engine, f"replica-{i}")
+        if replica.async_engine:
+            metrics.recorder.watch_pool(
+                replica.async_engine.sync_engine, f"replica-{i}-async"
+            )
+    if settings.METRICS_DIR:
+        metrics.recorder.start(settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL)
     yield
 
     # Clean up
+    if state.health_monitor:
+        state.health_monitor.stop()
+    if state.idempotency_store:
+        state.idempotency_store.stop()
+    if state.claim_reaper:
+        state.claim_reaper.stop()
+    if settings.METRICS_DIR:
+        metrics.recorder.stop(settings.METRICS_DIR)
     if state.engine:
         state.engine.dispose()
         logger.info("Database engine disposed")
+    if state.async_engine:
+        await state.async_engine.dispose()
+        logger.info("Async database engine disposed")
+    if state.replicas:
+        await state.replicas.dispose()
+        logger.info("Read replica engines disposed")
 
 
 app = FastAPI(title=settings.SERVICE_NAME, version="0.1.0", lifespan=lifespan)
+# The internal paths (probes, scrapes) skip the access log and CORS
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    InternalPathsMiddleware,
+    middlewares=[
+        Middleware(LogMiddleware),
+        Middleware(
+            CORSMiddleware,
+            allow_origins=settings.ORIGINS,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+            expose_headers=["ETag", NEXT_CURSOR_HEADER],
+        ),
+    ],
+    prefixes=settings.INTERNAL_PATH_PREFIXES,
 )
-app.add_middleware(LogMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if settings.DATABASE_REPLICA_URLS and settings.READ_YOUR_WRITES_WINDOW > 0:
+    app.add_middleware(ReadYourWritesMiddleware)
+if settings.DATABASE_INSTRUMENTATION:
+    # Outermost, so that the access log and the metrics see the queries of the request
+    app.add_middleware(QueryStatsMiddleware)
 
 app.include_router(router)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -57,10 +141,14 @@ async def read_root():
 # Note: A single Uvicorn worker is probably what you would want to use when using a distributed container management system like Kubernetes.
 
 if __name__ == "__main__":
+    workers = max(1, os.cpu_count() - 1)
+    if workers > 1:
+        # The workers share their metrics and pool statistics through this directory
+        metrics.prepare_metrics_dir()
     uvicorn.run(
         app="main:app",
         host=settings.HOST,
         port=settings.PORT,
         log_config=None,
-        workers=max(1, os.cpu_count() - 1),
+        workers=workers,
     )
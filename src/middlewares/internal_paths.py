@@ -0,0 +1,45 @@
+from typing import Sequence
+
+from starlette.middleware import Middleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class InternalPathsMiddleware:
+    """
+    Pure ASGI middleware serving the internal paths, e.g. the health probes and the metrics
+    scrapes, with a minimal stack.
+
+    It wraps the given middlewares once at startup, so a request either goes through all of
+    them or, if its path starts with one of the prefixes, straight to the wrapped app. The
+    only cost per request is a prefix check.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        middlewares: Sequence[Middleware],
+        prefixes: Sequence[str],
+    ):
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            middlewares (Sequence[Middleware]): The middlewares skipped by the internal
+                paths, from the outermost to the innermost.
+            prefixes (Sequence[str]): The path prefixes of the internal endpoints.
+        """
+        self.internal_app = app
+        for cls, args, kwargs in reversed(middlewares):
+            app = cls(app, *args, **kwargs)
+        self.app = app
+        # "/health" matches "/health" and "/health/liveness", but not "/healthy"
+        self.paths = frozenset(prefixes)
+        self.prefixes = tuple(f"{prefix.rstrip('/')}/" for prefix in prefixes)
+
+    def is_internal(self, path: str) -> bool:
+        return path in self.paths or path.startswith(self.prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and self.is_internal(scope["path"]):
+            await self.internal_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
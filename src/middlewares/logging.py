@@ -1,51 +1,134 @@
+import logging
+import random
 import time
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from config import settings
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from utils.log import get_logger
+from utils.query_stats import current_query_stats
 
 logger = get_logger()
 
 
-class LogMiddleware(BaseHTTPMiddleware):
+def get_url(scope: Scope) -> str:
     """
-    FastAPI middleware to log the incoming requests and their corresponding responses.
+    Rebuild the URL of the request from the ASGI scope, without building a `Request`.
+
+    Args:
+        scope (Scope): The ASGI scope of the request.
+
+    Returns:
+        str: The full URL, e.g. http://localhost:8080/heroes/?limit=10.
     """
+    host = None
+    for key, value in scope["headers"]:
+        if key == b"host":
+            host = value.decode("latin-1")
+            break
+    if host is None and scope.get("server"):
+        server_host, server_port = scope["server"]
+        host = f"{server_host}:{server_port}"
 
-    async def dispatch(self, request: Request, call_next):
-        """
-        Logs the incoming request and its response.
+    scheme = scope.get("scheme", "http")
+    path = scope.get("root_path", "") + scope["path"]
+    url = f"{scheme}://{host}{path}"
+    query_string = scope.get("query_string")
+    if query_string:
+        url += f"?{query_string.decode('latin-1')}"
+    return url
 
-        Args:
-            request (Request): The incoming request.
-            call_next: The next middleware in the chain.
 
-        Returns:
-            Response: The response from the next middleware in the chain.
+def get_database_stats() -> dict | None:
+    """
+    Return the query count and database time of the current request, if collected by
+    `QueryStatsMiddleware`.
+    """
+    stats = current_query_stats.get()
+    if stats is None:
+        return None
+    return {"queries": stats.count, "time": stats.duration}
+
+
+class LogMiddleware:
+    """
+    Pure ASGI middleware that writes one access log record per request, once the response
+    has been sent.
+
+    Unlike a `BaseHTTPMiddleware`, it doesn't wrap the response in a new task and memory
+    stream: messages are passed straight through, so streaming responses are not buffered.
+
+    Successful requests can be sampled, while failed (status >= 400) and slow requests are
+    always logged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = settings.LOG_ACCESS_SAMPLE_RATE,
+        slow_request_threshold: float = settings.LOG_SLOW_REQUEST_THRESHOLD,
+    ):
         """
-        logger.info(
-            "Request",
-            extra={
-                "request": {
-                    "method": request.method,
-                    "url": str(request.url),
-                },
-            },
-        )
+        Args:
+            app (ASGIApp): The wrapped application.
+            sample_rate (float): Fraction of the successful and fast requests that are logged.
+            slow_request_threshold (float): Requests taking at least this many seconds are
+                always logged.
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_request_threshold = slow_request_threshold
 
-        start_time = time.time()
-        response: Response = await call_next(request)
-        process_time = time.time() - start_time
-
-        logger.info(
-            "Response",
-            extra={
-                "request": {
-                    "method": request.method,
-                    "url": str(request.url),
-                },
-                "response": {"status_code": response.status_code},
-                "process_time": process_time,
-            },
+    def should_log(self, status_code: int, process_time: float) -> bool:
+        return (
+            status_code >= 400
+            or process_time >= self.slow_request_threshold
+            or random.random() < self.sample_rate
         )
-        return response
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Logs the request together with its response status, size and duration, if sampled.
+
+        Args:
+            scope (Scope): The ASGI scope of the request.
+            receive (Receive): The ASGI receive channel.
+            send (Send): The ASGI send channel.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        bytes_sent = 0
+
+        async def send_and_measure(message: Message):
+            nonlocal status_code, bytes_sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            process_time = time.perf_counter() - start_time
+            if logger.isEnabledFor(logging.INFO) and self.should_log(
+                status_code, process_time
+            ):
+                logger.info(
+                    "Response",
+                    extra={
+                        "request": {
+                            "method": scope["method"],
+                            "url": get_url(scope),
+                        },
+                        "response": {
+                            "status_code": status_code,
+                            "bytes_sent": bytes_sent,
+                        },
+                        "process_time": process_time,
+                        "database": get_database_stats(),
+                    },
+                )
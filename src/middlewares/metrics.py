@@ -0,0 +1,64 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from utils import metrics
+from utils.metrics import UNMATCHED_ROUTE, MetricsRecorder
+from utils.query_stats import current_query_stats
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware that records the number, duration, status and SQL queries of the
+    requests, labelled by route template, e.g. "/heroes/{hero_id}", rather than by raw URL.
+    """
+
+    def __init__(self, app: ASGIApp, recorder: MetricsRecorder | None = None):
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            recorder (MetricsRecorder | None): Where to record the metrics. Defaults to the
+                recorder of the process.
+        """
+        self.app = app
+        self.recorder = recorder or metrics.recorder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Records the request once the response has been sent.
+
+        Args:
+            scope (Scope): The ASGI scope of the request.
+            receive (Receive): The ASGI receive channel.
+            send (Send): The ASGI send channel.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recorder = self.recorder
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_and_record_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        recorder.in_flight += 1
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            recorder.in_flight -= 1
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            # Set by QueryStatsMiddleware, when the SQL instrumentation is enabled
+            query_stats = current_query_stats.get()
+            recorder.observe_request(
+                scope["method"],
+                route.path_format if route is not None else UNMATCHED_ROUTE,
+                str(status_code),
+                time.perf_counter() - start_time,
+                query_stats.count if query_stats is not None else 0,
+                query_stats.duration if query_stats is not None else 0.0,
+            )
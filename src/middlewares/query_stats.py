@@ -0,0 +1,60 @@
+from config import settings
+from starlette.types import ASGIApp, Receive, Scope, Send
+from utils.log import get_logger
+from utils.query_stats import QueryStats, current_query_stats, normalize_sql
+
+logger = get_logger()
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware that collects the SQL statements run by each request, so that the
+    inner middlewares can report the query count and database time, and that logs the
+    SELECT statements repeated enough times to be N+1 candidates.
+
+    It must wrap `LogMiddleware` and `MetricsMiddleware`, i.e. be added after them.
+    """
+
+    def __init__(
+        self, app: ASGIApp, n_plus_one_threshold: int = settings.N_PLUS_ONE_THRESHOLD
+    ):
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            n_plus_one_threshold (int): Number of executions of the same SELECT statement
+                within one request from which it is logged as a possible N+1 query.
+        """
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Collects the statements of the request and checks them for N+1 queries at the end.
+
+        Args:
+            scope (Scope): The ASGI scope of the request.
+            receive (Receive): The ASGI receive channel.
+            send (Send): The ASGI send channel.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_query_stats.reset(token)
+            repeated_statements = stats.repeated_statements(self.n_plus_one_threshold)
+            for statement, count in repeated_statements.items():
+                logger.warning(
+                    "Possible N+1 query",
+                    extra={
+                        "query": {
+                            "sql": normalize_sql(statement),
+                            "executions": count,
+                            "route": stats.route,
+                        }
+                    },
+                )
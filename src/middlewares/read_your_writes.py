@@ -0,0 +1,75 @@
+import time
+from http.cookies import SimpleCookie
+
+from config import settings
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Cookie holding the Unix time until which a client that wrote is served by the primary
+PRIMARY_PIN_COOKIE = "primary_until"
+
+# Methods that don't write, whose requests don't pin the client to the primary
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def is_pinned_to_primary(cookies: dict[str, str]) -> bool:
+    """
+    Tell whether a client wrote recently enough to be served by the primary.
+
+    Args:
+        cookies (dict[str, str]): The cookies of the request.
+
+    Returns:
+        bool: True if the pin cookie is set and not expired.
+    """
+    try:
+        return float(cookies[PRIMARY_PIN_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware that pins a client to the primary for a short window after a
+    successful write, so that its next reads are not served by a lagging replica.
+
+    The window is carried by a cookie, so the pin holds across the workers.
+    """
+
+    def __init__(self, app: ASGIApp, window: float = settings.READ_YOUR_WRITES_WINDOW):
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            window (float): Seconds during which the client is served by the primary.
+        """
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """
+        Sets the pin cookie on the successful responses to writes.
+
+        Args:
+            scope (Scope): The ASGI scope of the request.
+            receive (Receive): The ASGI receive channel.
+            send (Send): The ASGI send channel.
+        """
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[PRIMARY_PIN_COOKIE] = str(time.time() + self.window)
+                cookie[PRIMARY_PIN_COOKIE]["max-age"] = int(self.window) + 1
+                cookie[PRIMARY_PIN_COOKIE]["path"] = "/"
+                cookie[PRIMARY_PIN_COOKIE]["httponly"] = True
+                cookie[PRIMARY_PIN_COOKIE]["samesite"] = "lax"
+                header = cookie.output(header="").strip().encode("latin-1")
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", header),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
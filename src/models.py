@@ -1,7 +1,9 @@
+from enum import Enum
 from typing import Annotated, Literal
 
+import sqlalchemy as sa
 import uuid_utils.compat as uuid
-from pydantic import GetPydanticSchema
+from pydantic import GetPydanticSchema, ValidationError
 from pydantic_core import core_schema
 from sqlmodel import Field, SQLModel
 from uuid_utils.compat import UUID
@@ -23,18 +25,36 @@ def validate_uuid(val, version: Literal[1, 3, 4, 5, 6, 7, 8]) -> UUID:
     return val
 
 
+# Version and variant bits of a UUID7, as checked by `UUID.version` but without its overhead
+_UUID7_MASK = (0xF << 76) | (0xC << 60)
+_UUID7_BITS = (0x7 << 76) | (0x8 << 60)
+
+
+def validate_uuid7(val, handler: core_schema.ValidatorFunctionWrapHandler) -> UUID:
+    """
+    Parse the UUID natively with the `uuid` core schema, which doesn't support version 7 in
+    this pydantic-core release, then check the version bits. Invalid values go through
+    `validate_uuid`, to raise its error messages.
+    """
+    if isinstance(val, bytes):
+        return validate_uuid(val, version=7)
+    try:
+        parsed = handler(val)
+    except ValidationError:
+        return validate_uuid(val, version=7)
+    if parsed.int & _UUID7_MASK != _UUID7_BITS:
+        return validate_uuid(parsed, version=7)
+    return parsed
+
+
+# The `uuid` core schema also serializes natively, to a string in JSON mode
 UUID7 = Annotated[
     UUID,
     GetPydanticSchema(
-        get_pydantic_core_schema=lambda _,
-        handler: core_schema.with_info_plain_validator_function(
-            lambda val, info: validate_uuid(
-                UUID(val) if info.mode == "json" else val, version=7
-            ),
-            serialization=core_schema.plain_serializer_function_ser_schema(
-                lambda val, info: str(val) if info.mode == "json" else val,
-                info_arg=True,
-            ),
+        get_pydantic_core_schema=lambda _, handler: (
+            core_schema.no_info_wrap_validator_function(
+                validate_uuid7, core_schema.uuid_schema()
+            )
         ),
         get_pydantic_json_schema=lambda _, handler: {
             **handler(core_schema.str_schema()),
@@ -56,6 +76,12 @@ class HeroBase(SQLModel):
 class Hero(HeroBase, table=True):
     """Database model for Hero with the extra fields that are not always in the other models."""
 
+    # The heroes filtered by name or age are paged in ID order
+    __table_args__ = (
+        sa.Index("ix_hero_name_id", "name", "id"),
+        sa.Index("ix_hero_age_id", "age", "id"),
+    )
+
     id: UUID7 = Field(
         default_factory=uuid.uuid7,
         title="Hero ID",
@@ -65,12 +91,19 @@ class Hero(HeroBase, table=True):
     secret_name: str = Field(
         title="Secret Name", description="The secret identity of the hero."
     )
+    version: int = Field(
+        default=1,
+        title="Version",
+        description="Incremented by every update, for optimistic concurrency control.",
+        sa_column_kwargs={"server_default": "1"},
+    )
 
 
 class HeroPublic(HeroBase):
     """Public model for Hero without sensitive information."""
 
     id: UUID7
+    version: int
 
 
 class HeroCreate(HeroBase):
@@ -88,3 +121,109 @@ class HeroUpdate(HeroBase):
     name: str | None = None
     age: int | None = None
     secret_name: str | None = None
+    # The version the update applies to: if the hero was updated since, it fails with 409
+    version: int | None = None
+
+
+class HeroBulkUpdate(HeroBase):
+    """Model for an item of a bulk update: the ID of a hero and its fields to update."""
+
+    id: UUID7
+    name: str | None = None
+    age: int | None = None
+    secret_name: str | None = None
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """Database model for the stored response of a request sent with an Idempotency-Key."""
+
+    __tablename__ = "idempotency_key"
+
+    key: str = Field(
+        primary_key=True,
+        max_length=255,
+        title="Key",
+        description="The Idempotency-Key header of the request.",
+    )
+    fingerprint: str = Field(
+        max_length=64,
+        title="Fingerprint",
+        description="The SHA-256 of the method, path and body of the request.",
+    )
+    status_code: int = Field(
+        title="Status Code", description="The status code of the response."
+    )
+    body: bytes = Field(title="Body", description="The JSON body of the response.")
+    expires_at: float = Field(
+        index=True,
+        title="Expires At",
+        description="The Unix time after which the response is no longer replayed.",
+    )
+
+
+class ResourceStatus(str, Enum):
+    AVAILABLE = "available"
+    CLAIMED = "claimed"
+    CONFIRMED = "confirmed"
+
+
+class ResourceBase(SQLModel):
+    """Base model for Resource with common attributes."""
+
+    name: str = Field(
+        title="Name", description="What is reserved, e.g. a seat or a time slot."
+    )
+
+
+class Resource(ResourceBase, table=True):
+    """
+    Database model for a resource that clients claim for a limited time (a lease), and then
+    confirm or release. The claims that are neither are returned to the available resources.
+    """
+
+    # Claims scan the available resources in ID order
+    __table_args__ = (sa.Index("ix_resource_status_id", "status", "id"),)
+
+    id: UUID7 = Field(
+        default_factory=uuid.uuid7,
+        title="Resource ID",
+        description="The unique identifier for the resource.",
+        primary_key=True,
+    )
+    status: ResourceStatus = Field(
+        default=ResourceStatus.AVAILABLE,
+        # Stored as a VARCHAR, so that adding a status doesn't alter a PostgreSQL type
+        sa_type=sa.Enum(
+            ResourceStatus,
+            native_enum=False,
+            length=16,
+            values_callable=lambda statuses: [status.value for status in statuses],
+        ),
+        title="Status",
+        description="Whether the resource is available, claimed or confirmed.",
+    )
+    claim_token: UUID7 | None = Field(
+        default=None,
+        index=True,
+        title="Claim Token",
+        description="The token of the claim holding the resource.",
+    )
+    lease_expires_at: float | None = Field(
+        default=None,
+        index=True,
+        title="Lease Expires At",
+        description="The Unix time after which an unconfirmed claim is abandoned.",
+    )
+
+
+class ResourcePublic(ResourceBase):
+    """Public model for Resource."""
+
+    id: UUID7
+    status: ResourceStatus
+    claim_token: UUID7 | None
+    lease_expires_at: float | None
+
+
+class ResourceCreate(ResourceBase):
+    """Model for creating a new Resource."""
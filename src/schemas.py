@@ -1,5 +1,35 @@
-from pydantic import BaseModel, constr
+from models import UUID7, HeroPublic, ResourcePublic
+from pydantic import BaseModel, Field, constr
 
 
 class User(BaseModel):
     name: constr(min_length=1)
+
+
+class HeroImportReport(BaseModel):
+    imported: int = Field(description="Number of heroes written to the database.")
+    rejected: int = Field(description="Number of records that failed validation.")
+    errors: list[str] = Field(
+        description="The first rejected records, as '<line>: <reason>'."
+    )
+    elapsed: float = Field(description="Duration of the import in seconds.")
+    rows_per_sec: float = Field(description="Imported heroes per second.")
+
+
+class HeroBulkUpdateReport(BaseModel):
+    updated: list[HeroPublic] = Field(
+        description="The updated heroes, in the order they were first sent."
+    )
+    not_found: list[UUID7] = Field(description="The IDs of the heroes not found.")
+
+
+class ResourceClaim(BaseModel):
+    claim_token: UUID7 = Field(
+        description="Confirms or releases the claimed resources."
+    )
+    lease_expires_at: float = Field(
+        description="The Unix time until which the resources are held for the claim."
+    )
+    resources: list[ResourcePublic] = Field(
+        description="The claimed resources, fewer than requested when not enough are available."
+    )
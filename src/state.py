@@ -3,7 +3,19 @@ Global application state.
 Holds singleton instances that are initialized during app startup.
 """
 
+from api.services.reservations import ClaimReaper
+from database import ReplicaRouter
 from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from utils.cache import TTLCache
+from utils.health import HealthMonitor
+from utils.idempotency import IdempotencyStore
 
 # Global singleton instances
 engine: Engine | None = None
+async_engine: AsyncEngine | None = None
+hero_cache: TTLCache | None = None
+replicas: ReplicaRouter | None = None
+health_monitor: HealthMonitor | None = None
+idempotency_store: IdempotencyStore | None = None
+claim_reaper: ClaimReaper | None = None
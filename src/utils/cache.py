@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+"""
+A bounded in-process cache with TTL and LRU eviction.
+"""
+
+
+class TTLCache:
+    """
+    Thread-safe cache of pre-serialized values, bounded in size and age.
+
+    Values are stored as bytes next to their expiry time, so an entry costs little more than
+    the payload itself. When the cache is full the least recently used entry is evicted.
+
+    Reads that race with writes are guarded by a generation counter: callers take
+    `generation` before loading a value and pass it to `set`, which discards the value if an
+    invalidation happened in the meantime, so a stale value can't be cached after a write.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        """
+        Args:
+            max_entries (int): Maximum number of entries before evicting the LRU entry.
+            ttl (float): Seconds after which an entry expires.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: OrderedDict[Hashable, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> bytes | None:
+        """Return the cached value, or None if it's missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: bytes, generation: int | None = None) -> None:
+        """
+        Cache a value.
+
+        Args:
+            key (Hashable): The key of the entry.
+            value (bytes): The pre-serialized value.
+            generation (int | None): The `generation` read before loading the value. The value
+                is discarded if an invalidation happened since then.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove an entry after its source changed."""
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return the size, configuration and counters of the cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,66 @@
+import hashlib
+
+from fastapi import Response
+from starlette import status
+
+"""
+Strong ETags and conditional requests (RFC 9110, section 13).
+"""
+
+
+def compute_etag(data: bytes) -> str:
+    """
+    Compute a strong ETag from the bytes identifying a representation.
+
+    Args:
+        data (bytes): The body of the response, or any bytes derived from its content.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    return f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """
+    Check an If-None-Match or If-Match header against the current ETag.
+
+    Args:
+        header (str): The value of the header, a list of ETags or "*".
+        etag (str): The current strong ETag of the resource.
+        weak (bool): Use the weak comparison of If-None-Match, ignoring the W/ prefix,
+            instead of the strong comparison of If-Match.
+
+    Returns:
+        bool: True if one of the listed ETags matches.
+    """
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def etag_response(body: bytes, if_none_match: str | None) -> Response:
+    """
+    Return a JSON body with its ETag, or an empty 304 response if the client already has it.
+
+    Args:
+        body (bytes): The serialized JSON body.
+        if_none_match (str | None): The If-None-Match header of the request.
+
+    Returns:
+        Response: The response.
+    """
+    etag = compute_etag(body)
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    return Response(body, media_type="application/json", headers={"ETag": etag})
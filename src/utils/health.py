@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+from statistics import fmean
+
+from config import settings
+from database import check_health_safe
+from sqlalchemy import Engine
+from sqlalchemy.pool import QueuePool
+
+"""
+Background health monitor: probes the dependencies on an interval, so that the readiness and
+liveness probes answer from the last results instead of querying the database each time.
+"""
+
+OK = "OK"
+DEGRADED = "DEGRADED"
+FAIL = "FAIL"
+
+
+def is_pool_exhausted(engine: Engine) -> bool:
+    """
+    Tell whether every connection the pool of an engine may open is checked out, so that
+    the next checkout has to wait.
+
+    Args:
+        engine (Engine): The engine, e.g. `async_engine.sync_engine` for an AsyncEngine.
+
+    Returns:
+        bool: True if the pool is exhausted. Always False for pools without a limit.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or settings.DATABASE_MAX_OVERFLOW < 0:
+        return False
+    return pool.checkedout() >= pool.size() + settings.DATABASE_MAX_OVERFLOW
+
+
+class HealthMonitor:
+    """
+    Probes the database every `interval` seconds in a background thread and keeps the
+    latencies of the last `window` probes.
+
+    The probes use their own engine, so that they neither wait for nor take a connection of
+    the pools serving the requests, whose exhaustion is reported separately.
+    """
+
+    def __init__(
+        self,
+        probe_engine: Engine,
+        engines: list[Engine],
+        interval: float,
+        window: int,
+        latency_threshold: float,
+    ):
+        """
+        Args:
+            probe_engine (Engine): The engine running the probes.
+            engines (list[Engine]): The engines serving the requests, whose pools are checked.
+            interval (float): Seconds between two probes.
+            window (int): Number of probes in the rolling latency.
+            latency_threshold (float): Rolling average latency, in seconds, above which the
+                database is degraded.
+        """
+        self.probe_engine = probe_engine
+        self.engines = engines
+        self.interval = interval
+        self.latency_threshold = latency_threshold
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.database_ok = False
+        self.pool_exhausted = False
+        self.last_probe: float | None = None
+        self._stop = threading.Event()
+        self._prober: threading.Thread | None = None
+
+    def probe(self) -> None:
+        """Check the database and the pools, and record the latency of the check."""
+        start_time = time.perf_counter()
+        self.database_ok = check_health_safe(self.probe_engine)
+        self.latencies.append(time.perf_counter() - start_time)
+        self.pool_exhausted = any(is_pool_exhausted(engine) for engine in self.engines)
+        self.last_probe = time.monotonic()
+
+    def status(self) -> dict:
+        """
+        Return the state of the last probe.
+
+        The status is FAIL if the database check failed or if no probe finished for three
+        intervals, e.g. because the database hangs, and DEGRADED if the rolling latency is
+        above the threshold or a pool is exhausted.
+        """
+        latencies = list(self.latencies)
+        stale = (
+            self.last_probe is None
+            or time.monotonic() - self.last_probe > 3 * self.interval
+        )
+        average = fmean(latencies) if latencies else 0.0
+
+        if stale or not self.database_ok:
+            database = FAIL
+        elif average > self.latency_threshold or self.pool_exhausted:
+            database = DEGRADED
+        else:
+            database = OK
+
+        return {
+            "status": database,
+            "database": database,
+            "latency_ms": {
+                "last": round(latencies[-1] * 1000, 3) if latencies else None,
+                "avg": round(average * 1000, 3),
+                "max": round(max(latencies, default=0.0) * 1000, 3),
+            },
+            "pool_exhausted": self.pool_exhausted,
+            "last_probe_age": (
+                round(time.monotonic() - self.last_probe, 3)
+                if self.last_probe is not None
+                else None
+            ),
+        }
+
+    def start(self) -> None:
+        """Probe now, then every `interval` seconds in a background thread."""
+        self.probe()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                self.probe()
+
+        self._stop.clear()
+        self._prober = threading.Thread(target=run, name="health-monitor", daemon=True)
+        self._prober.start()
+
+    def stop(self) -> None:
+        """Stop the probes and close the connection of the probe engine."""
+        if self._prober is not None:
+            self._stop.set()
+            self._prober.join()
+            self._prober = None
+        self.probe_engine.dispose()
@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator
+
+from excepts import IdempotencyKeyMismatch
+from models import IdempotencyKey
+from sqlalchemy import Delete, Engine, delete
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from utils.cache import TTLCache
+from utils.log import get_logger
+
+"""
+Storage of the responses of the requests sent with an Idempotency-Key header, so that their
+retries get the same response instead of repeating the write.
+
+Responses are stored in the `idempotency_key` table, in the transaction of the write itself, so
+a response is stored if and only if its write is committed. The most recent ones are also kept
+in an in-memory cache, and requests with the same key are serialized within a worker.
+"""
+
+logger = get_logger()
+
+IDEMPOTENCY_REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """The response of the first request sent with a key."""
+
+    fingerprint: str
+    status_code: int
+    body: bytes
+
+    def encode(self) -> bytes:
+        return f"{self.status_code} {self.fingerprint}\n".encode() + self.body
+
+    @classmethod
+    def decode(cls, value: bytes) -> "StoredResponse":
+        header, _, body = value.partition(b"\n")
+        status_code, fingerprint = header.decode().split(" ")
+        return cls(fingerprint, int(status_code), body)
+
+
+def fingerprint_request(method: str, path: str, body: bytes) -> str:
+    """
+    Fingerprint a request, to tell a retry from another request reusing the same key.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The path of the endpoint.
+        body (bytes): The canonical body of the request, e.g. the JSON of the validated model.
+
+    Returns:
+        str: The hexadecimal SHA-256 of the request.
+    """
+    return hashlib.sha256(f"{method} {path}\n".encode() + body).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Stored responses, with a bounded in-memory front cache, and per-key locks coalescing the
+    concurrent requests of a worker that share a key.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        """
+        Args:
+            ttl (float): Seconds during which a response is replayed.
+            max_entries (int): Maximum number of responses kept in memory.
+        """
+        self.ttl = ttl
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.replays = 0
+        self.coalesced = 0
+        self.purged = 0
+        # Key -> [lock, number of requests holding or waiting for it]
+        self._locks: dict[str, list] = {}
+        self._async_locks: dict[str, list] = {}
+        self._guard = threading.Lock()
+        self._stop = threading.Event()
+        self._purger: threading.Thread | None = None
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """Hold the lock of a key, waiting for the other requests of this worker holding it."""
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            if entry[1]:
+                self.coalesced += 1
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    @asynccontextmanager
+    async def async_lock(self, key: str) -> AsyncIterator[None]:
+        """Same as `lock`, for the requests served by the event loop."""
+        entry = self._async_locks.setdefault(key, [asyncio.Lock(), 0])
+        if entry[1]:
+            self.coalesced += 1
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._async_locks[key]
+
+    def _from_row(self, row: IdempotencyKey | None) -> StoredResponse | None:
+        if row is None or row.expires_at < time.time():
+            return None
+        return StoredResponse(row.fingerprint, row.status_code, row.body)
+
+    def load(self, session: Session, key: str) -> StoredResponse | None:
+        """Return the response stored for a key, from the cache or else from the database."""
+        value = self.cache.get(key)
+        if value is not None:
+            return StoredResponse.decode(value)
+        return self._from_row(session.get(IdempotencyKey, key))
+
+    async def async_load(
+        self, session: AsyncSession, key: str
+    ) -> StoredResponse | None:
+        """Same as `load`, with an AsyncSession."""
+        value = self.cache.get(key)
+        if value is not None:
+            return StoredResponse.decode(value)
+        return self._from_row(await session.get(IdempotencyKey, key))
+
+    def check_replay(self, stored: StoredResponse, fingerprint: str) -> None:
+        """
+        Check that a request can be answered with the response stored for its key.
+
+        Raises:
+            IdempotencyKeyMismatch: If the key was first used for a different request.
+        """
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyKeyMismatch(
+                "Send the same request with this key, or use a new key"
+            )
+        with self._guard:
+            self.replays += 1
+
+    def _delete_expired(self, key: str) -> Delete:
+        return (
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.key == key)
+            .where(IdempotencyKey.expires_at < time.time())
+        )
+
+    def delete_expired(self, session: Session, key: str) -> None:
+        """
+        Delete the expired response of a key, not purged yet, in the transaction of the write,
+        so that the key can be stored again.
+        """
+        session.exec(self._delete_expired(key))
+
+    async def async_delete_expired(self, session: AsyncSession, key: str) -> None:
+        """Same as `delete_expired`, with an AsyncSession."""
+        await session.exec(self._delete_expired(key))
+
+    def to_row(self, key: str, response: StoredResponse) -> IdempotencyKey:
+        """Build the row storing a response, to add to the transaction of the write."""
+        return IdempotencyKey(
+            key=key,
+            fingerprint=response.fingerprint,
+            status_code=response.status_code,
+            body=response.body,
+            expires_at=time.time() + self.ttl,
+        )
+
+    def remember(self, key: str, response: StoredResponse) -> None:
+        """Cache a response once its transaction is committed."""
+        self.cache.set(key, response.encode())
+
+    def purge(self, engine: Engine) -> int:
+        """Delete the expired responses from the database and return their number."""
+        with Session(engine) as session:
+            result = session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.expires_at < time.time())
+            )
+            session.commit()
+        self.purged += result.rowcount
+        return result.rowcount
+
+    def start(self, engine: Engine, interval: float) -> None:
+        """Purge the expired responses every `interval` seconds in a background thread."""
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.purge(engine)
+                except Exception as e:
+                    logger.warning(f"Failed to purge the idempotency keys: {e}")
+
+        self._stop.clear()
+        self._purger = threading.Thread(
+            target=run, name="idempotency-purger", daemon=True
+        )
+        self._purger.start()
+
+    def stop(self) -> None:
+        if self._purger is not None:
+            self._stop.set()
+            self._purger.join()
+            self._purger = None
+
+    def stats(self) -> dict:
+        """Return the counters of the store and of its cache."""
+        return {
+            "ttl": self.ttl,
+            "replays": self.replays,
+            "coalesced": self.coalesced,
+            "purged": self.purged,
+            "cache": self.cache.stats(),
+        }
@@ -1,12 +1,21 @@
+import atexit
+import copy
 import datetime
-import json
 import logging
+import queue
 import sys
+import threading
+import time
+from collections import defaultdict
 from logging import Formatter
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
+import orjson
 from config import settings
 
+# The handler in front of the log queue, when LOG_QUEUE is enabled
+queue_handler: "DroppingQueueHandler | None" = None
+
 
 def convert_timestamp_to_date(timestamp: float) -> str:
     """
@@ -37,10 +46,35 @@ class JsonFormatter(Formatter):
 
     def __init__(self):
         super(JsonFormatter, self).__init__()
+        # The second of the last formatted record and its "YYYY-MM-DD HH:MM:SS" prefix,
+        # kept in one tuple so that concurrent threads never read a torn pair.
+        self._timestamp_prefix: tuple[int | None, str] = (None, "")
+
+    def format_timestamp(self, timestamp: float) -> str:
+        """
+        Same output as `convert_timestamp_to_date`, but the date-time prefix is only
+        formatted once per second, and only the milliseconds are computed for each record.
+
+        Args:
+            timestamp (float): The Unix timestamp to be converted.
+
+        Returns:
+            str: The formatted date-time string in the format 'YYYY-MM-DD HH:MM:SS,mmm'.
+        """
+        second = int(timestamp)
+        # Round to microseconds first, as `datetime.fromtimestamp` does
+        microseconds = round((timestamp - second) * 1e6)
+        if microseconds == 1_000_000:
+            second, microseconds = second + 1, 0
+        cached_second, prefix = self._timestamp_prefix
+        if second != cached_second:
+            prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            self._timestamp_prefix = (second, prefix)
+        return f"{prefix},{microseconds // 1000:03d}"
 
     def _log_record_to_dict(self, record: logging.LogRecord) -> dict:
         json_record = {
-            "timestamp": convert_timestamp_to_date(record.created),
+            "timestamp": self.format_timestamp(record.created),
             "level": record.levelname,
             "message": record.getMessage(),
         }
@@ -48,6 +82,8 @@ class JsonFormatter(Formatter):
         request = record.__dict__.get("request")
         response = record.__dict__.get("response")
         process_time = record.__dict__.get("process_time")
+        database = record.__dict__.get("database")
+        query = record.__dict__.get("query")
 
         if request:
             json_record["request"] = request
@@ -55,6 +91,10 @@ class JsonFormatter(Formatter):
             json_record["response"] = response
         if process_time:
             json_record["process_time"] = process_time
+        if database:
+            json_record["database"] = database
+        if query:
+            json_record["query"] = query
         if record.levelno == logging.ERROR and record.exc_info:
             json_record["error"] = self.formatException(record.exc_info)
         if record.levelno == logging.ERROR and record.stack_info:
@@ -72,10 +112,143 @@ class JsonFormatter(Formatter):
         Returns:
             A JSON string representation of the log record.
         """
-        return json.dumps(self._log_record_to_dict(record))
+        return orjson.dumps(self._log_record_to_dict(record), default=str).decode()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands the records over to a `QueueListener` thread, which formats and writes them, so a
+    slow stdout or disk never blocks the caller.
+
+    Records are enqueued without waiting: when the queue is full they are dropped and
+    counted in `dropped`, instead of stalling the request that logged them.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the message with its arguments, which may change after the call, but leave the
+        formatting, including the traceback, to the listener thread.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # `Handler.handle` holds the handler lock here, so the counter is thread-safe.
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict:
+        """Return the size of the queue and the number of dropped records."""
+        return {
+            "queued": self.queue.qsize(),
+            "max_size": self.queue.maxsize,
+            "dropped": self.dropped,
+        }
+
+
+class _DrainingQueueListener(QueueListener):
+    def stop(self):
+        # Also called at exit, so stopping twice must be harmless
+        if self._thread is not None:
+            super().stop()
+
+    def enqueue_sentinel(self):
+        # Wait for room in the queue, so that the records logged before stopping are written.
+        self.queue.put(self._sentinel)
+
+
+def start_queue_handler(
+    handlers: list[logging.Handler], max_size: int
+) -> DroppingQueueHandler:
+    """
+    Start a listener thread that writes the records of a bounded queue to the given handlers.
+
+    Args:
+        handlers (list[logging.Handler]): The handlers doing the actual (blocking) writes.
+        max_size (int): The maximum number of records waiting in the queue.
+
+    Returns:
+        DroppingQueueHandler: The handler to attach to a logger. Its listener is stopped,
+            and the queue flushed, at interpreter exit.
+    """
+    log_queue = queue.Queue(maxsize=max_size)
+    handler = DroppingQueueHandler(log_queue)
+    listener = _DrainingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    handler.listener = listener
+    return handler
+
+
+class TraceRateLimiter:
+    """
+    Limits the number of full error traces logged per minute for each exception class, so
+    that a burst of identical errors doesn't turn into a logging storm.
+
+    Capturing the stack (`stack_info=True`) and formatting the traceback cost far more than
+    the log line itself, so callers ask `allow` before logging and only pass `exc_info` and
+    `stack_info` when it returns True. The traces left out are counted in `suppressed`.
+    """
+
+    def __init__(self, limit: int, period: float = 60.0):
+        """
+        Args:
+            limit (int): Maximum number of traces per exception class and period.
+                Set to 0 to disable the limit.
+            period (float): Length of the window, in seconds.
+        """
+        self.limit = limit
+        self.period = period
+        self.suppressed: defaultdict[str, int] = defaultdict(int)
+        # Exception class -> (start of the current window, traces logged in it)
+        self._windows: dict[str, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, error: BaseException) -> bool:
+        """
+        Tell whether the trace of an error should be logged.
+
+        Args:
+            error (BaseException): The error about to be logged.
+
+        Returns:
+            bool: True if the exception class is still under its limit for the current window.
+        """
+        if self.limit <= 0:
+            return True
+
+        key = f"{type(error).__module__}.{type(error).__qualname__}"
+        now = time.monotonic()
+        with self._lock:
+            window_start, count = self._windows.get(key, (now, 0))
+            if now - window_start >= self.period:
+                window_start, count = now, 0
+            if count >= self.limit:
+                self.suppressed[key] += 1
+                return False
+            self._windows[key] = (window_start, count + 1)
+            return True
+
+    def stats(self) -> dict:
+        """Return the limit and the number of suppressed traces per exception class."""
+        with self._lock:
+            return {"limit_per_minute": self.limit, "suppressed": dict(self.suppressed)}
+
+
+trace_limiter = TraceRateLimiter(settings.LOG_TRACES_PER_MINUTE)
 
 
 def get_logger():
+    global queue_handler
+
     logger = logging.root
     logger.setLevel(settings.LOG_LEVEL)
 
@@ -97,7 +270,7 @@ def get_logger():
         handler.setFormatter(
             JsonFormatter()
         )  # Set a JSON formatter for structured logging
-        logger.addHandler(handler)
+        handlers = [handler]
 
         # File handler (if needed)
         if settings.LOG_SAVE_ON_FILE:
@@ -108,6 +281,14 @@ def get_logger():
                 backupCount=5,  # 10 MB per file, keep 5 files
             )
             file_handler.setFormatter(JsonFormatter())
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
+
+        if settings.LOG_QUEUE:
+            # Format and write the records in a background thread, off the request path
+            queue_handler = start_queue_handler(handlers, settings.LOG_QUEUE_SIZE)
+            handlers = [queue_handler]
+
+        for handler in handlers:
+            logger.addHandler(handler)
 
     return logger
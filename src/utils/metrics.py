@@ -0,0 +1,343 @@
+import os
+import tempfile
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+import orjson
+from config import settings
+from database import CheckoutTimer
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import (
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    HistogramMetricFamily,
+)
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import QueuePool
+
+"""
+Lightweight request and database pool metrics, exposed in the Prometheus text format.
+
+Recording only updates plain Python counters of the current process: the middleware runs
+in the event loop thread, so the hot path needs no lock and costs a few hundred nanoseconds.
+Each worker periodically writes its counters to a file of a shared directory, and the
+worker serving /metrics merges the files of all the workers, so the values cover the whole
+server and not only the worker that was scraped.
+"""
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+
+# Label of the requests that didn't match any route, to keep the cardinality bounded
+UNMATCHED_ROUTE = "unmatched"
+
+POOL_COUNTERS = (
+    "checkouts",
+    "connections",
+    "checkout_wait_seconds",
+    "checkout_timeouts",
+)
+POOL_GAUGES = ("size", "checked_out", "idle", "overflow", "checkout_wait_max_seconds")
+
+
+class MetricsRecorder:
+    """
+    Per-process request and pool metrics.
+
+    Request series are keyed by (method, route template, status) and stored as a list:
+    [count, sum of durations, SQL queries, database time, count of bucket 1, ...,
+    count of bucket N, count of +Inf].
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.in_flight = 0
+        self.pid = os.getpid()
+        self._requests: dict[tuple[str, str, str], list] = {}
+        self._pools: dict[str, tuple[Engine, dict[str, int]]] = {}
+        self._pool_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    def observe_request(
+        self,
+        method: str,
+        route: str,
+        status: str,
+        seconds: float,
+        queries: int = 0,
+        db_seconds: float = 0.0,
+    ) -> None:
+        """
+        Record a finished request. Must be called from the event loop thread.
+
+        Args:
+            method (str): The HTTP method.
+            route (str): The route template, e.g. "/heroes/{hero_id}".
+            status (str): The status code of the response.
+            seconds (float): The duration of the request.
+            queries (int): The number of SQL statements run by the request.
+            db_seconds (float): The time spent running them.
+        """
+        key = (method, route, status)
+        series = self._requests.get(key)
+        if series is None:
+            series = self._requests[key] = [0, 0.0, 0, 0.0] + [0] * (
+                len(self.buckets) + 1
+            )
+        series[0] += 1
+        series[1] += seconds
+        series[2] += queries
+        series[3] += db_seconds
+        series[4 + bisect_left(self.buckets, seconds)] += 1
+
+    def watch_pool(self, engine: Engine, name: str) -> None:
+        """
+        Count the checkouts and new connections of the pool of an engine, and report its
+        size, usage and checkout wait time.
+
+        Args:
+            engine (Engine): The engine, e.g. `async_engine.sync_engine` for an AsyncEngine.
+            name (str): The value of the `engine` label.
+        """
+        counters = {"checkouts": 0, "connections": 0}
+        self._pools[name] = (engine, counters)
+
+        def count(counter: str):
+            def listener(*args):
+                # Checkouts happen in the threadpool, so unlike requests they need a lock
+                with self._pool_lock:
+                    counters[counter] += 1
+
+            return listener
+
+        event.listen(engine, "checkout", count("checkouts"))
+        event.listen(engine, "connect", count("connections"))
+
+    def snapshot(self) -> dict:
+        """Return a copy of the current values, that can be serialized to JSON."""
+        # list() copies the dictionaries atomically, even if the event loop adds a series
+        requests = [[*key, *series] for key, series in list(self._requests.items())]
+        pools = {}
+        for name, (engine, counters) in list(self._pools.items()):
+            with self._pool_lock:
+                values = dict(counters)
+            # Read from the engine, since disposing it replaces the pool
+            pool = engine.pool
+            if isinstance(pool, QueuePool):
+                values["size"] = pool.size()
+                values["checked_out"] = pool.checkedout()
+                values["idle"] = pool.checkedin()
+                values["overflow"] = max(pool.overflow(), 0)
+            if isinstance(pool, CheckoutTimer):
+                values.update(pool.checkout_stats())
+            pools[name] = values
+        return {
+            "pid": self.pid,
+            "buckets": list(self.buckets),
+            "requests": requests,
+            "in_flight": self.in_flight,
+            "pools": pools,
+        }
+
+    def flush(self, directory: str) -> None:
+        """Write the snapshot of this process to the shared directory."""
+        path = Path(directory) / f"{self.pid}.json"
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_bytes(orjson.dumps(self.snapshot()))
+        temp_path.replace(path)
+
+    def start(self, directory: str, interval: float) -> None:
+        """
+        Flush the snapshot every `interval` seconds in a background thread.
+
+        Args:
+            directory (str): The directory shared by the workers.
+            interval (float): Seconds between two flushes.
+        """
+
+        def run():
+            while not self._stop.wait(interval):
+                self.flush(directory)
+
+        self._stop.clear()
+        self._flusher = threading.Thread(
+            target=run, name="metrics-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self, directory: str) -> None:
+        """Stop the background thread and write the final values of this process."""
+        if self._flusher is not None:
+            self._stop.set()
+            self._flusher.join()
+            self._flusher = None
+        self.in_flight = 0
+        self.flush(directory)
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def load_snapshots(recorder: MetricsRecorder, directory: str | None) -> list[dict]:
+    """
+    Return the snapshots of all the workers, using the live values for the current process.
+
+    The counters of workers that exited are kept, so that totals never go backwards, but
+    their gauges are left out and they are flagged with `"alive": False`.
+    """
+    snapshots = [{**recorder.snapshot(), "alive": True}]
+    if directory is None:
+        return snapshots
+
+    for path in Path(directory).glob("*.json"):
+        try:
+            snapshot = orjson.loads(path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            continue
+        if snapshot["pid"] == recorder.pid:
+            continue
+        snapshot["alive"] = is_alive(snapshot["pid"])
+        if not snapshot["alive"]:
+            snapshot["in_flight"] = 0
+            for values in snapshot["pools"].values():
+                for gauge in POOL_GAUGES:
+                    values.pop(gauge, None)
+        snapshots.append(snapshot)
+    return snapshots
+
+
+class MetricsCollector:
+    """Prometheus collector merging the snapshots of all the workers."""
+
+    def __init__(self, recorder: MetricsRecorder, directory: str | None):
+        self.recorder = recorder
+        self.directory = directory
+
+    def collect(self):
+        snapshots = load_snapshots(self.recorder, self.directory)
+
+        requests: dict[tuple, list] = {}
+        in_flight = 0
+        pools: dict[str, dict[str, int]] = {}
+        for snapshot in snapshots:
+            for method, route, status, *series in snapshot["requests"]:
+                total = requests.setdefault((method, route, status), [0] * len(series))
+                for i, value in enumerate(series):
+                    total[i] += value
+            in_flight += snapshot["in_flight"]
+            for name, values in snapshot["pools"].items():
+                total = pools.setdefault(name, {})
+                for key, value in values.items():
+                    total[key] = total.get(key, 0) + value
+
+        labels = ["method", "route", "status"]
+        requests_total = CounterMetricFamily(
+            "http_requests", "Total number of HTTP requests.", labels=labels
+        )
+        duration = HistogramMetricFamily(
+            "http_request_duration_seconds",
+            "Duration of the HTTP requests, in seconds.",
+            labels=labels,
+        )
+        db_queries = CounterMetricFamily(
+            "http_request_db_queries",
+            "Total number of SQL statements run by the HTTP requests.",
+            labels=labels,
+        )
+        db_duration = CounterMetricFamily(
+            "http_request_db_seconds",
+            "Total time spent running SQL statements by the HTTP requests, in seconds.",
+            labels=labels,
+        )
+        bounds = [str(bound) for bound in self.recorder.buckets] + ["+Inf"]
+        for key, series in sorted(requests.items()):
+            count, seconds, queries, db_seconds, *bucket_counts = series
+            requests_total.add_metric(key, count)
+            db_queries.add_metric(key, queries)
+            db_duration.add_metric(key, db_seconds)
+            cumulative, buckets = 0, []
+            for bound, bucket_count in zip(bounds, bucket_counts):
+                cumulative += bucket_count
+                buckets.append((bound, cumulative))
+            duration.add_metric(key, buckets, seconds)
+        yield requests_total
+        yield duration
+        yield db_queries
+        yield db_duration
+
+        yield GaugeMetricFamily(
+            "http_requests_in_flight",
+            "Number of HTTP requests being processed.",
+            value=in_flight,
+        )
+
+        descriptions = {
+            "checkouts": "Total number of connections checked out from the pool.",
+            "connections": "Total number of connections opened by the pool.",
+            "size": "Configured size of the pool.",
+            "checked_out": "Number of connections currently checked out.",
+            "idle": "Number of idle connections in the pool.",
+            "overflow": "Number of connections opened beyond the size of the pool.",
+            "checkout_wait_seconds": "Total time spent waiting for a connection, in seconds.",
+            "checkout_timeouts": "Total number of checkouts that timed out.",
+        }
+        for key, description in descriptions.items():
+            family_class = (
+                CounterMetricFamily if key in POOL_COUNTERS else GaugeMetricFamily
+            )
+            family = family_class(f"db_pool_{key}", description, labels=["engine"])
+            for name, values in sorted(pools.items()):
+                if key in values:
+                    family.add_metric([name], values[key])
+            yield family
+
+
+def render_metrics(recorder: MetricsRecorder, directory: str | None) -> bytes:
+    """Render the metrics of all the workers in the Prometheus text format."""
+    registry = CollectorRegistry(auto_describe=False)
+    registry.register(MetricsCollector(recorder, directory))
+    return generate_latest(registry)
+
+
+def prepare_metrics_dir() -> str:
+    """
+    Prepare the directory shared by the workers, before starting them: create a temporary
+    one unless METRICS_DIR is set, remove the files of a previous run, and export its path,
+    so that the worker processes find it in their settings.
+
+    Returns:
+        str: The path of the directory.
+    """
+    directory = settings.METRICS_DIR or tempfile.mkdtemp(prefix="metrics-")
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for path in Path(directory).glob("*.json"):
+        path.unlink()
+    os.environ["METRICS_DIR"] = directory
+    return directory
+
+
+recorder = MetricsRecorder()
@@ -0,0 +1,46 @@
+import base64
+import binascii
+from uuid import UUID
+
+from excepts import InvalidValue
+
+"""
+Opaque cursors for keyset pagination.
+A cursor encodes the primary key of the last row of a page, so the next page can seek on the index
+(`WHERE id > :last ORDER BY id`) instead of scanning and discarding `offset` rows.
+"""
+
+# Response header carrying the cursor of the next page, set only when the page is full.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: UUID) -> str:
+    """
+    Encode the primary key of the last row of a page into an opaque, URL-safe cursor.
+
+    Args:
+        last_id (UUID): The ID of the last row of the page.
+
+    Returns:
+        str: The cursor of the next page.
+    """
+    return base64.urlsafe_b64encode(last_id.bytes).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> UUID:
+    """
+    Decode a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+
+    Returns:
+        UUID: The ID of the last row of the previous page.
+
+    Raises:
+        InvalidValue: If the cursor is malformed.
+    """
+    try:
+        return UUID(bytes=base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise InvalidValue(f"Invalid cursor: {cursor}")
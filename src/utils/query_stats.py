@@ -0,0 +1,118 @@
+import re
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from config import settings
+from sqlalchemy import Engine, event
+from starlette.types import Scope
+from utils.log import get_logger
+
+"""
+Per-request SQL instrumentation, based on the cursor execution events of SQLAlchemy.
+
+The statements run while serving a request are added up in the `QueryStats` of the request,
+which is found through a context variable: it is inherited by the threadpool running the
+sync endpoints and by the greenlets of the async engine.
+"""
+
+logger = get_logger()
+
+# Label of the queries run outside of a matched route, e.g. by the health checks
+UNKNOWN_ROUTE = "unknown"
+
+
+class QueryStats:
+    """Query count and database time of one request."""
+
+    __slots__ = ("scope", "count", "duration", "statements")
+
+    def __init__(self, scope: Scope | None = None):
+        """
+        Args:
+            scope (Scope | None): The ASGI scope of the request, to find the matched route.
+        """
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+        # SELECT statement -> number of executions, to detect N+1 queries
+        self.statements: defaultdict[str, int] = defaultdict(int)
+
+    @property
+    def route(self) -> str:
+        """The template of the route serving the request, e.g. "/heroes/{hero_id}"."""
+        route = self.scope.get("route") if self.scope is not None else None
+        return route.path_format if route is not None else UNKNOWN_ROUTE
+
+    def repeated_statements(self, threshold: int) -> dict[str, int]:
+        """Return the SELECT statements executed at least `threshold` times."""
+        return {
+            statement: count
+            for statement, count in self.statements.items()
+            if count >= threshold
+        }
+
+
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\b\d+(?:\.\d+)?\b")
+_VALUES_LIST = re.compile(r"\(\?(?:, \?)*\)(?:, \(\?(?:, \?)*\))+|\(\?(?:, \?)+\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Normalize a statement, so that executions differing only by their parameters, literals
+    or number of rows look the same, e.g. in the slow-query log.
+
+    Args:
+        statement (str): The SQL statement.
+
+    Returns:
+        str: The statement on one line, with literals and bound parameters replaced by "?",
+            and lists of values (IN lists, multi-row VALUES) collapsed to "(...)".
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    return _VALUES_LIST.sub("(...)", statement)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start_time
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += duration
+        if statement.lstrip()[:6].upper() == "SELECT":
+            stats.statements[statement] += 1
+
+    if duration >= settings.SLOW_QUERY_THRESHOLD:
+        logger.warning(
+            "Slow query",
+            extra={
+                "query": {
+                    "sql": normalize_sql(statement),
+                    "duration": duration,
+                    "route": stats.route if stats is not None else UNKNOWN_ROUTE,
+                }
+            },
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Add up the queries of each request and log the slow ones.
+
+    Args:
+        engine (Engine): The engine, e.g. `async_engine.sync_engine` for an AsyncEngine.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
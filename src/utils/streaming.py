@@ -0,0 +1,179 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator
+
+from excepts import ContentTooLarge, InvalidValue, UnsupportedMediaType
+
+"""
+Incremental parsing of NDJSON and CSV request bodies.
+The body is consumed chunk by chunk, so an upload is never held in memory as a whole: only
+the current line, whose length is capped.
+"""
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson")
+CSV_MEDIA_TYPES = ("text/csv",)
+
+# A record is a (line number, value) pair, where the value is the parsed object, or the
+# exception raised while parsing the line, so that bad lines can be reported and skipped.
+Record = tuple[int, Any]
+
+
+def check_line_length(length: int, max_line_length: int) -> None:
+    if length > max_line_length:
+        raise ContentTooLarge(f"A line is longer than {max_line_length} characters")
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_length: int
+) -> AsyncIterator[str]:
+    """
+    Split a stream of bytes into UTF-8 decoded lines, keeping the trailing newline.
+
+    Only "\\n" ends a line, since JSON strings may contain other Unicode line separators.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw body, e.g. `request.stream()`.
+        max_line_length (int): Maximum length of a line, newline excluded.
+
+    Yields:
+        str: The lines of the body.
+
+    Raises:
+        ContentTooLarge: As soon as a line is longer than `max_line_length`, so that a body
+            without newlines isn't buffered whole.
+        InvalidValue: If the body isn't valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    # Bytes of the body passed to the decoder so far
+    offset = 0
+
+    def decode(chunk: bytes, final: bool = False) -> str:
+        nonlocal offset
+        # Bytes of an incomplete character held by the decoder since the previous chunk
+        held = len(decoder.getstate()[0])
+        try:
+            return decoder.decode(chunk, final=final)
+        except UnicodeDecodeError as e:
+            raise InvalidValue(
+                f"The body isn't valid UTF-8 at byte {offset - held + e.start}"
+            ) from None
+        finally:
+            offset += len(chunk)
+
+    async for chunk in chunks:
+        pending += decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            check_line_length(len(line), max_line_length)
+            yield line + "\n"
+        check_line_length(len(pending), max_line_length)
+    pending += decode(b"", final=True)
+    if pending:
+        check_line_length(len(pending), max_line_length)
+        yield pending
+
+
+async def iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    """
+    Parse one JSON value per line, skipping blank lines.
+
+    Args:
+        lines (AsyncIterator[str]): The lines of the body.
+
+    Yields:
+        Record: The line number and the parsed value.
+    """
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+
+async def iter_csv(
+    lines: AsyncIterator[str], max_line_length: int
+) -> AsyncIterator[Record]:
+    """
+    Parse CSV rows into dictionaries keyed by the header row, skipping blank lines.
+
+    Quoted fields may span several lines. Empty fields are left out of the dictionary,
+    so they fall back to the default value of the model.
+
+    Args:
+        lines (AsyncIterator[str]): The lines of the body.
+        max_line_length (int): Maximum length of a row, which may span several lines.
+
+    Yields:
+        Record: The line number where the row starts and the parsed row.
+
+    Raises:
+        ContentTooLarge: If a row is longer than `max_line_length`, e.g. because of an
+            unterminated quoted field.
+    """
+    header = None
+    record_lines = []
+    record_length = 0
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        record_lines.append(line)
+        record_length += len(line)
+        # An odd number of quotes means a quoted field continues on the next line
+        if sum(record_line.count('"') for record_line in record_lines) % 2:
+            if record_length > max_line_length:
+                raise ContentTooLarge(
+                    f"A row is longer than {max_line_length} characters"
+                )
+            continue
+
+        row = next(csv.reader(record_lines), [])
+        start = line_number - len(record_lines) + 1
+        record_lines = []
+        record_length = 0
+        if not any(row):
+            continue
+        if header is None:
+            header = row
+        elif len(row) != len(header):
+            yield start, ValueError(f"Expected {len(header)} fields, got {len(row)}")
+        else:
+            yield start, {key: value for key, value in zip(header, row) if value != ""}
+
+    if record_lines:
+        yield (
+            line_number - len(record_lines) + 1,
+            ValueError("Unterminated quoted field"),
+        )
+
+
+def iter_records(
+    chunks: AsyncIterator[bytes], media_type: str, max_line_length: int
+) -> AsyncIterator[Record]:
+    """
+    Parse a streamed body according to its media type.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw body, e.g. `request.stream()`.
+        media_type (str): The media type of the body, without parameters.
+        max_line_length (int): Maximum length of a line, or of a CSV row.
+
+    Returns:
+        AsyncIterator[Record]: The records of the body.
+
+    Raises:
+        UnsupportedMediaType: If the body is neither NDJSON nor CSV.
+    """
+    if media_type in NDJSON_MEDIA_TYPES:
+        return iter_ndjson(iter_lines(chunks, max_line_length))
+    if media_type in CSV_MEDIA_TYPES:
+        return iter_csv(iter_lines(chunks, max_line_length), max_line_length)
+    raise UnsupportedMediaType(
+        f"Expected one of {', '.join(NDJSON_MEDIA_TYPES + CSV_MEDIA_TYPES)}, "
+        f"got '{media_type}'"
+    )
@@ -0,0 +1,58 @@
+import pytest
+from fastapi import status
+from sqlmodel import create_engine
+from starlette.testclient import TestClient
+from utils.health import HealthMonitor
+
+
+@pytest.fixture
+def health_monitor(mocker, tmp_path) -> HealthMonitor:
+    engine = create_engine(f"sqlite:///{tmp_path / 'health.db'}")
+    monitor = HealthMonitor(
+        probe_engine=engine,
+        engines=[engine],
+        interval=60,
+        window=3,
+        latency_threshold=60.0,
+    )
+    monitor.probe()
+    mocker.patch("state.health_monitor", monitor)
+    yield monitor
+    monitor.stop()
+
+
+def test_liveness(client: TestClient):
+    response = client.get("/health/liveness")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "OK"}
+
+
+def test_readiness(health_monitor, client: TestClient):
+    response = client.get("/health/readiness")
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert data["status"] == "OK"
+    assert data["database"] == "OK"
+    assert data["latency_ms"]["last"] > 0
+
+
+def test_readiness_degraded(mocker, health_monitor, client: TestClient):
+    health_monitor.latency_threshold = 0.0
+
+    response = client.get("/health/readiness")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["status"] == "DEGRADED"
+
+    mocker.patch("config.settings.HEALTH_DEGRADED_UNREADY", False)
+    response = client.get("/health/readiness")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "DEGRADED"
+
+
+def test_readiness_before_startup(client: TestClient):
+    response = client.get("/health/readiness")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json() == {"status": "FAIL", "database": "UNKNOWN"}
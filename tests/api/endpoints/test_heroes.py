@@ -1,7 +1,15 @@
+import pytest
+from api.services.heroes import (
+    build_heroes_query,
+    build_heroes_search,
+    prefix_upper_bound,
+)
 from fastapi import status
-from models import Hero
-from sqlmodel import Session
+from fastapi.encoders import jsonable_encoder
+from models import Hero, HeroPublic
+from sqlmodel import Session, select, text
 from starlette.testclient import TestClient
+from utils.pagination import encode_cursor
 
 
 def test_create_hero(client_with_db: TestClient, session: Session):
@@ -58,6 +66,26 @@ def test_read_heroes(session: Session, client_with_db: TestClient):
     assert data[1]["id"] == str(hero_2.id)
 
 
+def test_read_heroes_matches_response_model(
+    session: Session, client_with_db: TestClient
+):
+    session.add(Hero(name="Deadpond", secret_name="Dive Wilson"))
+    session.add(Hero(name="Rusty-Man", secret_name="Tommy Sharp", age=48))
+    session.commit()
+
+    response = client_with_db.get("/heroes/")
+    heroes = session.exec(select(Hero).order_by(Hero.id)).all()
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == jsonable_encoder(
+        [HeroPublic.model_validate(hero) for hero in heroes]
+    )
+    schema = client_with_db.get("/openapi.json").json()
+    assert schema["paths"]["/heroes/"]["get"]["responses"]["200"]["content"][
+        "application/json"
+    ]["schema"]["items"] == {"$ref": "#/components/schemas/HeroPublic"}
+
+
 def test_read_hero(session: Session, client_with_db: TestClient):
     hero_1 = Hero(name="Deadpond", secret_name="Dive Wilson")
     session.add(hero_1)
@@ -88,6 +116,48 @@ def test_update_hero(session: Session, client_with_db: TestClient):
     assert data["id"] == str(hero_1.id)
 
 
+def test_update_hero_with_version(session: Session, client_with_db: TestClient):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+
+    response = client_with_db.patch(
+        f"/heroes/{hero.id}", json={"name": "Deadpuddle", "version": 1}
+    )
+    stale_response = client_with_db.patch(
+        f"/heroes/{hero.id}", json={"name": "Deadpond", "version": 1}
+    )
+    unconditional_response = client_with_db.patch(
+        f"/heroes/{hero.id}", json={"age": 30}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["version"] == 2
+    assert stale_response.status_code == status.HTTP_409_CONFLICT
+    assert "is at version 2, not 1" in stale_response.json()["detail"]
+    assert unconditional_response.status_code == status.HTTP_200_OK
+    assert unconditional_response.json() == {
+        "name": "Deadpuddle",
+        "age": 30,
+        "id": str(hero.id),
+        "version": 3,
+    }
+    session.refresh(hero)
+    assert (hero.name, hero.version) == ("Deadpuddle", 3)
+
+
+def test_update_hero_not_found(client_with_db: TestClient):
+    hero_id = "0193b3a0-0000-7000-8000-000000000000"
+
+    response = client_with_db.patch(f"/heroes/{hero_id}", json={"name": "Deadpuddle"})
+    versioned_response = client_with_db.patch(
+        f"/heroes/{hero_id}", json={"name": "Deadpuddle", "version": 1}
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert versioned_response.status_code == status.HTTP_404_NOT_FOUND
+
+
 def test_delete_hero(session: Session, client_with_db: TestClient):
     hero_1 = Hero(name="Deadpond", secret_name="Dive Wilson")
     session.add(hero_1)
@@ -118,3 +188,279 @@ def test_update_hero_rollback_on_commit_error(
         # Verify hero wasn't updated
         session.refresh(hero)
         assert hero.name == "Deadpond"
+
+
+def test_read_heroes_with_cursor(session: Session, client_with_db: TestClient):
+    heroes = [Hero(name=f"Hero {i}", secret_name=f"Secret {i}") for i in range(5)]
+    session.add_all(heroes)
+    session.commit()
+
+    response = client_with_db.get("/heroes/", params={"limit": 2})
+    pages = [response.json()]
+    while "X-Next-Cursor" in response.headers:
+        response = client_with_db.get(
+            "/heroes/",
+            params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        pages.append(response.json())
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [hero["id"] for page in pages for hero in page] == [
+        str(hero.id) for hero in heroes
+    ]
+
+
+def test_read_heroes_invalid_cursor(client_with_db: TestClient):
+    response = client_with_db.get("/heroes/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert "Invalid cursor" in response.text
+
+
+def test_read_heroes_cursor_with_offset(session: Session, client_with_db: TestClient):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+
+    response = client_with_db.get("/heroes/", params={"limit": 1})
+    response = client_with_db.get(
+        "/heroes/",
+        params={"offset": 1, "cursor": response.headers["X-Next-Cursor"]},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_read_heroes_with_filters(session: Session, client_with_db: TestClient):
+    heroes = [
+        Hero(name="Deadpond", secret_name="Dive Wilson", age=30),
+        Hero(name="Deadpool", secret_name="Wade Wilson", age=35),
+        Hero(name="Dead%", secret_name="Percy", age=40),
+        Hero(name="deadpond", secret_name="Lowercase", age=45),
+        Hero(name="Rusty-Man", secret_name="Tommy Sharp", age=48),
+    ]
+    session.add_all(heroes)
+    session.commit()
+
+    def names(**params) -> list[str]:
+        response = client_with_db.get("/heroes/", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        return [hero["name"] for hero in response.json()]
+
+    assert names(name="Deadpond") == ["Deadpond"]
+    assert names(name_prefix="Dead") == ["Deadpond", "Deadpool", "Dead%"]
+    assert names(name_prefix="Dead%") == ["Dead%"]
+    assert names(min_age=35, max_age=45) == ["Deadpool", "Dead%", "deadpond"]
+    assert names(name_prefix="Dead", min_age=31) == ["Deadpool", "Dead%"]
+    assert names(name="Nobody") == []
+    # The upper bound of the range skips the surrogates, which can't be encoded
+    assert names(name_prefix="\ud7ff") == []
+
+    response = client_with_db.get(
+        "/heroes/", params={"name_prefix": "Dead", "limit": 2}
+    )
+    cursor = response.headers["X-Next-Cursor"]
+    assert names(name_prefix="Dead", limit=2, cursor=cursor) == ["Dead%"]
+
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound("Dead") == "Deae"
+    assert prefix_upper_bound("a\U0010ffff") == "b"
+    assert prefix_upper_bound("\U0010ffff") is None
+    assert prefix_upper_bound("a\ud7ff") == "a\ue000"
+
+
+def explain(session: Session, statement) -> str:
+    """Return the query plan of a statement, on SQLite or PostgreSQL."""
+    dialect = session.get_bind().dialect
+    sql = statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    if dialect.name == "sqlite":
+        rows = session.connection().execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+        return "\n".join(row[-1] for row in rows)
+    rows = session.connection().execute(text(f"EXPLAIN {sql}"))
+    return "\n".join(row[0] for row in rows)
+
+
+@pytest.mark.parametrize(
+    "filters, index",
+    [
+        ({"name": "Hero 7"}, "ix_hero_name_id"),
+        ({"name_prefix": "Hero 99"}, "ix_hero_name_id"),
+        ({"min_age": 10, "max_age": 11}, "ix_hero_age_id"),
+        ({"name_prefix": "Hero 99", "min_age": 90}, "ix_hero_name_id"),
+    ],
+)
+def test_read_heroes_filters_use_indexes(session: Session, filters: dict, index: str):
+    heroes = [
+        Hero(name=f"Hero {i}", secret_name=f"Secret {i}", age=i % 100)
+        for i in range(1000)
+    ]
+    session.add_all(heroes)
+    session.flush()
+    session.connection().execute(text("ANALYZE hero"))
+
+    for cursor in (None, encode_cursor(heroes[0].id)):
+        plan = explain(session, build_heroes_query(cursor=cursor, **filters))
+
+        assert index in plan, plan
+
+
+def test_search_heroes(session: Session, client_with_db: TestClient):
+    heroes = [
+        Hero(name="Deadpond", secret_name="Dive Wilson"),
+        Hero(name="Rusty-Man Pool", secret_name="Tommy Sharp"),
+        Hero(name="Pool Party Pool", secret_name="Wade Wilson"),
+        Hero(name="Spider-Boy", secret_name="Pedro Parqueador"),
+    ]
+    session.add_all(heroes)
+    session.commit()
+
+    def search(q: str) -> list[str]:
+        response = client_with_db.get("/heroes/search", params={"q": q})
+        assert response.status_code == status.HTTP_200_OK
+        return [hero["name"] for hero in response.json()]
+
+    # The best match first, whatever the insertion order
+    assert search("pool") == ["Pool Party Pool", "Rusty-Man Pool"]
+    assert search("DEAD") == ["Deadpond"]
+    assert search("rus po") == ["Rusty-Man Pool"]
+    assert search('spider "boy*') == ["Spider-Boy"]
+    assert search("parqueador") == []
+    assert search("-") == []
+
+    # The index follows the updates and deletes of the heroes
+    client_with_db.patch(f"/heroes/{heroes[0].id}", json={"name": "Lizard"})
+    client_with_db.delete(f"/heroes/{heroes[3].id}")
+    assert search("dead") == []
+    assert search("liz") == ["Lizard"]
+    assert search("spider") == []
+
+
+def test_search_heroes_uses_text_index(session: Session):
+    session.add_all(
+        [Hero(name=f"Hero {i}", secret_name=f"Secret {i}") for i in range(1000)]
+    )
+    session.flush()
+    session.connection().execute(text("ANALYZE hero"))
+    dialect_name = session.get_bind().dialect.name
+
+    plan = explain(session, build_heroes_search("hero 99", 20, dialect_name))
+
+    if dialect_name == "postgresql":
+        assert "ix_hero_search_vector" in plan, plan
+    else:
+        # The matches come from the FTS5 table, then the heroes are read by rowid
+        assert "SCAN hero_search VIRTUAL TABLE" in plan, plan
+        assert "SEARCH hero USING INTEGER PRIMARY KEY (rowid=?)" in plan, plan
+
+
+def test_search_heroes_limit(session: Session, client_with_db: TestClient):
+    session.add_all([Hero(name=f"Hero {i}", secret_name="Secret") for i in range(5)])
+    session.commit()
+
+    response = client_with_db.get("/heroes/search", params={"q": "hero", "limit": 2})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 2
+
+
+def test_read_hero_from_cache(hero_cache, session: Session, client_with_db: TestClient):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+    first_response = client_with_db.get(f"/heroes/{hero.id}")
+
+    # Changes that bypass the API are not seen until the entry expires
+    hero.name = "Deadpuddle"
+    session.add(hero)
+    session.commit()
+    second_response = client_with_db.get(f"/heroes/{hero.id}")
+
+    assert second_response.status_code == status.HTTP_200_OK
+    assert second_response.content == first_response.content
+    assert second_response.json()["name"] == "Deadpond"
+    assert hero_cache.stats()["hits"] == 1
+
+
+def test_update_hero_invalidates_cache(
+    hero_cache, session: Session, client_with_db: TestClient
+):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+    client_with_db.get(f"/heroes/{hero.id}")
+
+    client_with_db.patch(f"/heroes/{hero.id}", json={"name": "Deadpuddle"})
+    response = client_with_db.get(f"/heroes/{hero.id}")
+
+    assert response.json()["name"] == "Deadpuddle"
+
+
+def test_delete_hero_invalidates_cache(
+    hero_cache, session: Session, client_with_db: TestClient
+):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+    client_with_db.get(f"/heroes/{hero.id}")
+
+    client_with_db.delete(f"/heroes/{hero.id}")
+    response = client_with_db.get(f"/heroes/{hero.id}")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_read_hero_not_modified(session: Session, client_with_db: TestClient):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+    etag = client_with_db.get(f"/heroes/{hero.id}").headers["ETag"]
+
+    response = client_with_db.get(
+        f"/heroes/{hero.id}", headers={"If-None-Match": f'"other", W/{etag}'}
+    )
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+def test_read_heroes_etag(session: Session, client_with_db: TestClient):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+    etag = client_with_db.get("/heroes/").headers["ETag"]
+
+    not_modified = client_with_db.get("/heroes/", headers={"If-None-Match": etag})
+    client_with_db.patch(f"/heroes/{hero.id}", json={"name": "Deadpuddle"})
+    modified = client_with_db.get("/heroes/", headers={"If-None-Match": etag})
+
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert modified.status_code == status.HTTP_200_OK
+    assert modified.headers["ETag"] != etag
+    assert modified.json()[0]["name"] == "Deadpuddle"
+
+
+def test_update_hero_if_match(session: Session, client_with_db: TestClient):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+    etag = client_with_db.get(f"/heroes/{hero.id}").headers["ETag"]
+
+    response = client_with_db.patch(
+        f"/heroes/{hero.id}", json={"name": "Deadpuddle"}, headers={"If-Match": etag}
+    )
+    stale_response = client_with_db.patch(
+        f"/heroes/{hero.id}", json={"name": "Deadpond"}, headers={"If-Match": etag}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert (
+        response.headers["ETag"]
+        == (client_with_db.get(f"/heroes/{hero.id}").headers["ETag"])
+    )
+    assert stale_response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    session.refresh(hero)
+    assert hero.name == "Deadpuddle"
@@ -0,0 +1,135 @@
+from fastapi import status
+from models import Hero
+from sqlmodel import Session
+from starlette.testclient import TestClient
+
+
+def test_create_hero(async_client_with_db: TestClient):
+    response = async_client_with_db.post(
+        "/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
+    )
+
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert data["name"] == "Deadpond"
+    assert data["age"] is None
+    assert data["id"] is not None
+
+
+def test_read_heroes(db_engine, async_client_with_db: TestClient):
+    hero_1 = Hero(name="Deadpond", secret_name="Dive Wilson")
+    hero_2 = Hero(name="Rusty-Man", secret_name="Tommy Sharp", age=48)
+    with Session(db_engine, expire_on_commit=False) as session:
+        session.add(hero_1)
+        session.add(hero_2)
+        session.commit()
+
+    response = async_client_with_db.get("/heroes/")
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+
+    assert len(data) == 2
+    assert data[0]["name"] == hero_1.name
+    assert "secret_name" not in data[0].keys()
+    assert data[0]["id"] == str(hero_1.id)
+    assert data[1]["name"] == hero_2.name
+    assert data[1]["age"] == hero_2.age
+    assert data[1]["id"] == str(hero_2.id)
+
+
+def test_read_heroes_with_filters(db_engine, async_client_with_db: TestClient):
+    with Session(db_engine) as session:
+        session.add(Hero(name="Deadpond", secret_name="Dive Wilson", age=30))
+        session.add(Hero(name="Deadpool", secret_name="Wade Wilson", age=35))
+        session.add(Hero(name="Rusty-Man", secret_name="Tommy Sharp", age=48))
+        session.commit()
+
+    response = async_client_with_db.get(
+        "/heroes/", params={"name_prefix": "Dead", "min_age": 31}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [hero["name"] for hero in response.json()] == ["Deadpool"]
+
+
+def test_search_heroes(db_engine, async_client_with_db: TestClient):
+    with Session(db_engine) as session:
+        session.add(Hero(name="Deadpond", secret_name="Dive Wilson"))
+        session.add(Hero(name="Rusty-Man", secret_name="Tommy Sharp"))
+        session.commit()
+
+    response = async_client_with_db.get("/heroes/search", params={"q": "dead"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [hero["name"] for hero in response.json()] == ["Deadpond"]
+
+
+def test_read_hero_not_found(async_client_with_db: TestClient):
+    response = async_client_with_db.get("/heroes/0193b3a0-0000-7000-8000-000000000000")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_update_hero(async_client_with_db: TestClient):
+    hero_id = async_client_with_db.post(
+        "/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
+    ).json()["id"]
+
+    response = async_client_with_db.patch(
+        f"/heroes/{hero_id}", json={"name": "Deadpuddle"}
+    )
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert data["name"] == "Deadpuddle"
+    assert data["id"] == hero_id
+
+
+def test_update_hero_with_version(async_client_with_db: TestClient):
+    hero_id = async_client_with_db.post(
+        "/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
+    ).json()["id"]
+
+    response = async_client_with_db.patch(
+        f"/heroes/{hero_id}", json={"name": "Deadpuddle", "version": 1}
+    )
+    stale_response = async_client_with_db.patch(
+        f"/heroes/{hero_id}", json={"name": "Deadpond", "version": 1}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["version"] == 2
+    assert stale_response.status_code == status.HTTP_409_CONFLICT
+    assert async_client_with_db.get(f"/heroes/{hero_id}").json()["name"] == "Deadpuddle"
+
+
+def test_delete_hero(async_client_with_db: TestClient):
+    hero_id = async_client_with_db.post(
+        "/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
+    ).json()["id"]
+
+    response = async_client_with_db.delete(f"/heroes/{hero_id}")
+    assert response.status_code == status.HTTP_200_OK
+
+    response = async_client_with_db.get(f"/heroes/{hero_id}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_read_heroes_with_cursor(db_engine, async_client_with_db: TestClient):
+    heroes = [Hero(name=f"Hero {i}", secret_name=f"Secret {i}") for i in range(3)]
+    hero_ids = [str(hero.id) for hero in heroes]
+    with Session(db_engine) as session:
+        session.add_all(heroes)
+        session.commit()
+
+    first_page = async_client_with_db.get("/heroes/", params={"limit": 2})
+    second_page = async_client_with_db.get(
+        "/heroes/",
+        params={"limit": 2, "cursor": first_page.headers["X-Next-Cursor"]},
+    )
+
+    assert [hero["id"] for hero in first_page.json()] == hero_ids[:2]
+    assert [hero["id"] for hero in second_page.json()] == hero_ids[2:]
+    assert "X-Next-Cursor" not in second_page.headers
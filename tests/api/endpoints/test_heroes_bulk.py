@@ -0,0 +1,272 @@
+import json
+
+from config import settings
+from fastapi import status
+from models import Hero
+from sqlmodel import Session, select
+from starlette.testclient import TestClient
+
+
+def test_create_heroes(session: Session, client_with_db: TestClient):
+    heroes = [
+        {"name": "Deadpond", "secret_name": "Dive Wilson"},
+        {"name": "Rusty-Man", "secret_name": "Tommy Sharp", "age": 48},
+    ]
+
+    response = client_with_db.post("/heroes/bulk", json=heroes)
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [hero["name"] for hero in data] == ["Deadpond", "Rusty-Man"]
+    assert data[1]["age"] == 48
+    assert "secret_name" not in data[0].keys()
+
+    heroes_in_db = session.exec(select(Hero).order_by(Hero.id)).all()
+    assert [str(hero.id) for hero in heroes_in_db] == [hero["id"] for hero in data]
+
+
+def test_create_heroes_in_batches(mocker, session: Session, client_with_db: TestClient):
+    mocker.patch("config.settings.BULK_BATCH_SIZE", 2)
+    heroes = [{"name": f"Hero {i}", "secret_name": f"Secret {i}"} for i in range(5)]
+
+    response = client_with_db.post("/heroes/bulk", json=heroes)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(session.exec(select(Hero)).all()) == 5
+
+
+def test_create_heroes_reports_invalid_items(
+    session: Session, client_with_db: TestClient
+):
+    heroes = [
+        {"name": "Deadpond", "secret_name": "Dive Wilson"},
+        {"name": "Rusty-Man"},
+    ]
+
+    response = client_with_db.post("/heroes/bulk", json=heroes)
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == ["1.secret_name: Field required"]
+    assert session.exec(select(Hero)).all() == []
+
+
+def test_create_heroes_too_many_items(client: TestClient):
+    heroes = [{"name": "Deadpond", "secret_name": "Dive Wilson"}] * (
+        settings.BULK_MAX_ITEMS + 1
+    )
+
+    response = client.post("/heroes/bulk", json=heroes)
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_update_heroes(mocker, session: Session, client_with_db: TestClient):
+    mocker.patch("config.settings.BULK_BATCH_SIZE", 2)
+    heroes = [Hero(name=f"Hero {i}", secret_name=f"Secret {i}") for i in range(5)]
+    session.add_all(heroes)
+    session.commit()
+    missing_id = "01890a5d-ac96-774b-bcce-b302099a8057"
+    items = [
+        {"id": str(heroes[3].id), "age": 30},
+        {"id": missing_id, "age": 1},
+        {"id": str(heroes[0].id), "name": "Deadpond", "age": None},
+        {"id": str(heroes[1].id), "age": 31},
+        {"id": str(heroes[3].id), "name": "Rusty-Man"},
+        {"id": str(heroes[2].id), "age": 32},
+    ]
+
+    response = client_with_db.patch("/heroes/bulk", json=items)
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert data["not_found"] == [missing_id]
+    assert [hero["id"] for hero in data["updated"]] == [
+        str(heroes[i].id) for i in (3, 0, 1, 2)
+    ]
+    assert data["updated"][0] == {
+        "name": "Rusty-Man",
+        "age": 30,
+        "id": str(heroes[3].id),
+        "version": 2,
+    }
+    assert data["updated"][1]["name"] == "Deadpond"
+    assert "secret_name" not in data["updated"][0]
+
+    session.expire_all()
+    assert [(hero.name, hero.age, hero.version) for hero in heroes] == [
+        ("Deadpond", None, 2),
+        ("Hero 1", 31, 2),
+        ("Hero 2", 32, 2),
+        ("Rusty-Man", 30, 2),
+        ("Hero 4", None, 1),
+    ]
+    assert heroes[0].secret_name == "Secret 0"
+
+
+def test_update_heroes_invalidates_cache(
+    hero_cache, session: Session, client_with_db: TestClient
+):
+    hero = Hero(name="Deadpond", secret_name="Dive Wilson")
+    session.add(hero)
+    session.commit()
+    client_with_db.get(f"/heroes/{hero.id}")
+
+    client_with_db.patch("/heroes/bulk", json=[{"id": str(hero.id), "age": 30}])
+
+    assert client_with_db.get(f"/heroes/{hero.id}").json()["age"] == 30
+
+
+def test_update_heroes_invalid_id(client: TestClient):
+    response = client.patch("/heroes/bulk", json=[{"id": "not-a-uuid", "age": 30}])
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_export_heroes(mocker, session: Session, client_with_db: TestClient):
+    mocker.patch("config.settings.EXPORT_CHUNK_SIZE", 2)
+    heroes = [Hero(name=f"Hero {i}", secret_name=f"Secret {i}") for i in range(5)]
+    session.add_all(heroes)
+    session.commit()
+
+    response = client_with_db.get("/heroes/export")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line["id"] for line in lines] == [str(hero.id) for hero in heroes]
+    assert lines[0] == {
+        "name": "Hero 0",
+        "age": None,
+        "id": str(heroes[0].id),
+        "version": 1,
+    }
+
+
+def test_export_heroes_empty(client_with_db: TestClient):
+    response = client_with_db.get("/heroes/export")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == ""
+
+
+def test_import_heroes_ndjson(mocker, session: Session, client_with_db: TestClient):
+    mocker.patch("config.settings.IMPORT_CHUNK_SIZE", 2)
+    body = "\n".join(
+        [
+            json.dumps({"name": "Deadpond", "secret_name": "Dive Wilson"}),
+            json.dumps({"name": "Rusty-Man", "secret_name": "Tommy Sharp", "age": 48}),
+            "",
+            json.dumps({"name": "Spider-Boy"}),
+            "{not json",
+            json.dumps({"name": "Captain North", "secret_name": "Bill Woods"}),
+        ]
+    )
+
+    response = client_with_db.post(
+        "/heroes/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert data["imported"] == 3
+    assert data["rejected"] == 2
+    assert data["errors"][0] == "4: secret_name: Field required"
+    assert data["errors"][1].startswith("5: Invalid JSON")
+    heroes_in_db = session.exec(select(Hero).order_by(Hero.id)).all()
+    assert [hero.name for hero in heroes_in_db] == [
+        "Deadpond",
+        "Rusty-Man",
+        "Captain North",
+    ]
+
+
+def test_import_heroes_csv(session: Session, client_with_db: TestClient):
+    body = (
+        "name,secret_name,age\r\n"
+        'Deadpond,"Wilson, Dive",\r\n'
+        'Rusty-Man,"Tommy\nSharp",48\r\n'
+        "Spider-Boy,Pedro Parqueador,not-an-age\r\n"
+    )
+
+    response = client_with_db.post(
+        "/heroes/import",
+        content=body,
+        headers={"Content-Type": "text/csv; charset=utf-8"},
+    )
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert data["imported"] == 2
+    assert data["rejected"] == 1
+    assert data["errors"][0].startswith("5: age:")
+    heroes_in_db = session.exec(select(Hero).order_by(Hero.id)).all()
+    assert [(hero.secret_name, hero.age) for hero in heroes_in_db] == [
+        ("Wilson, Dive", None),
+        ("Tommy\nSharp", 48),
+    ]
+
+
+def test_import_heroes_line_too_long(
+    mocker, session: Session, client_with_db: TestClient
+):
+    mocker.patch("config.settings.IMPORT_CHUNK_SIZE", 1)
+    mocker.patch("config.settings.IMPORT_MAX_LINE_LENGTH", 100)
+    body = json.dumps({"name": "Deadpond", "secret_name": "Dive Wilson"}) + "\n"
+    # A body without newlines would otherwise be buffered whole
+    body += json.dumps({"name": "Rusty-Man", "secret_name": "x" * 200})
+
+    response = client_with_db.post(
+        "/heroes/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert "longer than 100 characters" in response.json()["detail"]
+    # The chunks written before the long line are kept
+    assert [hero.name for hero in session.exec(select(Hero)).all()] == ["Deadpond"]
+
+
+def test_import_heroes_csv_unterminated_quote(
+    mocker, session: Session, client_with_db: TestClient
+):
+    mocker.patch("config.settings.IMPORT_MAX_LINE_LENGTH", 100)
+    # Every following line would be part of the quoted field
+    body = 'name,secret_name\r\nDeadpond,"Dive\r\n' + "Rusty-Man,Tommy Sharp\r\n" * 10
+
+    response = client_with_db.post(
+        "/heroes/import",
+        content=body,
+        headers={"Content-Type": "text/csv"},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert "A row is longer than 100 characters" in response.json()["detail"]
+    assert session.exec(select(Hero)).all() == []
+
+
+def test_import_heroes_invalid_utf8(client_with_db: TestClient):
+    body = json.dumps({"name": "Deadpond", "secret_name": "Dive Wilson"}).encode()
+    body += b"\n\xff\xfe\n"
+
+    response = client_with_db.post(
+        "/heroes/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    offset = body.index(b"\xff")
+    assert f"valid UTF-8 at byte {offset}" in response.json()["detail"]
+
+
+def test_import_heroes_unsupported_media_type(client: TestClient):
+    response = client.post(
+        "/heroes/import",
+        content="<heroes/>",
+        headers={"Content-Type": "application/xml"},
+    )
+
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
@@ -0,0 +1,160 @@
+import time
+
+from fastapi import status
+from models import Hero, IdempotencyKey
+from sqlmodel import Session, func, select
+from starlette.testclient import TestClient
+from utils.idempotency import IDEMPOTENCY_REPLAYED_HEADER, IdempotencyStore
+
+HERO = {"name": "Deadpond", "secret_name": "Dive Wilson"}
+
+
+def count_heroes(session: Session) -> int:
+    return session.exec(select(func.count()).select_from(Hero)).one()
+
+
+def test_create_hero_replays_the_stored_response(
+    client_with_db: TestClient, session: Session, idempotency_store: IdempotencyStore
+):
+    headers = {"Idempotency-Key": "create-1"}
+
+    first = client_with_db.post("/heroes/", json=HERO, headers=headers)
+    retry = client_with_db.post("/heroes/", json=HERO, headers=headers)
+
+    assert first.status_code == status.HTTP_200_OK
+    assert retry.status_code == status.HTTP_200_OK
+    assert retry.content == first.content
+    assert IDEMPOTENCY_REPLAYED_HEADER not in first.headers
+    assert retry.headers[IDEMPOTENCY_REPLAYED_HEADER] == "true"
+    assert count_heroes(session) == 1
+    assert idempotency_store.stats()["replays"] == 1
+
+
+def test_create_hero_replays_from_the_database(
+    client_with_db: TestClient, session: Session, idempotency_store: IdempotencyStore
+):
+    headers = {"Idempotency-Key": "create-2"}
+    first = client_with_db.post("/heroes/", json=HERO, headers=headers)
+    # As if the retry was served by another worker
+    idempotency_store.cache.clear()
+
+    retry = client_with_db.post("/heroes/", json=HERO, headers=headers)
+
+    assert retry.content == first.content
+    assert retry.headers[IDEMPOTENCY_REPLAYED_HEADER] == "true"
+    assert session.get(IdempotencyKey, "create-2").body == first.content
+    assert count_heroes(session) == 1
+
+
+def test_create_hero_key_reused_for_another_request(
+    client_with_db: TestClient, session: Session, idempotency_store: IdempotencyStore
+):
+    headers = {"Idempotency-Key": "create-3"}
+    client_with_db.post("/heroes/", json=HERO, headers=headers)
+
+    response = client_with_db.post(
+        "/heroes/", json={**HERO, "age": 30}, headers=headers
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert "Idempotency-Key" in response.json()["detail"]
+    assert count_heroes(session) == 1
+
+
+def test_create_hero_without_key(
+    client_with_db: TestClient, session: Session, idempotency_store: IdempotencyStore
+):
+    client_with_db.post("/heroes/", json=HERO)
+    client_with_db.post("/heroes/", json=HERO)
+
+    assert count_heroes(session) == 2
+    assert session.exec(select(IdempotencyKey)).all() == []
+
+
+def test_create_heroes_bulk_replays_the_stored_response(
+    client_with_db: TestClient, session: Session, idempotency_store: IdempotencyStore
+):
+    heroes = [HERO, {"name": "Rusty-Man", "secret_name": "Tommy Sharp"}]
+    headers = {"Idempotency-Key": "bulk-1"}
+
+    first = client_with_db.post("/heroes/bulk", json=heroes, headers=headers)
+    retry = client_with_db.post("/heroes/bulk", json=heroes, headers=headers)
+    other_endpoint = client_with_db.post("/heroes/", json=HERO, headers=headers)
+
+    assert first.status_code == status.HTTP_200_OK
+    assert [hero["name"] for hero in first.json()] == ["Deadpond", "Rusty-Man"]
+    assert retry.content == first.content
+    assert other_endpoint.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert count_heroes(session) == 2
+
+
+def test_async_create_hero_replays_the_stored_response(
+    async_client_with_db: TestClient, idempotency_store: IdempotencyStore
+):
+    headers = {"Idempotency-Key": "async-1"}
+
+    first = async_client_with_db.post("/heroes/", json=HERO, headers=headers)
+    idempotency_store.cache.clear()
+    retry = async_client_with_db.post("/heroes/", json=HERO, headers=headers)
+
+    assert first.status_code == status.HTTP_200_OK
+    assert retry.content == first.content
+    assert retry.headers[IDEMPOTENCY_REPLAYED_HEADER] == "true"
+    assert len(async_client_with_db.get("/heroes/").json()) == 1
+
+
+def test_create_hero_key_committed_by_another_worker(
+    client_with_db: TestClient,
+    session: Session,
+    idempotency_store: IdempotencyStore,
+    mocker,
+):
+    headers = {"Idempotency-Key": "create-4"}
+    first = client_with_db.post("/heroes/", json=HERO, headers=headers)
+    idempotency_store.cache.clear()
+    stored = idempotency_store.load(session, "create-4")
+    # The other worker commits after this one found no stored response, so the insert of
+    # the key fails and this one replays the response of the other
+    mocker.patch.object(idempotency_store, "load", side_effect=[None, stored])
+
+    retry = client_with_db.post("/heroes/", json=HERO, headers=headers)
+
+    assert retry.content == first.content
+    assert retry.headers[IDEMPOTENCY_REPLAYED_HEADER] == "true"
+    assert count_heroes(session) == 1
+
+
+def test_create_hero_key_reused_after_it_expires(
+    client_with_db: TestClient,
+    session: Session,
+    idempotency_store: IdempotencyStore,
+    mocker,
+):
+    headers = {"Idempotency-Key": "create-5"}
+    first = client_with_db.post("/heroes/", json=HERO, headers=headers)
+    idempotency_store.cache.clear()
+    # The key expired, but the purger hasn't deleted it yet
+    mocker.patch("time.time", return_value=time.time() + 3600)
+
+    response = client_with_db.post("/heroes/", json=HERO, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert IDEMPOTENCY_REPLAYED_HEADER not in response.headers
+    assert response.json()["id"] != first.json()["id"]
+    assert count_heroes(session) == 2
+    assert session.get(IdempotencyKey, "create-5").body == response.content
+
+
+def test_async_create_hero_key_reused_after_it_expires(
+    async_client_with_db: TestClient, idempotency_store: IdempotencyStore, mocker
+):
+    headers = {"Idempotency-Key": "async-2"}
+    first = async_client_with_db.post("/heroes/", json=HERO, headers=headers)
+    idempotency_store.cache.clear()
+    mocker.patch("time.time", return_value=time.time() + 3600)
+
+    response = async_client_with_db.post("/heroes/", json=HERO, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert IDEMPOTENCY_REPLAYED_HEADER not in response.headers
+    assert response.json()["id"] != first.json()["id"]
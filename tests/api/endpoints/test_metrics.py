@@ -0,0 +1,16 @@
+from fastapi import status
+from starlette.testclient import TestClient
+
+
+def test_read_metrics(client: TestClient):
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_requests_total{method="GET",route="/health",status="200"}'
+        in response.text
+    )
+    assert "http_requests_in_flight" in response.text
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from api.endpoints import heroes
+from database import ReplicaRouter
+from fastapi import FastAPI, status
+from middlewares.read_your_writes import PRIMARY_PIN_COOKIE, ReadYourWritesMiddleware
+from models import Hero
+from sqlmodel import Session, SQLModel, delete
+from starlette.testclient import TestClient
+from uuid_utils.compat import UUID, uuid7
+
+HERO_ID = uuid7()
+
+
+@pytest.fixture
+def replicas(db_engine, mocker, tmp_path):
+    """
+    Two SQLite replicas, holding the same hero under a different name, in front of the
+    test database as the primary.
+    """
+    urls = [f"sqlite:///{tmp_path / f'replica_{i}.db'}" for i in range(2)]
+    router = ReplicaRouter(urls, use_async=False, health_interval=60)
+    for i, replica in enumerate(router.replicas):
+        SQLModel.metadata.create_all(replica.engine)
+        with Session(replica.engine) as session:
+            session.add(Hero(id=HERO_ID, name=f"Replica {i}", secret_name="Secret"))
+            session.commit()
+    mocker.patch("state.engine", db_engine)
+    mocker.patch("state.replicas", router)
+    yield router
+
+    asyncio.run(router.dispose())
+    with Session(db_engine) as session:
+        session.exec(delete(Hero))
+        session.commit()
+
+
+@pytest.fixture
+def client(replicas) -> TestClient:
+    app = FastAPI()
+    app.include_router(heroes.router, prefix="/heroes")
+    app.add_middleware(ReadYourWritesMiddleware, window=60)
+    return TestClient(app)
+
+
+def test_reads_are_spread_over_the_replicas(client: TestClient):
+    names = {client.get(f"/heroes/{HERO_ID}").json()["name"] for _ in range(4)}
+
+    assert names == {"Replica 0", "Replica 1"}
+
+
+def test_reads_fall_back_to_the_primary(mocker, replicas, client: TestClient):
+    mocker.patch("database.check_health_safe", return_value=False)
+    replicas.check_health()
+
+    response = client.get(f"/heroes/{HERO_ID}")
+
+    # The hero only exists on the replicas
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_read_your_writes(client: TestClient):
+    response = client.post(
+        "/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
+    )
+    hero_id = response.json()["id"]
+
+    assert PRIMARY_PIN_COOKIE in response.cookies
+    # The client is pinned to the primary, which has the hero
+    assert client.get(f"/heroes/{hero_id}").status_code == status.HTTP_200_OK
+    # Other clients read from the replicas, which don't have it yet
+    other_client = TestClient(client.app)
+    assert other_client.get(f"/heroes/{hero_id}").status_code == (
+        status.HTTP_404_NOT_FOUND
+    )
+
+
+def test_reads_from_the_replicas_are_not_cached(client: TestClient, hero_cache):
+    client.get(f"/heroes/{HERO_ID}")
+
+    assert hero_cache.get(HERO_ID) is None
+
+
+def test_reads_from_the_primary_are_cached(client: TestClient, hero_cache):
+    response = client.post(
+        "/heroes/", json={"name": "Deadpond", "secret_name": "Dive Wilson"}
+    )
+    hero_id = UUID(response.json()["id"])
+
+    # Pinned to the primary after the write
+    read = client.get(f"/heroes/{hero_id}")
+
+    assert hero_cache.get(hero_id) == read.content
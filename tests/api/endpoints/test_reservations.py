@@ -0,0 +1,154 @@
+import threading
+
+from api.services.reservations import ClaimReaper, claim_resources
+from config import settings
+from fastapi import status
+from models import Resource, ResourceStatus
+from sqlmodel import Session, delete, select, update
+from starlette.testclient import TestClient
+
+
+def add_resources(client: TestClient, count: int) -> list[str]:
+    response = client.post(
+        "/reservations/resources",
+        json=[{"name": f"Seat {i}"} for i in range(count)],
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return [resource["id"] for resource in response.json()]
+
+
+def test_add_resources(session: Session, client_with_db: TestClient):
+    response = client_with_db.post(
+        "/reservations/resources", json=[{"name": "A1"}, {"name": "A2"}]
+    )
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [resource["name"] for resource in data] == ["A1", "A2"]
+    assert data[0]["status"] == "available"
+    assert data[0]["claim_token"] is None
+    assert len(session.exec(select(Resource)).all()) == 2
+
+
+def test_claim_resources(client_with_db: TestClient):
+    resource_ids = add_resources(client_with_db, 5)
+
+    first = client_with_db.post("/reservations/claim", params={"n": 3}).json()
+    second = client_with_db.post("/reservations/claim", params={"n": 3}).json()
+    third = client_with_db.post("/reservations/claim", params={"n": 3}).json()
+
+    assert [resource["id"] for resource in first["resources"]] == resource_ids[:3]
+    assert [resource["id"] for resource in second["resources"]] == resource_ids[3:]
+    assert third["resources"] == []
+    assert first["claim_token"] != second["claim_token"]
+    assert {resource["status"] for resource in first["resources"]} == {"claimed"}
+    assert first["resources"][0]["claim_token"] == first["claim_token"]
+
+
+def test_claim_resources_invalid_n(client: TestClient):
+    for n in (0, settings.RESERVATION_MAX_CLAIM + 1):
+        response = client.post("/reservations/claim", params={"n": n})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_confirm_claim(client_with_db: TestClient):
+    add_resources(client_with_db, 2)
+    claim = client_with_db.post("/reservations/claim", params={"n": 2}).json()
+
+    response = client_with_db.post(f"/reservations/{claim['claim_token']}/confirm")
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert {resource["status"] for resource in data} == {"confirmed"}
+    assert data[0]["lease_expires_at"] is None
+    # Confirmed resources are neither claimed nor released again
+    assert client_with_db.post("/reservations/claim").json()["resources"] == []
+    response = client_with_db.delete(f"/reservations/{claim['claim_token']}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_confirm_expired_claim(session: Session, client_with_db: TestClient):
+    add_resources(client_with_db, 2)
+    claim = client_with_db.post("/reservations/claim", params={"n": 2}).json()
+    session.exec(update(Resource).values(lease_expires_at=0))
+
+    response = client_with_db.post(f"/reservations/{claim['claim_token']}/confirm")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_release_claim(client_with_db: TestClient):
+    resource_ids = add_resources(client_with_db, 2)
+    claim = client_with_db.post("/reservations/claim", params={"n": 2}).json()
+
+    response = client_with_db.delete(f"/reservations/{claim['claim_token']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"released": 2}
+    claim = client_with_db.post("/reservations/claim", params={"n": 2}).json()
+    assert [resource["id"] for resource in claim["resources"]] == resource_ids
+
+
+def test_release_unknown_claim(client_with_db: TestClient):
+    response = client_with_db.delete(
+        "/reservations/01890a5d-ac96-774b-bcce-b302099a8057"
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_reaper_returns_expired_claims(db_engine):
+    reaper = ClaimReaper()
+    try:
+        with Session(db_engine) as session:
+            session.add_all([Resource(name=f"Seat {i}") for i in range(3)])
+            session.commit()
+            expired = claim_resources(session, n=2, lease=60)
+            claim_resources(session, n=1, lease=60)
+            session.exec(
+                update(Resource)
+                .where(Resource.claim_token == expired.claim_token)
+                .values(lease_expires_at=0)
+            )
+            session.commit()
+
+        assert reaper.reap(db_engine) == 2
+        assert reaper.stats() == {"reaped": 2}
+        with Session(db_engine) as session:
+            statuses = session.exec(select(Resource.status)).all()
+        assert sorted(statuses) == [
+            ResourceStatus.AVAILABLE,
+            ResourceStatus.AVAILABLE,
+            ResourceStatus.CLAIMED,
+        ]
+    finally:
+        with Session(db_engine) as session:
+            session.exec(delete(Resource))
+            session.commit()
+
+
+def test_concurrent_claims_get_distinct_resources(db_engine):
+    with Session(db_engine) as session:
+        session.add_all([Resource(name=f"Seat {i}") for i in range(100)])
+        session.commit()
+    claimed = []
+
+    def claim_all():
+        with Session(db_engine) as session:
+            while resources := claim_resources(session, n=3, lease=60).resources:
+                claimed.extend(resource.id for resource in resources)
+
+    try:
+        threads = [threading.Thread(target=claim_all) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(claimed) == 100
+        assert len(set(claimed)) == 100
+    finally:
+        with Session(db_engine) as session:
+            session.exec(delete(Resource))
+            session.commit()
@@ -0,0 +1,76 @@
+import logging
+import queue
+
+from config import settings
+from fastapi import status
+from sqlmodel import create_engine, text
+from starlette.testclient import TestClient
+from utils.log import DroppingQueueHandler
+from utils.metrics import MetricsRecorder
+
+
+def test_hero_cache_stats(hero_cache, client: TestClient):
+    hero_cache.set("a", b"1")
+    hero_cache.get("a")
+
+    response = client.get(
+        url="/stats/cache",
+        headers={"Authorization": settings.API_KEY.get_secret_value()},
+    )
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert data["enabled"] is True
+    assert data["entries"] == 1
+    assert data["hits"] == 1
+
+
+def test_hero_cache_stats_unauthorized(client: TestClient):
+    response = client.get(url="/stats/cache", headers={"Authorization": "wrong"})
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_logging_stats(mocker, client: TestClient):
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    mocker.patch("utils.log.queue_handler", handler)
+    handler.emit(logging.makeLogRecord({"msg": "first"}))
+    handler.emit(logging.makeLogRecord({"msg": "dropped"}))
+
+    response = client.get(
+        url="/stats/logging",
+        headers={"Authorization": settings.API_KEY.get_secret_value()},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["queue"] == {
+        "enabled": True,
+        "queued": 1,
+        "max_size": 1,
+        "dropped": 1,
+    }
+
+
+def test_pool_stats(mocker, tmp_path, client: TestClient):
+    recorder = MetricsRecorder()
+    mocker.patch("utils.metrics.recorder", recorder)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    recorder.watch_pool(engine, "sync")
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    response = client.get(
+        url="/stats/pool",
+        headers={"Authorization": settings.API_KEY.get_secret_value()},
+    )
+    data = response.json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert data["config"]["pool_size"] == settings.DATABASE_POOL_SIZE
+    assert len(data["workers"]) == 1
+    pool = data["workers"][0]["pools"]["sync"]
+    assert pool["checkouts"] == 1
+    assert pool["checked_out"] == 0
+    assert pool["idle"] == 1
+    assert pool["checkout_wait_avg_seconds"] >= 0
+    engine.dispose()
@@ -0,0 +1,48 @@
+from benchmarks.load import WORKLOADS, build_schedule, find_regressions
+
+
+def make_results(**row) -> dict:
+    defaults = {
+        "workload": "mixed",
+        "concurrency": 10,
+        "requests": 1000,
+        "errors": 0,
+        "rps": 100.0,
+        "p50_ms": 10.0,
+        "p95_ms": 20.0,
+        "p99_ms": 30.0,
+    }
+    return {"results": [{**defaults, **row}]}
+
+
+def test_build_schedule_is_deterministic():
+    schedule = build_schedule(WORKLOADS["mixed"])
+
+    assert schedule == build_schedule(WORKLOADS["mixed"])
+    assert set(schedule) == set(WORKLOADS["mixed"])
+
+
+def test_find_regressions_within_budget():
+    baseline = make_results()
+    results = make_results(rps=95.0, p95_ms=21.0, p99_ms=32.0)
+
+    assert find_regressions(results, baseline, budget=0.1) == []
+
+
+def test_find_regressions_beyond_budget():
+    baseline = make_results()
+    results = make_results(rps=80.0, p99_ms=40.0, errors=3)
+
+    regressions = find_regressions(results, baseline, budget=0.1)
+
+    assert len(regressions) == 3
+    assert regressions[0].startswith("mixed x10: rps 80.0")
+    assert regressions[1].startswith("mixed x10: p99_ms 40.0")
+    assert "3 errors" in regressions[2]
+
+
+def test_find_regressions_skips_rows_missing_from_baseline():
+    baseline = make_results(concurrency=50)
+    results = make_results(rps=1.0)
+
+    assert find_regressions(results, baseline, budget=0.1) == []
@@ -4,10 +4,16 @@ import pytest
 import sqlalchemy as sa
 from alembic import command
 from alembic.config import Config
-from api.deps import get_db_session
+from api.deps import get_db_session, get_read_db_session
+from api.endpoints import heroes_async
+from database import create_async_db_engine
+from fastapi import FastAPI
 from main import app
-from sqlmodel import Session, create_engine
+from models import Hero, IdempotencyKey
+from sqlmodel import Session, create_engine, delete
 from starlette.testclient import TestClient
+from utils.cache import TTLCache
+from utils.idempotency import IdempotencyStore
 
 
 def pytest_addoption(parser):
@@ -100,12 +106,54 @@ def client_fixture(session: Session):
         return session
 
     app.dependency_overrides[get_db_session] = get_session_override
+    app.dependency_overrides[get_read_db_session] = get_session_override
 
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def hero_cache(mocker) -> TTLCache:
+    """Enable a fresh hero cache for the duration of a test."""
+    cache = TTLCache(max_entries=100, ttl=60)
+    mocker.patch("state.hero_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def idempotency_store(mocker) -> IdempotencyStore:
+    """Enable a fresh Idempotency-Key store for the duration of a test."""
+    store = IdempotencyStore(ttl=60, max_entries=100)
+    mocker.patch("state.idempotency_store", store)
+    return store
+
+
+@pytest.fixture(name="async_client_with_db")
+def async_client_fixture(db_engine, mocker):
+    """
+    Create a TestClient that serves the async hero endpoints against the test database.
+
+    The async session can't join the transaction of the sync `session` fixture, so the rows
+    written during the test are deleted afterward instead.
+    """
+    async_engine = create_async_db_engine()
+    mocker.patch("state.async_engine", async_engine)
+
+    async_app = FastAPI()
+    async_app.include_router(heroes_async.router, prefix="/heroes")
+
+    with TestClient(async_app) as client:
+        yield client
+        # Pooled connections are bound to the event loop of the client
+        client.portal.call(async_engine.dispose)
+
+    with Session(db_engine) as session:
+        session.exec(delete(Hero))
+        session.exec(delete(IdempotencyKey))
+        session.commit()
+
+
 @pytest.fixture
 def client() -> TestClient:
     return TestClient(app)
@@ -0,0 +1,69 @@
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from middlewares.internal_paths import InternalPathsMiddleware
+from starlette.middleware import Middleware
+from starlette.testclient import TestClient
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class CountingMiddleware:
+    def __init__(self, app: ASGIApp, calls: list[str]):
+        self.app = app
+        self.calls = calls
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.calls.append(scope["path"])
+        await self.app(scope, receive, send)
+
+
+def create_client(calls: list[str]) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/health")
+    @app.get("/health/liveness")
+    @app.get("/healthy")
+    @app.get("/items")
+    async def read():
+        return {"ok": True}
+
+    app.add_middleware(
+        InternalPathsMiddleware,
+        middlewares=[
+            Middleware(CountingMiddleware, calls=calls),
+            Middleware(CORSMiddleware, allow_origins=["http://localhost"]),
+        ],
+        prefixes=["/health"],
+    )
+    return TestClient(app)
+
+
+def test_internal_paths_skip_the_middlewares():
+    calls = []
+    client = create_client(calls)
+    headers = {"Origin": "http://localhost"}
+
+    internal = [
+        client.get(path, headers=headers) for path in ("/health", "/health/liveness")
+    ]
+    public = [client.get(path, headers=headers) for path in ("/healthy", "/items")]
+
+    assert calls == ["/healthy", "/items"]
+    assert all(response.status_code == 200 for response in internal + public)
+    assert all("access-control-allow-origin" not in r.headers for r in internal)
+    assert all(
+        r.headers["access-control-allow-origin"] == "http://localhost" for r in public
+    )
+
+
+def test_no_internal_paths():
+    calls = []
+    app = FastAPI()
+    app.add_middleware(
+        InternalPathsMiddleware,
+        middlewares=[Middleware(CountingMiddleware, calls=calls)],
+        prefixes=[],
+    )
+
+    TestClient(app).get("/health")
+
+    assert calls == ["/health"]
@@ -0,0 +1,94 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from middlewares.logging import LogMiddleware
+from starlette.testclient import TestClient
+
+
+def create_app(**options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def read_root():
+        return {"message": "hello"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n"
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(LogMiddleware, **options)
+    return app
+
+
+def get_access_records(caplog) -> list[logging.LogRecord]:
+    return [record for record in caplog.records if hasattr(record, "response")]
+
+
+def test_one_access_record_per_request(caplog):
+    client = TestClient(create_app())
+
+    with caplog.at_level(logging.INFO):
+        response = client.get("/", params={"q": "1"})
+
+    records = get_access_records(caplog)
+    assert len(records) == 1
+    assert records[0].request == {
+        "method": "GET",
+        "url": "http://testserver/?q=1",
+    }
+    assert records[0].response == {
+        "status_code": 200,
+        "bytes_sent": len(response.content),
+    }
+    assert records[0].process_time > 0
+
+
+def test_streaming_response_passes_through(caplog):
+    client = TestClient(create_app())
+
+    with caplog.at_level(logging.INFO):
+        response = client.get("/stream")
+
+    assert response.text == "chunk 0\nchunk 1\nchunk 2\n"
+    assert get_access_records(caplog)[0].response["bytes_sent"] == 24
+
+
+def test_access_record_on_unhandled_error(caplog):
+    app = create_app()
+
+    @app.get("/error")
+    async def error():
+        raise RuntimeError("Boom")
+
+    client = TestClient(app, raise_server_exceptions=False)
+
+    with caplog.at_level(logging.INFO):
+        response = client.get("/error")
+
+    assert response.status_code == 500
+    assert get_access_records(caplog)[-1].response["status_code"] == 500
+
+
+def test_successful_requests_are_sampled(caplog):
+    client = TestClient(create_app(sample_rate=0.0, slow_request_threshold=60.0))
+
+    with caplog.at_level(logging.INFO):
+        client.get("/")
+        client.get("/missing")
+
+    records = get_access_records(caplog)
+    assert [record.response["status_code"] for record in records] == [404]
+
+
+def test_slow_requests_are_always_logged(caplog):
+    client = TestClient(create_app(sample_rate=0.0, slow_request_threshold=0.0))
+
+    with caplog.at_level(logging.INFO):
+        client.get("/")
+
+    assert len(get_access_records(caplog)) == 1
@@ -0,0 +1,27 @@
+from fastapi import FastAPI
+from middlewares.metrics import MetricsMiddleware
+from starlette.testclient import TestClient
+from utils.metrics import MetricsRecorder
+
+
+def test_requests_are_labelled_by_route_template():
+    recorder = MetricsRecorder()
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware, recorder=recorder)
+    client = TestClient(app)
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+
+    requests = {tuple(series[:4]) for series in recorder.snapshot()["requests"]}
+    assert requests == {
+        ("GET", "/items/{item_id}", "200", 2),
+        ("GET", "unmatched", "404", 1),
+    }
+    assert recorder.in_flight == 0
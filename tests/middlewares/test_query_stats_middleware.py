@@ -0,0 +1,52 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from middlewares.logging import LogMiddleware
+from middlewares.query_stats import QueryStatsMiddleware
+from sqlmodel import create_engine, text
+from starlette.testclient import TestClient
+from utils.query_stats import instrument_engine
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}")
+    instrument_engine(engine)
+    app = FastAPI()
+
+    @app.get("/items/{count}")
+    def read_items(count: int):
+        with engine.connect() as connection:
+            return [
+                connection.execute(text("SELECT :i"), {"i": i}).scalar()
+                for i in range(count)
+            ]
+
+    app.add_middleware(LogMiddleware)
+    app.add_middleware(QueryStatsMiddleware, n_plus_one_threshold=3)
+    yield TestClient(app)
+    engine.dispose()
+
+
+def test_access_log_reports_queries(client, caplog):
+    with caplog.at_level(logging.INFO):
+        client.get("/items/2")
+
+    record = next(record for record in caplog.records if record.message == "Response")
+    assert record.database["queries"] == 2
+    assert record.database["time"] > 0
+
+
+def test_repeated_statements_are_logged_as_n_plus_one(client, caplog):
+    with caplog.at_level(logging.WARNING):
+        client.get("/items/2")
+        client.get("/items/3")
+
+    records = [r for r in caplog.records if r.message == "Possible N+1 query"]
+    assert len(records) == 1
+    assert records[0].query == {
+        "sql": "SELECT ?",
+        "executions": 3,
+        "route": "/items/{count}",
+    }
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from database import (
+    ReplicaRouter,
+    TimedQueuePool,
+    create_db_engine,
+    get_pool_options,
+)
+from sqlalchemy import exc, make_url, text
+
+
+@pytest.fixture
+def pool_settings(mocker, tmp_path):
+    mocker.patch("config.settings.DATABASE_URL", f"sqlite:///{tmp_path / 'pool.db'}")
+    mocker.patch("config.settings.DATABASE_POOL_SIZE", 1)
+    mocker.patch("config.settings.DATABASE_MAX_OVERFLOW", 0)
+    mocker.patch("config.settings.DATABASE_POOL_TIMEOUT", 0.1)
+    mocker.patch("config.settings.DATABASE_POOL_RECYCLE", 3600)
+
+
+def test_pool_options_from_settings(pool_settings):
+    engine = create_db_engine()
+
+    assert isinstance(engine.pool, TimedQueuePool)
+    assert engine.pool.size() == 1
+    assert engine.pool._max_overflow == 0
+    assert engine.pool._timeout == 0.1
+    assert engine.pool._recycle == 3600
+    engine.dispose()
+
+
+def test_in_memory_sqlite_keeps_its_pool():
+    options = get_pool_options(make_url("sqlite://"), TimedQueuePool)
+
+    assert "poolclass" not in options
+    assert "pool_size" not in options
+
+
+def test_checkout_wait_and_timeouts(pool_settings):
+    engine = create_db_engine()
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = engine.pool.checkout_stats()
+    assert stats["checkout_timeouts"] == 1
+    assert stats["checkout_wait_max_seconds"] >= 0.1
+    assert stats["checkout_wait_seconds"] >= stats["checkout_wait_max_seconds"]
+    engine.dispose()
+
+
+def test_replica_router(mocker, tmp_path):
+    urls = [f"sqlite:///{tmp_path / f'replica_{i}.db'}" for i in range(2)]
+    router = ReplicaRouter(urls, use_async=False, health_interval=60)
+    first, second = router.replicas
+
+    assert [router.get_replica() for _ in range(4)] == [first, second, first, second]
+
+    mocker.patch(
+        "database.check_health_safe", side_effect=lambda engine: engine is first.engine
+    )
+    router.check_health()
+    assert [router.get_replica() for _ in range(2)] == [first, first]
+    assert second.healthy is False
+
+    mocker.patch("database.check_health_safe", return_value=False)
+    router.check_health()
+    assert router.get_replica() is None
+
+    asyncio.run(router.dispose())
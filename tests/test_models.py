@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+import uuid_utils.compat as uuid7
+from models import UUID7, HeroPublic
+from pydantic import TypeAdapter, ValidationError
+
+adapter = TypeAdapter(UUID7)
+
+
+def test_uuid7_from_string():
+    value = uuid7.uuid7()
+
+    assert adapter.validate_python(str(value)) == value
+    assert adapter.validate_json(f'"{value}"') == value
+
+
+def test_uuid7_from_uuid():
+    value = uuid7.uuid7()
+
+    assert adapter.validate_python(value) is value
+
+
+@pytest.mark.parametrize(
+    "value, message",
+    [
+        ("not-a-uuid", "Value error, Invalid UUID format: not-a-uuid"),
+        (123, "Value error, Expected a UUID, got <class 'int'>"),
+        (uuid7.uuid7().bytes, "Value error, Expected a UUID, got <class 'bytes'>"),
+        (
+            "6f1c2b8e-3f4a-4b6c-9d8e-7f6a5b4c3d2e",
+            "Value error, Expected a UUID7, got UUID4",
+        ),
+        (uuid.uuid4(), "Value error, Expected a UUID7, got UUID4"),
+    ],
+)
+def test_uuid7_invalid(value, message):
+    with pytest.raises(ValidationError) as exc_info:
+        adapter.validate_python(value)
+
+    errors = exc_info.value.errors()
+    assert len(errors) == 1
+    assert errors[0]["type"] == "value_error"
+    assert errors[0]["msg"] == message
+
+
+def test_uuid7_serialization():
+    value = uuid7.uuid7()
+
+    assert adapter.dump_python(value) is value
+    assert adapter.dump_python(value, mode="json") == str(value)
+    assert adapter.dump_json(value) == f'"{value}"'.encode()
+
+
+def test_uuid7_json_schema():
+    schema = HeroPublic.model_json_schema()
+
+    assert schema["properties"]["id"] == {
+        "format": "uuid7",
+        "title": "Id",
+        "type": "string",
+    }
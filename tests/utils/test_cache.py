@@ -0,0 +1,49 @@
+from utils.cache import TTLCache
+
+
+def test_get_and_set():
+    cache = TTLCache(max_entries=2, ttl=60)
+
+    assert cache.get("a") is None
+    cache.set("a", b"1")
+
+    assert cache.get("a") == b"1"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")  # "b" becomes the least recently used entry
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiration(mocker):
+    monotonic = mocker.patch("utils.cache.time.monotonic", return_value=100.0)
+    cache = TTLCache(max_entries=2, ttl=10)
+    cache.set("a", b"1")
+
+    monotonic.return_value = 111.0
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_discards_racing_set():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", b"old")
+
+    # A read loads the value while a write invalidates the entry
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.set("a", b"old", generation=generation)
+
+    assert cache.get("a") is None
@@ -0,0 +1,26 @@
+from utils.etag import compute_etag, etag_matches
+
+
+def test_compute_etag_is_strong_and_stable():
+    etag = compute_etag(b'{"name":"Deadpond"}')
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == compute_etag(b'{"name":"Deadpond"}')
+    assert etag != compute_etag(b'{"name":"Deadpuddle"}')
+
+
+def test_etag_matches():
+    etag = compute_etag(b"hero")
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert etag_matches(f"W/{etag}", etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_etag_matches_strong_comparison():
+    etag = compute_etag(b"hero")
+
+    assert etag_matches(etag, etag, weak=False)
+    assert not etag_matches(f"W/{etag}", etag, weak=False)
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy.pool import QueuePool
+from sqlmodel import create_engine, text
+from utils.health import DEGRADED, FAIL, OK, HealthMonitor
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'health.db'}",
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    yield engine
+    engine.dispose()
+
+
+def create_monitor(engine, latency_threshold: float = 60.0) -> HealthMonitor:
+    return HealthMonitor(
+        probe_engine=engine,
+        engines=[engine],
+        interval=60,
+        window=3,
+        latency_threshold=latency_threshold,
+    )
+
+
+def test_status_ok(engine):
+    monitor = create_monitor(engine)
+    for _ in range(4):
+        monitor.probe()
+
+    status = monitor.status()
+
+    assert status["status"] == OK
+    assert status["database"] == OK
+    assert len(monitor.latencies) == 3
+    assert 0 < status["latency_ms"]["avg"] <= status["latency_ms"]["max"]
+    assert status["pool_exhausted"] is False
+
+
+def test_status_before_the_first_probe(engine):
+    assert create_monitor(engine).status()["status"] == FAIL
+
+
+def test_status_fail(mocker, engine):
+    mocker.patch("utils.health.check_health_safe", return_value=False)
+    monitor = create_monitor(engine)
+    monitor.probe()
+
+    assert monitor.status()["database"] == FAIL
+
+
+def test_status_degraded_by_latency(engine):
+    monitor = create_monitor(engine, latency_threshold=0.0)
+    monitor.probe()
+
+    assert monitor.status()["status"] == DEGRADED
+
+
+def test_status_degraded_by_exhausted_pool(mocker, engine, tmp_path):
+    mocker.patch("config.settings.DATABASE_MAX_OVERFLOW", 0)
+    probe_engine = create_engine(f"sqlite:///{tmp_path / 'health.db'}")
+    monitor = HealthMonitor(
+        probe_engine=probe_engine,
+        engines=[engine],
+        interval=60,
+        window=3,
+        latency_threshold=60.0,
+    )
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        monitor.probe()
+
+    status = monitor.status()
+    assert status["status"] == DEGRADED
+    assert status["pool_exhausted"] is True
+    monitor.stop()
+
+
+def test_status_fail_when_the_probes_stall(mocker, engine):
+    monitor = create_monitor(engine)
+    monitor.probe()
+    mocker.patch("utils.health.time.monotonic", return_value=monitor.last_probe + 181)
+
+    assert monitor.status()["status"] == FAIL
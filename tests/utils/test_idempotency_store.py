@@ -0,0 +1,66 @@
+import threading
+import time
+
+from models import IdempotencyKey
+from sqlmodel import Session, create_engine, select
+from utils.idempotency import IdempotencyStore, StoredResponse, fingerprint_request
+
+
+def test_stored_response_encoding():
+    response = StoredResponse(
+        fingerprint_request("POST", "/heroes/", b"{}"), 200, b'{"a":\n1}'
+    )
+
+    assert StoredResponse.decode(response.encode()) == response
+
+
+def test_fingerprint_request():
+    fingerprint = fingerprint_request("POST", "/heroes/", b'{"name":"A"}')
+
+    assert len(fingerprint) == 64
+    assert fingerprint == fingerprint_request("POST", "/heroes/", b'{"name":"A"}')
+    assert fingerprint != fingerprint_request("POST", "/heroes/", b'{"name":"B"}')
+    assert fingerprint != fingerprint_request("POST", "/heroes/bulk", b'{"name":"A"}')
+
+
+def test_lock_coalesces_requests_with_the_same_key():
+    store = IdempotencyStore(ttl=60, max_entries=10)
+    events = []
+
+    def request(name: str, delay: float):
+        with store.lock("key"):
+            events.append(f"{name} start")
+            time.sleep(delay)
+            events.append(f"{name} end")
+
+    first = threading.Thread(target=request, args=("first", 0.05))
+    first.start()
+    time.sleep(0.01)
+    second = threading.Thread(target=request, args=("second", 0))
+    second.start()
+    first.join()
+    second.join()
+
+    assert events == ["first start", "first end", "second start", "second end"]
+    assert store.coalesced == 1
+    assert store._locks == {}
+
+
+def test_purge_deletes_expired_keys(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    IdempotencyKey.metadata.create_all(engine, tables=[IdempotencyKey.__table__])
+    store = IdempotencyStore(ttl=60, max_entries=10)
+    response = StoredResponse("fingerprint", 200, b"{}")
+    with Session(engine) as session:
+        expired = store.to_row("expired", response)
+        expired.expires_at = time.time() - 1
+        session.add(expired)
+        session.add(store.to_row("live", response))
+        session.commit()
+
+        assert store.load(session, "expired") is None
+        assert store.load(session, "live") == response
+
+        assert store.purge(engine) == 1
+        assert session.exec(select(IdempotencyKey.key)).all() == ["live"]
+    engine.dispose()
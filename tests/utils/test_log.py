@@ -0,0 +1,107 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+from utils.log import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    TraceRateLimiter,
+    convert_timestamp_to_date,
+    start_queue_handler,
+)
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record: logging.LogRecord):
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread())
+        self.records.append(self.format(record))
+
+
+def test_format_timestamp_matches_convert_timestamp_to_date():
+    formatter = JsonFormatter()
+
+    for timestamp in (1700000000.123, 1700000000.9999997, 1700000001.0, 1700000061.5):
+        assert formatter.format_timestamp(timestamp) == convert_timestamp_to_date(
+            timestamp
+        )
+
+
+def test_json_formatter():
+    record = logging.makeLogRecord(
+        {
+            "msg": "Response %s",
+            "args": ("ok",),
+            "levelno": logging.INFO,
+            "levelname": "INFO",
+            "request": {"method": "GET", "url": "http://test/"},
+            "process_time": 0.5,
+        }
+    )
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["message"] == "Response ok"
+    assert data["request"] == {"method": "GET", "url": "http://test/"}
+    assert data["process_time"] == 0.5
+    assert data["timestamp"] == convert_timestamp_to_date(record.created)
+
+
+def test_queue_handler_does_not_wait_for_slow_handlers():
+    slow_handler = SlowHandler(delay=0.05)
+    slow_handler.setFormatter(JsonFormatter())
+    handler = start_queue_handler([slow_handler], max_size=100)
+    logger = logging.getLogger("test_queue_handler")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        start_time = time.perf_counter()
+        for i in range(10):
+            logger.warning("record %d", i)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        logger.removeHandler(handler)
+        handler.listener.stop()
+
+    assert elapsed < slow_handler.delay
+    assert [json.loads(record)["message"] for record in slow_handler.records] == [
+        f"record {i}" for i in range(10)
+    ]
+    assert threading.current_thread() not in slow_handler.threads
+    assert handler.dropped == 0
+
+
+def test_queue_handler_drops_records_when_full():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+
+    for i in range(5):
+        handler.handle(logging.makeLogRecord({"msg": f"record {i}"}))
+
+    assert handler.stats() == {"queued": 2, "max_size": 2, "dropped": 3}
+
+
+def test_trace_rate_limiter(mocker):
+    monotonic = mocker.patch("utils.log.time.monotonic", return_value=100.0)
+    limiter = TraceRateLimiter(limit=2)
+
+    assert [limiter.allow(ValueError()) for _ in range(3)] == [True, True, False]
+    assert limiter.allow(KeyError()) is True
+    assert limiter.stats()["suppressed"] == {"builtins.ValueError": 1}
+
+    monotonic.return_value = 160.0
+    assert limiter.allow(ValueError()) is True
+
+
+def test_trace_rate_limiter_disabled():
+    limiter = TraceRateLimiter(limit=0)
+
+    assert all(limiter.allow(ValueError()) for _ in range(100))
+    assert limiter.stats()["suppressed"] == {}
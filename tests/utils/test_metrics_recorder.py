@@ -0,0 +1,84 @@
+import orjson
+from sqlmodel import create_engine, text
+from utils.metrics import MetricsRecorder, render_metrics
+
+
+def get_sample(text_format: bytes, line_prefix: str) -> float:
+    for line in text_format.decode().splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix} not found")
+
+
+def test_observe_request():
+    recorder = MetricsRecorder(buckets=(0.1, 1.0))
+
+    recorder.observe_request("GET", "/heroes/{hero_id}", "200", 0.05)
+    recorder.observe_request("GET", "/heroes/{hero_id}", "200", 0.1)
+    recorder.observe_request("GET", "/heroes/{hero_id}", "200", 5.0)
+
+    output = render_metrics(recorder, directory=None)
+    labels = 'method="GET",route="/heroes/{hero_id}",status="200"'
+    assert get_sample(output, f"http_requests_total{{{labels}}}") == 3
+    assert (
+        get_sample(output, f'http_request_duration_seconds_bucket{{le="0.1",{labels}}}')
+        == 2
+    )
+    assert (
+        get_sample(output, f'http_request_duration_seconds_bucket{{le="1.0",{labels}}}')
+        == 2
+    )
+    assert (
+        get_sample(
+            output, f'http_request_duration_seconds_bucket{{le="+Inf",{labels}}}'
+        )
+        == 3
+    )
+    assert get_sample(output, f"http_request_duration_seconds_sum{{{labels}}}") == 5.15
+
+
+def test_metrics_are_aggregated_across_workers(tmp_path):
+    recorder = MetricsRecorder()
+    recorder.in_flight = 1
+    recorder.observe_request("GET", "/heroes/", "200", 0.01)
+
+    other_worker = MetricsRecorder()
+    other_worker.pid = 1  # init, always alive
+    other_worker.in_flight = 2
+    other_worker.observe_request("GET", "/heroes/", "200", 0.01)
+    other_worker.flush(str(tmp_path))
+
+    exited_worker = MetricsRecorder()
+    exited_worker.pid = 2**22 + 1  # above the maximum pid of Linux
+    exited_worker.in_flight = 4
+    exited_worker.observe_request("GET", "/heroes/", "200", 0.01)
+    exited_worker.flush(str(tmp_path))
+
+    output = render_metrics(recorder, directory=str(tmp_path))
+    labels = 'method="GET",route="/heroes/",status="200"'
+    assert get_sample(output, f"http_requests_total{{{labels}}}") == 3
+    assert get_sample(output, "http_requests_in_flight") == 3
+
+
+def test_pool_metrics(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    recorder = MetricsRecorder()
+    recorder.watch_pool(engine, "sync")
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        assert recorder.snapshot()["pools"]["sync"]["checked_out"] == 1
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    recorder.flush(str(tmp_path))
+    pool = orjson.loads((tmp_path / f"{recorder.pid}.json").read_bytes())["pools"][
+        "sync"
+    ]
+    assert pool["checkouts"] == 2
+    assert pool["connections"] == 1
+    assert pool["checked_out"] == 0
+    assert pool["idle"] == 1
+    output = render_metrics(recorder, directory=None)
+    assert get_sample(output, 'db_pool_checkouts_total{engine="sync"}') == 2
+    engine.dispose()
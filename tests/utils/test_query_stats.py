@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+from sqlmodel import create_engine, text
+from utils.query_stats import (
+    QueryStats,
+    current_query_stats,
+    instrument_engine,
+    normalize_sql,
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}")
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "statement, expected",
+    [
+        (
+            "SELECT hero.id, hero.name \nFROM hero \nWHERE hero.id = ?",
+            "SELECT hero.id, hero.name FROM hero WHERE hero.id = ?",
+        ),
+        (
+            "SELECT * FROM hero WHERE name = 'Deadpond' AND age > 30 LIMIT %(param_1)s",
+            "SELECT * FROM hero WHERE name = ? AND age > ? LIMIT ?",
+        ),
+        (
+            "SELECT * FROM hero WHERE id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s)",
+            "SELECT * FROM hero WHERE id IN (...)",
+        ),
+        (
+            "INSERT INTO hero (id, name) VALUES ($1, $2), ($3, $4), ($5, $6)",
+            "INSERT INTO hero (id, name) VALUES (...)",
+        ),
+        (
+            "SELECT name::text FROM hero_1 WHERE id = :id_1",
+            "SELECT name::text FROM hero_1 WHERE id = ?",
+        ),
+    ],
+)
+def test_normalize_sql(statement, expected):
+    assert normalize_sql(statement) == expected
+
+
+def test_queries_are_added_to_the_current_request(engine):
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        with engine.connect() as connection:
+            for i in range(3):
+                connection.execute(text("SELECT :i"), {"i": i})
+            connection.execute(text("CREATE TABLE item (id INTEGER)"))
+    finally:
+        current_query_stats.reset(token)
+
+    assert stats.count == 4
+    assert stats.duration > 0
+    assert stats.repeated_statements(threshold=3) == {"SELECT ?": 3}
+    assert stats.route == "unknown"
+
+
+def test_queries_outside_of_a_request_are_ignored(engine):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert current_query_stats.get() is None
+
+
+def test_slow_query_log(mocker, engine, caplog):
+    mocker.patch("config.settings.SLOW_QUERY_THRESHOLD", 0.0)
+
+    with caplog.at_level(logging.WARNING), engine.connect() as connection:
+        connection.execute(text("SELECT 42"))
+
+    records = [record for record in caplog.records if record.message == "Slow query"]
+    assert len(records) == 1
+    assert records[0].query["sql"] == "SELECT ?"
+    assert records[0].query["route"] == "unknown"